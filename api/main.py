@@ -1,9 +1,11 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import FastAPI, Depends, HTTPException, Query, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import uvicorn
+import json
+import time
 from datetime import datetime, timedelta
 
 from config.database import get_db, init_db
@@ -11,14 +13,17 @@ from config.settings import settings
 from config.logging import setup_logging
 from models.schemas import (
     DistributorResponse, CompanyResponse, ChangeHistoryResponse,
-    SyncResponse, AnalyticsSummary, HealthCheck, PaginatedResponse, PaginationParams
+    SyncJobResponse, AnalyticsSummary, HealthCheck, PaginatedResponse, PaginationParams
 )
 from models.database import Company, Distributor, ChangeHistory
-from services.scraper import UnifiDistributorScraper
-from services.data_processor import DataProcessor
+from services.sync_jobs import sync_job_manager
+from services.health_monitor import health_monitor
+from services.history_store import HistoryStore
+from services.change_codec import decode_change
+from services.metrics import registry as metrics_registry, API_REQUEST_SECONDS
 from services.notion_integration import NotionIntegration
 from api.dependencies import get_current_user, rate_limit
-from api.routers import distributors, companies, analytics, health
+from api.routers import distributors, companies, analytics, health, lifecycle
 
 # Initialize logging
 setup_logging()
@@ -41,18 +46,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Observe per-route latency; routes are labelled by path template to keep cardinality bounded"""
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        API_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status_code)
+        )
+
 # Include routers
 app.include_router(distributors.router, prefix="/api/distributors", tags=["distributors"])
 app.include_router(companies.router, prefix="/api/companies", tags=["companies"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["analytics"])
 app.include_router(health.router, prefix="/api/health", tags=["health"])
+app.include_router(lifecycle.router, prefix="/api/lifecycle", tags=["lifecycle"])
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and perform startup tasks"""
     init_db()
+    health_monitor.start()
     print("Application started successfully")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release background workers"""
+    sync_job_manager.shutdown(wait=False)
+    health_monitor.stop()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -63,116 +94,85 @@ async def root():
         "health_check": "/api/health"
     }
 
-@app.post("/api/sync", response_model=SyncResponse)
+@app.post("/api/sync", response_model=SyncJobResponse, status_code=202)
 async def sync_distributors(
-    background_tasks: BackgroundTasks,
     sync_notion: bool = Query(True, description="Whether to sync to Notion"),
     detect_missing: bool = Query(True, description="Whether to detect missing distributors"),
-    db: Session = Depends(get_db)
+    incremental: Optional[bool] = Query(None, description="Only process region/country pairs that changed (default: SCRAPE_INCREMENTAL)")
 ):
     """
-    Manually trigger distributor data synchronization
+    Enqueue a distributor data synchronization job
     
-    This endpoint will:
+    The job runs in the background worker pool and will:
     1. Scrape distributor data from Unifi website
     2. Process and store in local database
-    3. Optionally sync to Notion
-    4. Optionally detect missing distributors
+    3. Optionally detect missing distributors
+    4. Optionally sync to Notion
+    
+    Concurrent requests share the running job. Poll /api/jobs/{id} for progress.
     """
     try:
-        # Start scraping
-        scraper = UnifiDistributorScraper()
-        scraping_result = scraper.scrape_distributors()
-        
-        if not scraping_result.success:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Scraping failed: {scraping_result.error_message}"
-            )
-        
-        # Process scraped data
-        processor = DataProcessor(db)
-        processing_results = processor.process_scraped_data(scraping_result.distributors)
-        
-        # Detect missing distributors if requested
-        missing_count = 0
-        if detect_missing:
-            missing_distributors = processor.detect_missing_distributors(scraping_result.distributors)
-            missing_count = processor.mark_distributors_inactive(missing_distributors)
-        
-        # Sync to Notion if requested and configured
-        notion_results = None
-        if sync_notion and settings.notion_sync_enabled:
-            try:
-                notion = NotionIntegration()
-                # Get all active distributors
-                active_distributors = db.query(Distributor).filter(
-                    Distributor.is_active == True
-                ).all()
-                
-                # Convert to response models
-                distributor_responses = [
-                    DistributorResponse.from_orm(dist) for dist in active_distributors
-                ]
-                
-                # Sync in background
-                background_tasks.add_task(
-                    notion.sync_distributors_to_notion,
-                    distributor_responses
-                )
-                
-                notion_results = {"status": "started_background_sync"}
-                
-            except Exception as e:
-                notion_results = {"error": str(e)}
-        
-        return SyncResponse(
-            status="success",
-            scraped_count=scraping_result.total_found,
-            processing_results=processing_results,
-            notion_results=notion_results,
-            message=f"Successfully processed {scraping_result.total_found} distributors. "
-                   f"Created: {processing_results['created']}, "
-                   f"Updated: {processing_results['updated']}, "
-                   f"Missing: {missing_count}"
+        job, created = sync_job_manager.submit_sync(
+            sync_notion=sync_notion,
+            detect_missing=detect_missing,
+            incremental=incremental
         )
+        return SyncJobResponse(**job.to_dict(), deduplicated=not created)
         
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Sync failed: {str(e)}"
+            detail=f"Failed to enqueue sync: {str(e)}"
         )
 
+@app.get("/api/jobs/{job_id}", response_model=SyncJobResponse)
+async def get_job(job_id: str):
+    """Get progress of a background sync job"""
+    job = sync_job_manager.get_job(job_id)
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return SyncJobResponse(**job.to_dict())
+
 @app.get("/api/distributors", response_model=PaginatedResponse)
 async def get_distributors(
     pagination: PaginationParams = Depends(),
     region: Optional[str] = Query(None, description="Filter by region"),
     partner_type: Optional[str] = Query(None, description="Filter by partner type"),
     active_only: bool = Query(True, description="Only return active distributors"),
+    as_of: Optional[datetime] = Query(None, description="Return the network as it was at this time (ISO 8601, UTC if no offset)"),
     db: Session = Depends(get_db)
 ):
     """Get paginated list of distributors with optional filters"""
     try:
-        query = db.query(Distributor)
-        
-        # Apply filters
-        if active_only:
-            query = query.filter(Distributor.is_active == True)
-        
-        if region:
-            query = query.filter(Distributor.region == region)
-        
-        if partner_type:
-            query = query.filter(Distributor.partner_type == partner_type)
-        
-        # Get total count
-        total = query.count()
-        
-        # Apply pagination
-        distributors = query.offset(pagination.offset).limit(pagination.per_page).all()
-        
-        # Convert to response models
-        items = [DistributorResponse.from_orm(dist) for dist in distributors]
+        if as_of is not None:
+            # Historical view from the history store's checkpoints + change log
+            items, total = HistoryStore().as_of(
+                as_of, region=region, partner_type=partner_type, active_only=active_only,
+                offset=pagination.offset, limit=pagination.per_page
+            )
+        else:
+            query = db.query(Distributor)
+            
+            # Apply filters
+            if active_only:
+                query = query.filter(Distributor.is_active == True)
+            
+            if region:
+                query = query.filter(Distributor.region == region)
+            
+            if partner_type:
+                query = query.filter(Distributor.partner_type == partner_type)
+            
+            # Get total count
+            total = query.count()
+            
+            # Apply pagination
+            distributors = query.offset(pagination.offset).limit(pagination.per_page).all()
+            
+            # Convert to response models
+            items = [DistributorResponse.from_orm(dist) for dist in distributors]
         
         return PaginatedResponse(
             items=items,
@@ -200,6 +200,20 @@ async def get_distributor(
     
     return DistributorResponse.from_orm(distributor)
 
+def _change_response(change: ChangeHistory) -> ChangeHistoryResponse:
+    """Response model for a change row, decoding compact payloads (deltas carry only the changed fields)"""
+    decoded = decode_change(change)
+    return ChangeHistoryResponse(
+        id=change.id,
+        distributor_id=change.distributor_id,
+        change_type=change.change_type,
+        detected_at=change.detected_at,
+        old_data=json.dumps(decoded['old_data']) if decoded['old_data'] is not None else None,
+        new_data=json.dumps(decoded['new_data']) if decoded['new_data'] is not None else None,
+        encoding=change.encoding,
+        changed_fields=decoded['changed_fields']
+    )
+
 @app.get("/api/changes", response_model=List[ChangeHistoryResponse])
 async def get_changes(
     limit: int = Query(100, description="Number of changes to return"),
@@ -224,7 +238,7 @@ async def get_changes(
             ChangeHistory.detected_at.desc()
         ).limit(limit).all()
         
-        return [ChangeHistoryResponse.from_orm(change) for change in changes]
+        return [_change_response(change) for change in changes]
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -264,42 +278,14 @@ async def get_analytics_summary(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/health", response_model=HealthCheck)
-async def health_check(db: Session = Depends(get_db)):
-    """System health check"""
-    checks = {
-        "database": False,
-        "notion": False,
-        "scraper": False
-    }
-    
-    # Database check
-    try:
-        db.execute("SELECT 1")
-        checks["database"] = True
-    except Exception:
-        pass
-    
-    # Notion check
-    try:
-        if settings.notion_token:
-            notion = NotionIntegration()
-            checks["notion"] = notion.test_connection()
-    except Exception:
-        pass
-    
-    # Scraper check
-    try:
-        scraper = UnifiDistributorScraper()
-        checks["scraper"] = True
-    except Exception:
-        pass
-    
-    status = "healthy" if all(checks.values()) else "unhealthy"
-    
-    return HealthCheck(
-        status=status,
-        checks=checks
-    )
+async def health_check():
+    """System health check served from the background health monitor"""
+    return HealthCheck(**health_monitor.summary())
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of the in-process metrics registry"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 @app.post("/api/notion/sync")
 async def sync_to_notion(
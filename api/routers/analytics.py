@@ -5,7 +5,7 @@ from typing import List, Optional
 from datetime import datetime, timedelta
 
 from config.database import get_db
-from models.database import Distributor, Company, ChangeHistory
+from models.database import Distributor, Company, ChangeHistory, ChangeHistoryRollup
 from models.schemas import AnalyticsSummary
 from api.dependencies import rate_limit
 
@@ -173,7 +173,8 @@ async def get_change_trends(
         # Organize by date
         trends = {}
         for date, change_type, count in changes:
-            date_str = date.strftime('%Y-%m-%d')
+            # SQLite's date() returns text, PostgreSQL's a date
+            date_str = date if isinstance(date, str) else date.strftime('%Y-%m-%d')
             if date_str not in trends:
                 trends[date_str] = {
                     "created": 0,
@@ -199,6 +200,60 @@ async def get_change_trends(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/change-trends/monthly")
+async def get_monthly_change_trends(
+    months: int = Query(24, description="Number of months to analyze"),
+    db: Session = Depends(get_db),
+    _: None = Depends(rate_limit)
+):
+    """Get monthly change counts, combining compacted rollups with live change history"""
+    try:
+        now = datetime.utcnow()
+        first_month = (now.year * 12 + now.month - 1) - (months - 1)
+        cutoff_month = f"{first_month // 12:04d}-{first_month % 12 + 1:02d}"
+        cutoff_date = datetime(first_month // 12, first_month % 12 + 1, 1)
+        
+        trends = {}
+        
+        # Compacted history
+        rollups = db.query(
+            ChangeHistoryRollup.month,
+            func.sum(ChangeHistoryRollup.created_count),
+            func.sum(ChangeHistoryRollup.updated_count),
+            func.sum(ChangeHistoryRollup.deleted_count)
+        ).filter(
+            ChangeHistoryRollup.month >= cutoff_month
+        ).group_by(ChangeHistoryRollup.month).all()
+        
+        for month, created, updated, deleted in rollups:
+            trends[month] = {"created": created or 0, "updated": updated or 0, "deleted": deleted or 0}
+        
+        # Changes still within retention
+        changes = db.query(
+            ChangeHistory.detected_at,
+            ChangeHistory.change_type
+        ).filter(
+            ChangeHistory.detected_at >= cutoff_date
+        ).all()
+        
+        for detected_at, change_type in changes:
+            month_data = trends.setdefault(detected_at.strftime('%Y-%m'), {"created": 0, "updated": 0, "deleted": 0})
+            month_data[change_type] = month_data.get(change_type, 0) + 1
+        
+        total_changes = sum(sum(month_data.values()) for month_data in trends.values())
+        
+        return {
+            "trends": dict(sorted(trends.items())),
+            "summary": {
+                "total_changes": total_changes,
+                "months_analyzed": months,
+                "average_changes_per_month": total_changes / months if months > 0 else 0
+            }
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/top-companies")
 async def get_top_companies(
     limit: int = Query(10, description="Number of top companies to return"),
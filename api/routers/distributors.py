@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from datetime import datetime
 
 from config.database import get_db
 from models.database import Distributor, Company
-from models.schemas import DistributorResponse, PaginatedResponse, PaginationParams
+from models.schemas import DistributorResponse, DistributorStateResponse, PaginatedResponse, PaginationParams
+from services.change_codec import distributor_state_at
 from api.dependencies import rate_limit
 
 router = APIRouter()
@@ -79,6 +81,21 @@ async def get_distributor(
     
     return DistributorResponse.from_orm(distributor)
 
+@router.get("/{distributor_id}/state", response_model=DistributorStateResponse)
+async def get_distributor_state(
+    distributor_id: int,
+    as_of: Optional[datetime] = Query(None, description="State at this time (ISO 8601, UTC if no offset); default now"),
+    db: Session = Depends(get_db),
+    _: None = Depends(rate_limit)
+):
+    """A distributor's state rebuilt from its change history"""
+    as_of = as_of or datetime.utcnow()
+    state = distributor_state_at(db, distributor_id, as_of)
+    if state is None:
+        raise HTTPException(status_code=404, detail="No recorded state for this distributor at that time")
+    
+    return DistributorStateResponse(distributor_id=distributor_id, as_of=as_of, state=state)
+
 @router.get("/region/{region}", response_model=List[DistributorResponse])
 async def get_distributors_by_region(
     region: str,
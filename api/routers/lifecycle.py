@@ -0,0 +1,103 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+import json
+
+from config.database import get_db
+from models.database import ChannelLifecycleEvent, ChannelMonitoringSession
+from models.schemas import LifecycleEventResponse, LifecycleEventPage, MonitoringSessionResponse
+from api.dependencies import rate_limit
+
+router = APIRouter()
+
+EVENT_TYPES = ('discovered', 'updated', 'deactivated', 'reactivated')
+
+def _json_field(value: Optional[str]) -> Optional[dict]:
+    return json.loads(value) if value else None
+
+@router.get("/events", response_model=LifecycleEventPage)
+async def get_lifecycle_events(
+    event_type: Optional[str] = Query(None, description="discovered, updated, deactivated or reactivated"),
+    region: Optional[str] = Query(None, description="Filter by region"),
+    session_id: Optional[int] = Query(None, description="Only events of one monitoring session"),
+    min_significance: Optional[float] = Query(None, ge=0, le=1, description="Minimum significance score"),
+    since: Optional[datetime] = Query(None, description="Only events created at or after this time (UTC)"),
+    before_id: Optional[int] = Query(None, description="Keyset cursor: next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=500, description="Events per page"),
+    db: Session = Depends(get_db),
+    _: None = Depends(rate_limit)
+):
+    """Lifecycle events, newest first, paged by id (keyset) so deep pages cost the same as the first"""
+    if event_type and event_type not in EVENT_TYPES:
+        raise HTTPException(status_code=400, detail=f"event_type must be one of: {', '.join(EVENT_TYPES)}")
+    
+    try:
+        query = db.query(ChannelLifecycleEvent)
+        
+        # Apply filters
+        if event_type:
+            query = query.filter(ChannelLifecycleEvent.event_type == event_type)
+        
+        if region:
+            query = query.filter(ChannelLifecycleEvent.region == region)
+        
+        if session_id is not None:
+            query = query.filter(ChannelLifecycleEvent.session_id == session_id)
+        
+        if min_significance is not None:
+            query = query.filter(ChannelLifecycleEvent.significance_score >= min_significance)
+        
+        if since:
+            query = query.filter(ChannelLifecycleEvent.created_at >= since)
+        
+        if before_id is not None:
+            query = query.filter(ChannelLifecycleEvent.id < before_id)
+        
+        # One extra row tells whether another page exists
+        events = query.order_by(ChannelLifecycleEvent.id.desc()).limit(limit + 1).all()
+        has_more = len(events) > limit
+        events = events[:limit]
+        
+        items = [
+            LifecycleEventResponse(
+                id=event.id,
+                distributor_id=event.distributor_id,
+                unifi_id=event.unifi_id,
+                event_type=event.event_type,
+                region=event.region,
+                significance_score=float(event.significance_score or 0),
+                event_data=_json_field(event.event_data),
+                old_data=_json_field(event.old_data),
+                new_data=_json_field(event.new_data),
+                session_id=event.session_id,
+                created_at=event.created_at
+            )
+            for event in events
+        ]
+        
+        return LifecycleEventPage(
+            items=items,
+            next_cursor=items[-1].id if has_more else None,
+            has_more=has_more
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/sessions", response_model=List[MonitoringSessionResponse])
+async def get_monitoring_sessions(
+    limit: int = Query(20, ge=1, le=100, description="Number of sessions to return"),
+    db: Session = Depends(get_db),
+    _: None = Depends(rate_limit)
+):
+    """Most recent monitoring sessions with their lifecycle totals"""
+    try:
+        sessions = db.query(ChannelMonitoringSession).order_by(
+            ChannelMonitoringSession.id.desc()
+        ).limit(limit).all()
+        
+        return [MonitoringSessionResponse.from_orm(session) for session in sessions]
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
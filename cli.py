@@ -7,7 +7,7 @@ Command-line interface for managing the distributor tracking system
 import click
 import asyncio
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 
 from config.database import SessionLocal, init_db
@@ -15,6 +15,7 @@ from config.settings import settings
 from config.logging import setup_logging
 from services.region_mapping_manager import RegionMappingManager
 from models.database import Distributor, Company, ChangeHistory
+from services.change_codec import decode_change
 
 # Setup logging
 setup_logging()
@@ -39,8 +40,25 @@ def init():
 @click.option('--sync-notion', is_flag=True, help='Sync results to Notion')
 @click.option('--verbose', is_flag=True, help='Verbose output')
 @click.option('--refresh-mappings', is_flag=True, help='Refresh region mappings before scraping')
-def scrape(sync_notion: bool, verbose: bool, refresh_mappings: bool):
+@click.option('--profile', 'profile_path', type=click.Path(dir_okay=False),
+              help='Write a per-stage timing breakdown (JSON) to this path, plus PATH.folded for flamegraphs')
+@click.option('--cprofile', is_flag=True, help='With --profile, also dump cProfile stats to PATH.pstats')
+@click.option('--workers', type=int, default=None,
+              help='Shard region/country pairs across this many processes (default: SCRAPE_WORKERS)')
+@click.option('--incremental', is_flag=True, default=None,
+              help='Only process region/country pairs that changed since the last run (default: SCRAPE_INCREMENTAL)')
+@click.option('--full-pass', is_flag=True, help='With --incremental, re-process every pair now')
+@click.option('--scheduled', is_flag=True, default=None,
+              help='With --incremental, only fetch pairs due by observed churn (default: SCRAPE_SCHEDULED)')
+def scrape(sync_notion: bool, verbose: bool, refresh_mappings: bool, profile_path: Optional[str], cprofile: bool,
+           workers: Optional[int], incremental: Optional[bool], full_pass: bool, scheduled: Optional[bool]):
     """Scrape distributor data from Unifi website using JSON API"""
+    profiler = None
+    if profile_path:
+        from services.profiling import Profiler
+        profiler = Profiler(use_cprofile=cprofile)
+        profiler.start()
+    
     try:
         if verbose:
             click.echo("Starting distributor scraping...")
@@ -59,22 +77,47 @@ def scrape(sync_notion: bool, verbose: bool, refresh_mappings: bool):
                 click.echo("⚠️  Failed to refresh mappings, using existing ones")
         
         # Scrape data
-        distributors = scraper.scrape_all_distributors()
+        run = None
+        scheduler = None
+        if incremental or (incremental is None and settings.scrape_incremental):
+            if scheduled or (scheduled is None and settings.scrape_scheduled):
+                from services.pair_scheduler import PairScheduler
+                scheduler = PairScheduler()
+            distributors, run = scraper.scrape_incremental(full_pass=True if full_pass else None, scheduler=scheduler)
+            click.echo(f"💧 {len(run['changed_pairs'])} changed, {len(run['unchanged_pairs'])} unchanged, "
+                       f"{len(run['failed_pairs'])} failed, {len(run['unscheduled_pairs'])} not due pairs"
+                       f"{' (full pass)' if run['full_pass'] else ''}")
+        else:
+            distributors = scraper.scrape_all_distributors(workers=workers)
         
-        if not distributors:
+        if not distributors and not (run and (run['unchanged_pairs'] or run['unscheduled_pairs'])):
             click.echo("❌ No distributors found")
             raise click.Abort()
         
         click.echo(f"✅ Successfully scraped {len(distributors)} distributors")
         
+        # Immutable columnar snapshot of this run (complete runs only)
+        if run is None or (run['full_pass'] and not run['failed_pairs']):
+            from services.snapshot_store import snapshot_run
+            snapshot = snapshot_run(distributors)
+            if snapshot:
+                click.echo(f"📦 Snapshot {snapshot['run_id']} written ({snapshot['rows']} rows)")
+        
         # Process data
         from services.enhanced_data_processor import EnhancedDataProcessor
         
         try:
             processor = EnhancedDataProcessor()
-            processing_results = processor.process_distributors(distributors)
+            processing_results = processor.process_distributors(
+                distributors, excluded_pairs=run['excluded_pairs'] if run else None)
         except Exception as e:
             processing_results = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': [str(e)]}
+        
+        # Watermarks only move once the changed pairs are stored and checked for missing
+        # distributors, so failed runs are retried
+        if run and not processing_results['errors'] and not processing_results.get('missing_errors'):
+            from services.scrape_watermarks import commit_run
+            commit_run(run, scheduler=scheduler)
             
         click.echo(f"📊 Processing results:")
         click.echo(f"  - Created: {processing_results['created']}")
@@ -126,6 +169,15 @@ def scrape(sync_notion: bool, verbose: bool, refresh_mappings: bool):
     except Exception as e:
         click.echo(f"❌ Error during scraping: {str(e)}")
         raise click.Abort()
+    finally:
+        if profiler:
+            profiler.stop()
+            outputs = profiler.write(profile_path)
+            click.echo(f"⏱️  Profile ({profiler.total_seconds:.1f}s total):")
+            for stage in profiler.report()['stages']:
+                click.echo(f"  {'  ' * stage['depth']}{stage['stage'].split('/')[-1]}: "
+                           f"{stage['total_seconds']:.2f}s ({stage['percent']}%, {stage['calls']} calls)")
+            click.echo(f"  Written: {', '.join(outputs.values())}")
 
 @cli.command()
 @click.option('--format', type=click.Choice(['json', 'table', 'csv']), default='table', help='Output format')
@@ -133,8 +185,14 @@ def scrape(sync_notion: bool, verbose: bool, refresh_mappings: bool):
 @click.option('--partner-type', type=click.Choice(['master', 'simple']), help='Filter by partner type')
 @click.option('--active-only', is_flag=True, default=True, help='Only show active distributors')
 @click.option('--limit', type=int, default=50, help='Maximum number of results')
-def list(format: str, region: Optional[str], partner_type: Optional[str], active_only: bool, limit: int):
+@click.option('--as-of', 'as_of', type=click.DateTime(), help='Show the network as it was at this time (UTC)')
+def list(format: str, region: Optional[str], partner_type: Optional[str], active_only: bool, limit: int,
+         as_of: Optional[datetime]):
     """List distributors"""
+    if as_of:
+        _list_as_of(format, region, partner_type, active_only, limit, as_of)
+        return
+    
     try:
         db = SessionLocal()
         try:
@@ -192,6 +250,35 @@ def list(format: str, region: Optional[str], partner_type: Optional[str], active
         click.echo(f"❌ Error listing distributors: {str(e)}")
         raise click.Abort()
 
+def _list_as_of(format: str, region: Optional[str], partner_type: Optional[str], active_only: bool, limit: int,
+                as_of: datetime):
+    """List distributors from the history store as they were at as_of"""
+    from services.history_store import HistoryStore
+    
+    try:
+        states, total = HistoryStore().as_of(as_of, region=region, partner_type=partner_type,
+                                             active_only=active_only, limit=limit)
+    except Exception as e:
+        click.echo(f"❌ Error listing distributors as of {as_of}: {str(e)}")
+        raise click.Abort()
+    
+    if format == 'json':
+        click.echo(json.dumps({'as_of': as_of.isoformat(), 'total': total, 'distributors': states}, indent=2))
+        
+    elif format == 'csv':
+        click.echo("Unifi ID,Company Name,Partner Type,Region,Country/State,Address,Phone,Email,Active")
+        for state in states:
+            click.echo(f"{state['unifi_id']},{state['company_name']},{state['partner_type']},{state['region']},{state['country_state']},{state['address']},{state['phone']},{state['contact_email']},{state['is_active']}")
+            
+    else:  # table format
+        click.echo(f"🕰️ Distributors as of {as_of.isoformat()} UTC")
+        click.echo(f"{'Unifi ID':<9} {'Company Name':<30} {'Type':<8} {'Region':<6} {'State':<8} {'Active':<6}")
+        click.echo("-" * 80)
+        for state in states:
+            click.echo(f"{state['unifi_id'] or 'N/A':<9} {state['company_name'][:29]:<30} {state['partner_type'] or 'N/A':<8} {state['region'] or 'N/A':<6} {state['country_state'] or 'N/A':<8} {'Yes' if state['is_active'] else 'No':<6}")
+        
+        click.echo(f"\nShowing {len(states)} of {total} distributors")
+
 @cli.command()
 @click.argument('distributor_id', type=int)
 def info(distributor_id: int):
@@ -311,8 +398,12 @@ def changes(days: int, limit: int):
             
             for change in changes:
                 date_str = change.detected_at.strftime('%Y-%m-%d')
-                details = "Data updated" if change.change_type == 'updated' else f"Distributor {change.change_type}"
-                click.echo(f"{date_str:<12} {change.change_type:<8} {change.distributor_id or 'N/A':<12} {details:<50}")
+                if change.change_type == 'updated':
+                    changed_fields = decode_change(change)['changed_fields']
+                    details = f"Updated: {', '.join(changed_fields)}" if changed_fields else "Data updated"
+                else:
+                    details = f"Distributor {change.change_type}"
+                click.echo(f"{date_str:<12} {change.change_type:<8} {change.distributor_id or 'N/A':<12} {details[:50]:<50}")
                 
         finally:
             db.close()
@@ -321,6 +412,32 @@ def changes(days: int, limit: int):
         click.echo(f"❌ Error getting changes: {str(e)}")
         raise click.Abort()
 
+@cli.command('compact-changes')
+@click.option('--batch-size', type=int, default=500, help='Distributors re-encoded per commit')
+def compact_changes(batch_size: int):
+    """Re-encode legacy change history rows as compact deltas"""
+    from services.change_codec import compact_legacy_changes
+    
+    try:
+        db = SessionLocal()
+        try:
+            click.echo("🗜️  Compacting legacy change history...")
+            result = compact_legacy_changes(db, batch_size=batch_size)
+        finally:
+            db.close()
+        
+        if not result['rows']:
+            click.echo("✅ No legacy change rows left")
+            return
+        
+        saved = result['bytes_before'] - result['bytes_after']
+        click.echo(f"✅ Re-encoded {result['rows']} changes for {result['distributors']} distributors")
+        click.echo(f"   {result['bytes_before']:,} -> {result['bytes_after']:,} bytes ({saved:,} saved)")
+        
+    except Exception as e:
+        click.echo(f"❌ Error compacting changes: {str(e)}")
+        raise click.Abort()
+
 @cli.group()
 def mapping():
     """Region mapping management commands"""
@@ -423,14 +540,25 @@ def test_combination():
         raise click.Abort()
 
 @mapping.command()
-def discover():
+@click.option('--exploratory', is_flag=True,
+              help='Skip website extraction and probe candidate pairs directly (cached results are reused)')
+def discover(exploratory: bool):
     """Discover and add new region mappings"""
     try:
         click.echo("🔍 Starting comprehensive mapping discovery...")
-        click.echo("⚠️  This may take several minutes...")
         
         manager = RegionMappingManager()
         
+        if exploratory:
+            from services.region_discovery import RegionDiscovery
+            discovered = RegionDiscovery(db_path=manager.db_path).discover()
+            if not discovered:
+                click.echo("❌ Discovery failed: no pairs with distributors found")
+                raise click.Abort()
+            new_count, updated_count = manager.update_mappings_in_database(discovered)
+            click.echo(f"📊 Database updated: {new_count} new, {updated_count} updated mappings")
+            return
+        
         # 首先尝试从网站提取
         website_mappings = manager.extract_mappings_from_website()
         
@@ -454,6 +582,69 @@ def discover():
         click.echo(f"❌ Error during discovery: {str(e)}")
         raise click.Abort()
 
+@cli.group()
+def snapshot():
+    """Scrape run snapshots (Parquet)"""
+    pass
+
+@snapshot.command('list')
+def snapshot_list():
+    """List recorded scrape runs"""
+    from services.snapshot_store import SnapshotStore
+    
+    runs = SnapshotStore().list_runs()
+    if not runs:
+        click.echo("No snapshots recorded")
+        return
+    
+    click.echo(f"{'Run ID':<36} {'Run at':<27} {'Rows':>8}  Regions")
+    click.echo("-" * 90)
+    for run in runs:
+        click.echo(f"{run['run_id']:<36} {run['run_at']:<27} {run['rows']:>8}  {', '.join(sorted(run['regions']))}")
+
+@snapshot.command('diff')
+@click.argument('old_run_id')
+@click.argument('new_run_id')
+@click.option('--region', multiple=True, help='Limit to region(s)')
+@click.option('--limit', type=int, default=20, help='Maximum rows to show per section')
+def snapshot_diff(old_run_id: str, new_run_id: str, region: tuple, limit: int):
+    """Show distributors added, removed and changed between two runs"""
+    from services.snapshot_store import SnapshotStore
+    
+    try:
+        diff = SnapshotStore().diff(old_run_id, new_run_id, regions=region or None)
+    except (KeyError, RuntimeError) as e:
+        click.echo(f"❌ {str(e)}")
+        raise click.Abort()
+    
+    summary = diff['summary']
+    click.echo(f"📊 {old_run_id} -> {new_run_id}: +{summary['added']} / -{summary['removed']} / ~{summary['changed']}")
+    for row in diff['added'][:limit]:
+        click.echo(f"  + {row['company_name']} ({row['region']}-{row['country_state']}, id {row['unifi_id']})")
+    for row in diff['removed'][:limit]:
+        click.echo(f"  - {row['company_name']} ({row['region']}-{row['country_state']}, id {row['unifi_id']})")
+    for row in diff['changed'][:limit]:
+        click.echo(f"  ~ {row['company_name']}: {', '.join(sorted(row['fields']))}")
+
+@cli.command('scrape-schedule')
+@click.option('--limit', type=int, default=20, help='Maximum pairs to show')
+def scrape_schedule(limit: int):
+    """Show per-pair churn rates and revisit times of scheduled incremental scrapes"""
+    from services.pair_scheduler import PairScheduler
+    
+    scheduler = PairScheduler()
+    schedule = scheduler.get_schedule()
+    if not schedule:
+        click.echo("No pairs scheduled yet (run: python -m cli scrape --incremental --scheduled)")
+        return
+    
+    click.echo(f"🗓️ {len(schedule)} pairs, {scheduler.requests_last_day()} of {scheduler.daily_budget} requests used in the last 24h")
+    click.echo(f"{'Pair':<20} {'Changes/day':>11} {'Checks':>7} {'Changes':>8}  {'Next due':<26}")
+    click.echo("-" * 78)
+    for row in schedule[:limit]:
+        pair = f"{row['region']}-{row['country_state']}"
+        click.echo(f"{pair:<20} {row['changes_per_day']:>11.3f} {row['checks']:>7} {row['changes']:>8}  {row['next_due_at'] or '-':<26}")
+
 @cli.group()
 def notion():
     """Notion integration commands"""
@@ -654,42 +845,120 @@ def health():
     try:
         click.echo("🔍 Checking system health...")
         
-        # Database check
-        try:
-            db = SessionLocal()
-            db.execute("SELECT 1")
-            db.close()
-            click.echo("✅ Database: OK")
-        except Exception as e:
-            click.echo(f"❌ Database: FAILED - {str(e)}")
-        
-        # Notion check
-        try:
-            if settings.notion_token:
-                notion = NotionIntegration()
-                if notion.test_connection():
-                    click.echo("✅ Notion: OK")
-                else:
-                    click.echo("❌ Notion: FAILED")
+        from services.health_monitor import HealthMonitor
+        results = HealthMonitor().run_once()
+        
+        labels = {
+            'database': 'Database',
+            'external_api': 'External API',
+            'notion': 'Notion',
+            'system': 'System'
+        }
+        
+        for name, result in results.items():
+            label = labels.get(name, name)
+            latency = f" ({result.latency_ms:.0f} ms)" if result.latency_ms is not None else ""
+            if result.status == 'healthy':
+                click.echo(f"✅ {label}: OK{latency}")
+            elif result.status == 'not_configured':
+                click.echo(f"⚠️  {label}: Not configured")
             else:
-                click.echo("⚠️  Notion: Not configured")
-        except Exception as e:
-            click.echo(f"❌ Notion: ERROR - {str(e)}")
-        
-        # External API check
-        try:
-            import requests
-            response = requests.get(settings.unifi_distributors_url, timeout=10)
-            if response.status_code == 200:
-                click.echo("✅ External API: OK")
-            else:
-                click.echo(f"⚠️  External API: Status {response.status_code}")
-        except Exception as e:
-            click.echo(f"❌ External API: FAILED - {str(e)}")
+                click.echo(f"❌ {label}: FAILED{latency} - {result.error or result.details}")
             
     except Exception as e:
         click.echo(f"❌ Error checking health: {str(e)}")
         raise click.Abort()
 
+@cli.command()
+@click.option('--sizes', default='1k,10k', show_default=True,
+              help='Comma-separated distributor counts: 1k, 10k, 100k, 1m or plain integers')
+@click.option('--stages', help='Comma-separated optional stages to run: reprocess, export, analytics (default: all)')
+@click.option('--output', type=click.Path(dir_okay=False), default='bench_results.json', show_default=True,
+              help='Where to write the results JSON')
+@click.option('--compare', 'compare_path', type=click.Path(exists=True, dir_okay=False),
+              help='Baseline results JSON (from another commit) to compare against')
+@click.option('--max-regression', type=float, help='Exit non-zero if any stage is this many percent slower than the baseline')
+@click.option('--seed', type=int, default=42, show_default=True, help='Synthetic data seed')
+@click.option('--work-dir', type=click.Path(file_okay=False), help='Keep generated databases and exports here')
+@click.option('--scrape-workers', type=int, default=1, show_default=True,
+              help='Worker processes for the scrape stage (sharded scraping)')
+def bench(sizes: str, stages: Optional[str], output: str, compare_path: Optional[str],
+          max_regression: Optional[float], seed: int, work_dir: Optional[str], scrape_workers: int):
+    """Benchmark scrape, process, export and analytics on synthetic data"""
+    from services.benchmark import BenchmarkRunner, parse_sizes, compare_results
+
+    try:
+        stage_list = [stage.strip() for stage in stages.split(',')] if stages else None
+        runner = BenchmarkRunner(seed=seed, stages=stage_list, work_dir=work_dir,
+                                 scrape_workers=scrape_workers)
+        size_list = parse_sizes(sizes)
+    except (KeyError, ValueError) as e:
+        click.echo(f"❌ Invalid benchmark options: {str(e)}")
+        raise click.Abort()
+
+    results = runner.run(size_list)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    click.echo(f"🏁 Benchmark results ({results['commit'] or 'unknown commit'}{' + local changes' if results['dirty'] else ''}):")
+    for run in results['runs']:
+        click.echo(f"  {run['size']:,} distributors (peak RSS {run['peak_rss_mb']} MB):")
+        for stage, timing in run['stages'].items():
+            rate = f", {timing['items_per_second']:,.0f}/s" if timing.get('items_per_second') else ""
+            click.echo(f"    {stage:<10} {timing['seconds']:>9.2f}s{rate}")
+    click.echo(f"📄 Written to {output}")
+
+    if compare_path:
+        with open(compare_path, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare_results(baseline, results, max_regression)
+
+        click.echo(f"\n📊 Compared with {baseline.get('commit') or compare_path}:")
+        for row in rows:
+            marker = "❌" if row['regression'] else ("✅" if row['change_pct'] <= 0 else "  ")
+            click.echo(f"  {marker} {row['size']:>9,} {row['stage']:<10} {row['baseline_seconds']:>9.2f}s -> "
+                       f"{row['current_seconds']:>9.2f}s ({row['change_pct']:+.1f}%)")
+
+        if any(row['regression'] for row in rows):
+            click.echo(f"❌ Regression above {max_regression}% detected")
+            raise SystemExit(1)
+
+@cli.command('load-postgres')
+@click.option('--database-url', default=None,
+              help='PostgreSQL URL (default: DATABASE_URL), e.g. the docker-compose postgres on localhost:5432')
+@click.option('--synthetic', 'size', type=int, default=5000, show_default=True, help='Synthetic distributors per load')
+@click.option('--seed', type=int, default=42, show_default=True, help='Synthetic data seed')
+@click.option('--runs', type=int, default=2, show_default=True,
+              help='Load the same data this many times (later runs should come back unchanged)')
+@click.option('--deactivate-missing', is_flag=True, help='Deactivate distributors missing from each load')
+def load_postgres(database_url: Optional[str], size: int, seed: int, runs: int, deactivate_missing: bool):
+    """Exercise the PostgreSQL COPY loader with synthetic data"""
+    from sqlalchemy import create_engine
+    from models.database import Base
+    from services.distributor_scraper import JsonDistributorScraper
+    from services.pg_loader import PostgresBulkLoader
+    from services.synthetic_data import SyntheticDataGenerator
+
+    database_url = database_url or settings.database_url
+    if not database_url.startswith('postgres'):
+        click.echo(f"❌ Not a PostgreSQL URL: {database_url}")
+        raise click.Abort()
+
+    engine = create_engine(database_url, pool_pre_ping=True)
+    Base.metadata.create_all(bind=engine)
+
+    scraper = JsonDistributorScraper(use_dynamic_mapping=False, request_delay=0)
+    distributors = []
+    for region, country_state, payload in SyntheticDataGenerator(size, seed=seed).iter_payloads():
+        distributors.extend(scraper.parse_json_response(payload, region, country_state))
+    click.echo(f"🧪 Generated {len(distributors):,} synthetic records")
+
+    loader = PostgresBulkLoader(engine)
+    for run in range(1, runs + 1):
+        started = datetime.now()
+        results = loader.load(distributors, deactivate_missing=deactivate_missing)
+        elapsed = (datetime.now() - started).total_seconds()
+        click.echo(f"🐘 Run {run} ({elapsed:.2f}s): " + ", ".join(f"{key} {value}" for key, value in results.items()))
+
 if __name__ == '__main__':
     cli()
\ No newline at end of file
@@ -1,8 +1,9 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 from models.database import Base
 from config.settings import settings
+from config.sqlite import apply_pragmas
 from typing import Generator
 
 def get_database_url() -> str:
@@ -11,13 +12,20 @@ def get_database_url() -> str:
 
 # Create engine
 if settings.database_url.startswith("sqlite"):
-    # SQLite specific configuration
+    # SQLite specific configuration: a pooled connection per thread on file databases
+    # (WAL lets them read while the scraper writes); in-memory databases need one shared connection
+    in_memory = settings.database_url in ("sqlite://", "sqlite:///:memory:")
     engine = create_engine(
         settings.database_url,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
+        connect_args={"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000},
+        **({"poolclass": StaticPool} if in_memory else {}),
         echo=False
     )
+    
+    @event.listens_for(engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        if not in_memory:
+            apply_pragmas(dbapi_connection)
 else:
     # PostgreSQL configuration
     engine = create_engine(
@@ -33,6 +41,33 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 def create_tables():
     """Create all database tables"""
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    add_missing_indexes()
+
+def add_missing_columns():
+    """Add model columns missing from existing tables (additive upgrades such as change_history.payload)"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+def add_missing_indexes():
+    """Create model indexes missing from existing tables (e.g. partial indexes added later)"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=conn)
 
 def get_db() -> Generator[Session, None, None]:
     """Dependency to get database session"""
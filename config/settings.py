@@ -28,6 +28,26 @@ class Settings(BaseSettings):
     # Scraping Configuration
     scraping_interval_hours: int = int(os.getenv("SCRAPING_INTERVAL_HOURS", "24"))
     user_agent: str = os.getenv("USER_AGENT", "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36")
+    # Worker processes for a full scrape (1 = serial); the request rate is shared across them
+    scrape_workers: int = int(os.getenv("SCRAPE_WORKERS", "1"))
+    # Incremental scrapes only process pairs whose counts / newest last_modified moved;
+    # every pair is re-processed once per full pass interval
+    scrape_incremental: bool = os.getenv("SCRAPE_INCREMENTAL", "false").lower() == "true"
+    scrape_full_pass_hours: float = float(os.getenv("SCRAPE_FULL_PASS_HOURS", "168"))
+    # Churn-aware scheduling of incremental scrapes: hot pairs are revisited often, cold ones
+    # rarely, within a total request budget per day
+    scrape_scheduled: bool = os.getenv("SCRAPE_SCHEDULED", "false").lower() == "true"
+    scrape_daily_request_budget: int = int(os.getenv("SCRAPE_DAILY_REQUEST_BUDGET", "400"))
+    scrape_min_revisit_hours: float = float(os.getenv("SCRAPE_MIN_REVISIT_HOURS", "6"))
+    scrape_max_revisit_days: float = float(os.getenv("SCRAPE_MAX_REVISIT_DAYS", "14"))
+    # Exploratory region discovery: probe pool size, shared request rate, and how long
+    # empty (region, code) probe results are trusted
+    region_discovery_workers: int = int(os.getenv("REGION_DISCOVERY_WORKERS", "8"))
+    region_discovery_rps: float = float(os.getenv("REGION_DISCOVERY_RPS", "10"))
+    region_discovery_negative_ttl_days: float = float(os.getenv("REGION_DISCOVERY_NEGATIVE_TTL_DAYS", "30"))
+    # Active region mappings are cached per process; a refresh in this process invalidates
+    # the cache at once, one in another process (CLI vs API) after at most this long
+    region_mapping_cache_seconds: float = float(os.getenv("REGION_MAPPING_CACHE_SECONDS", "300"))
     
     # API Configuration
     api_host: str = os.getenv("API_HOST", "0.0.0.0")
@@ -49,6 +69,35 @@ class Settings(BaseSettings):
     # Rate Limiting
     requests_per_minute: int = int(os.getenv("REQUESTS_PER_MINUTE", "60"))
     
+    # Background Sync Jobs
+    sync_worker_count: int = int(os.getenv("SYNC_WORKER_COUNT", "1"))
+    sync_job_history_limit: int = int(os.getenv("SYNC_JOB_HISTORY_LIMIT", "50"))
+    
+    # Health Monitoring
+    health_check_interval_seconds: int = int(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "30"))
+    health_check_timeout_seconds: int = int(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "10"))
+    health_stale_after_seconds: int = int(os.getenv("HEALTH_STALE_AFTER_SECONDS", "120"))
+    
+    # Scrape Snapshots (Parquet, requires pyarrow)
+    snapshot_enabled: bool = os.getenv("SNAPSHOT_ENABLED", "true").lower() == "true"
+    snapshot_dir: str = os.getenv("SNAPSHOT_DIR", "data/snapshots")
+    
+    # Distributor History (as-of queries: checkpoints + change log)
+    history_enabled: bool = os.getenv("HISTORY_ENABLED", "true").lower() == "true"
+    history_checkpoint_interval_hours: float = float(os.getenv("HISTORY_CHECKPOINT_INTERVAL_HOURS", "168"))
+    history_checkpoint_max_changes: int = int(os.getenv("HISTORY_CHECKPOINT_MAX_CHANGES", "50000"))
+    
+    # Change History Encoding (field-level deltas + periodic full snapshots)
+    change_history_compression: str = os.getenv("CHANGE_HISTORY_COMPRESSION", "zlib")  # none, zlib, zstd
+    change_history_snapshot_every: int = int(os.getenv("CHANGE_HISTORY_SNAPSHOT_EVERY", "20"))
+    change_rollup_batch_size: int = int(os.getenv("CHANGE_ROLLUP_BATCH_SIZE", "1000"))
+    
+    # SQLite Tuning (applied to every connection, see config/sqlite.py)
+    sqlite_synchronous: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    sqlite_busy_timeout_ms: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    sqlite_mmap_size_mb: int = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+    sqlite_cache_size_mb: int = int(os.getenv("SQLITE_CACHE_SIZE_MB", "64"))
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
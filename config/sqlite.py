@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+SQLite Connection Management
+One tuning profile (WAL, synchronous=NORMAL, mmap, page cache, busy timeout) for
+every raw sqlite3 connection and for the SQLAlchemy engine. Per database file,
+each thread gets its own read connection and all writes go through a single
+writer connection guarded by a lock, so the scraper can write while the API
+keeps reading without "database is locked" stalls.
+
+Usage:
+    manager = get_connection_manager("unifi_distributors.db")
+    conn = manager.reader()      # thread-local, query_only; close() is a no-op
+    conn = manager.writer()      # the shared writer; close() rolls back and releases it
+    with manager.writer() as conn:
+        ...                      # committed on success, rolled back on error
+
+The writer is re-entrant. Only the outermost holder commits: a nested writer()
+scope runs inside a SAVEPOINT, so its commit() / leaving its with block
+releases the savepoint into the outer transaction and its rollback() undoes
+only its own work.
+"""
+
+import sqlite3
+import threading
+from typing import Dict, Optional
+from config.settings import settings
+
+
+# Local database file used when DATABASE_URL does not point at SQLite (Postgres deployments
+# keep the SQLite-only stores - as-of history, region mappings - in this file)
+DEFAULT_DB_PATH = "unifi_distributors.db"
+
+
+def database_path(database_url: Optional[str] = None) -> str:
+    """SQLite file behind DATABASE_URL, so raw sqlite3 and SQLAlchemy share one database"""
+    url = database_url or settings.database_url
+    if not url.startswith("sqlite"):
+        return DEFAULT_DB_PATH
+    path = url.split(":///", 1)[1] if ":///" in url else ""
+    return path or ":memory:"
+
+
+def tuning_pragmas() -> Dict[str, object]:
+    """Per-connection pragmas from settings (journal_mode=WAL persists in the file)"""
+    return {
+        'journal_mode': 'WAL',
+        'synchronous': settings.sqlite_synchronous,
+        'busy_timeout': settings.sqlite_busy_timeout_ms,
+        'mmap_size': settings.sqlite_mmap_size_mb * 1024 * 1024,
+        # Negative cache_size is in KiB rather than pages
+        'cache_size': -settings.sqlite_cache_size_mb * 1024,
+        'temp_store': 'MEMORY'
+    }
+
+
+def apply_pragmas(conn):
+    """Apply the tuning profile to a DB-API connection (sqlite3 or SQLAlchemy's raw connection)"""
+    cursor = conn.cursor()
+    try:
+        for name, value in tuning_pragmas().items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+
+def connect(db_path: str, **kwargs) -> sqlite3.Connection:
+    """A new sqlite3 connection with the tuning profile applied"""
+    conn = sqlite3.connect(db_path, timeout=settings.sqlite_busy_timeout_ms / 1000, **kwargs)
+    apply_pragmas(conn)
+    return conn
+
+
+class ManagedConnection:
+    """sqlite3 connection handed out by the manager
+
+    Behaves like the wrapped connection (cursor(), execute(), commit(), ...);
+    close() hands it back to the manager instead of closing it. A nested writer
+    scope carries a savepoint: commit() and rollback() then apply to the
+    savepoint only, and the outermost holder decides the transaction.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, release, savepoint: Optional[str] = None):
+        self._conn = conn
+        self._release = release
+        self._savepoint = savepoint
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def commit(self):
+        if self._savepoint is None:
+            self._conn.commit()
+        else:
+            # Keep the work in the outer transaction and open a fresh savepoint for what follows
+            self._conn.execute(f"RELEASE {self._savepoint}")
+            self._conn.execute(f"SAVEPOINT {self._savepoint}")
+
+    def rollback(self):
+        if self._savepoint is None:
+            self._conn.rollback()
+        else:
+            self._conn.execute(f"ROLLBACK TO {self._savepoint}")
+
+    def close(self):
+        if self._release is not None:
+            release, self._release = self._release, None
+            try:
+                if self._savepoint is not None:
+                    self._conn.execute(f"RELEASE {self._savepoint}")
+            except sqlite3.Error:
+                # The whole transaction was already rolled back (e.g. SQLITE_FULL); nothing to release
+                pass
+            finally:
+                release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        except sqlite3.Error:
+            if exc_type is None:
+                raise
+        finally:
+            self.close()
+        return False
+
+
+class SQLiteConnectionManager:
+    """Thread-local readers and a single locked writer for one database file"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        # Re-entrant so a writer holder can call code that asks for the writer again
+        self._write_lock = threading.RLock()
+        self._write_depth = 0
+        self._writer = None
+
+    def reader(self) -> ManagedConnection:
+        """This thread's read-only connection (opened on first use, kept for the thread's lifetime)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = connect(self.db_path)
+            conn.execute("PRAGMA query_only = 1")
+            self._local.conn = conn
+        return ManagedConnection(conn, release=lambda: None)
+
+    def writer(self) -> ManagedConnection:
+        """The writer connection; blocks while another thread holds it
+
+        close() (or leaving the with block) releases it. Work not committed by
+        then is rolled back once the outermost holder releases. Nested holders
+        get a savepoint inside the outer transaction (see ManagedConnection).
+        """
+        self._write_lock.acquire()
+        try:
+            if self._writer is None:
+                self._writer = connect(self.db_path, check_same_thread=False)
+            savepoint = None
+            if self._write_depth:
+                savepoint = f"writer_{self._write_depth}"
+                # Inside an explicit transaction, so releasing the savepoint never commits on its own
+                if not self._writer.in_transaction:
+                    self._writer.execute("BEGIN")
+                self._writer.execute(f"SAVEPOINT {savepoint}")
+            self._write_depth += 1
+        except Exception:
+            self._write_lock.release()
+            raise
+        return ManagedConnection(self._writer, release=self._release_writer, savepoint=savepoint)
+
+    def _release_writer(self):
+        try:
+            self._write_depth -= 1
+            if self._write_depth == 0 and self._writer.in_transaction:
+                self._writer.rollback()
+        finally:
+            self._write_lock.release()
+
+    def close(self):
+        """Close the writer and this thread's reader"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+_managers: Dict[str, SQLiteConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path: Optional[str] = None) -> SQLiteConnectionManager:
+    """Process-wide manager for a database file (default: the one behind DATABASE_URL)"""
+    db_path = db_path or database_path()
+    with _managers_lock:
+        manager = _managers.get(db_path)
+        if manager is None:
+            manager = _managers[db_path] = SQLiteConnectionManager(db_path)
+        return manager
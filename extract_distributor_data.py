@@ -3,10 +3,11 @@
 提取分销商数据从SQLite数据库并生成JSON文件供前端使用
 """
 
-import sqlite3
 import json
 import re
 from datetime import datetime
+from services.profiling import span, timed
+from config.sqlite import get_connection_manager
 
 # 地区映射字典 - 基于地址和国家信息进行智能映射
 REGION_MAPPING = {
@@ -119,12 +120,13 @@ def get_region_display_name(region_code):
     }
     return region_names.get(region_code, region_code)
 
-def extract_distributor_data():
+@timed('export_distributors')
+def extract_distributor_data(db_path=None, output_file='frontend/public/data/distributors.json'):
     """从数据库提取分销商数据"""
     
     try:
         # 连接数据库
-        conn = sqlite3.connect('unifi_distributors.db')
+        conn = get_connection_manager(db_path).reader()  # 默认使用 DATABASE_URL 指向的数据库
         cursor = conn.cursor()
         
         # 查询所有活跃的分销商 - 直接使用数据库中已正确映射的地区信息
@@ -150,8 +152,9 @@ def extract_distributor_data():
         ORDER BY d.id
         '''
         
-        cursor.execute(query)
-        distributors = cursor.fetchall()
+        with span('query'):
+            cursor.execute(query)
+            distributors = cursor.fetchall()
         
         print(f"找到 {len(distributors)} 个活跃分销商")
         
@@ -318,8 +321,7 @@ def extract_distributor_data():
         frontend_data['data']['topCountries'] = all_locations[:10]
         
         # 保存到JSON文件
-        output_file = 'frontend/public/data/distributors.json'
-        with open(output_file, 'w', encoding='utf-8') as f:
+        with span('write_json'), open(output_file, 'w', encoding='utf-8') as f:
             json.dump(frontend_data, f, ensure_ascii=False, indent=2)
         
         print(f"数据已保存到: {output_file}")
@@ -339,8 +341,6 @@ def extract_distributor_data():
         for region_code, region_data in frontend_data['data']['regions'].items():
             print(f"  {region_data['name']} ({region_code}): {region_data['count']} 个, 坐标 {region_data['coordinates']}")
         
-        return frontend_data
-        
         conn.close()
         return frontend_data
         
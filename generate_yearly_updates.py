@@ -5,10 +5,11 @@
 包含地区级别和国家级别数据，正确处理美国各州和加拿大各省映射
 """
 
-import sqlite3
 import json
 from datetime import datetime
 import os
+from services.profiling import span, timed
+from config.sqlite import database_path, get_connection_manager
 
 # 美国各州代码
 USA_STATES = {'CA', 'FL', 'IL', 'NY', 'OH', 'TX', 'PA', 'MD', 'MO', 'OR', 'NJ', 'NC', 'SC'}
@@ -36,16 +37,17 @@ def map_country_code(country_code, region):
     # 其他情况返回原始代码
     return country_code
 
-def generate_yearly_channel_updates():
+@timed('export_yearly_updates')
+def generate_yearly_channel_updates(db_path=None, output_path=None):
     """从数据库生成年度渠道更新数据"""
     
     # 数据库路径
-    db_path = os.path.join(os.path.dirname(__file__), 'unifi_distributors.db')
-    output_path = os.path.join(os.path.dirname(__file__), 'frontend/public/data/yearly-channel-updates.json')
+    db_path = db_path or database_path()
+    output_path = output_path or os.path.join(os.path.dirname(__file__), 'frontend/public/data/yearly-channel-updates.json')
     
     try:
         # 连接数据库
-        conn = sqlite3.connect(db_path)
+        conn = get_connection_manager(db_path).reader()
         cursor = conn.cursor()
         
         # 查询年度地区数据
@@ -59,8 +61,9 @@ def generate_yearly_channel_updates():
         ORDER BY year, region
         """
         
-        cursor.execute(region_query)
-        region_results = cursor.fetchall()
+        with span('query'):
+            cursor.execute(region_query)
+            region_results = cursor.fetchall()
         
         # 查询年度国家数据（原始数据）
         country_query = """
@@ -74,8 +77,9 @@ def generate_yearly_channel_updates():
         ORDER BY year, country_state
         """
         
-        cursor.execute(country_query)
-        country_results = cursor.fetchall()
+        with span('query'):
+            cursor.execute(country_query)
+            country_results = cursor.fetchall()
         
         # 查询年度总数
         total_query = """
@@ -87,8 +91,9 @@ def generate_yearly_channel_updates():
         ORDER BY year
         """
         
-        cursor.execute(total_query)
-        totals = dict(cursor.fetchall())
+        with span('query'):
+            cursor.execute(total_query)
+            totals = dict(cursor.fetchall())
         
         # 处理地区数据
         yearly_region_data = {}
@@ -202,7 +207,7 @@ def generate_yearly_channel_updates():
         output_data = {
             "success": True,
             "timestamp": datetime.now().isoformat() + "Z",
-            "source": "unifi_distributors.db",
+            "source": os.path.basename(db_path),
             "queries": {
                 "regions": region_query.strip(),
                 "countries": country_query.strip()
@@ -239,7 +244,7 @@ def generate_yearly_channel_updates():
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         
         # 写入JSON文件
-        with open(output_path, 'w', encoding='utf-8') as f:
+        with span('write_json'), open(output_path, 'w', encoding='utf-8') as f:
             json.dump(output_data, f, indent=2, ensure_ascii=False)
         
         print(f"✅ 年度渠道更新数据已生成: {output_path}")
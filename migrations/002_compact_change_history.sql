@@ -0,0 +1,22 @@
+-- ====================================================================
+-- Compact Change History Migration
+-- 变更历史压缩编码迁移脚本
+--
+-- New rows store only the changed fields (field-level delta) with a
+-- periodic full snapshot per distributor, optionally zlib/zstd
+-- compressed, in change_history.payload. encoding records the format
+-- ('full' / 'delta', optionally '+zlib' / '+zstd'); NULL marks legacy
+-- rows that still use old_data / new_data.
+--
+-- Existing rows can be re-encoded afterwards with:
+--   python cli.py compact-changes
+-- ====================================================================
+
+ALTER TABLE change_history ADD COLUMN IF NOT EXISTS encoding VARCHAR(20);
+ALTER TABLE change_history ADD COLUMN IF NOT EXISTS payload BYTEA;
+
+-- Latest full snapshot lookup per distributor
+CREATE INDEX IF NOT EXISTS idx_change_distributor_encoding ON change_history(distributor_id, encoding);
+
+-- Legacy rows awaiting re-encoding
+CREATE INDEX IF NOT EXISTS idx_change_legacy ON change_history(distributor_id) WHERE encoding IS NULL;
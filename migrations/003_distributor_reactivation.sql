@@ -0,0 +1,10 @@
+-- ====================================================================
+-- Distributor Reactivation Migration
+-- 分销商重新激活追踪迁移脚本
+--
+-- deactivated_at / reactivated_at record when a distributor last
+-- disappeared from the scrape and when it came back.
+-- ====================================================================
+
+ALTER TABLE distributors ADD COLUMN IF NOT EXISTS deactivated_at TIMESTAMP;
+ALTER TABLE distributors ADD COLUMN IF NOT EXISTS reactivated_at TIMESTAMP;
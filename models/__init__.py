@@ -1,4 +1,7 @@
-from .database import Base, Company, Distributor, ChangeHistory
+from .database import (
+    Base, Company, Distributor, ChangeHistory, ChangeHistoryRollup,
+    ChannelMonitoringSession, ChannelLifecycleEvent
+)
 from .schemas import *
 
 __all__ = [
@@ -6,6 +9,9 @@ __all__ = [
     'Company',
     'Distributor', 
     'ChangeHistory',
+    'ChangeHistoryRollup',
+    'ChannelMonitoringSession',
+    'ChannelLifecycleEvent',
     'CompanyBase',
     'CompanyCreate',
     'CompanyUpdate',
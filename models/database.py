@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Index, LargeBinary
 from sqlalchemy.types import Numeric
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
@@ -51,6 +51,12 @@ class Distributor(Base):
     sunmax_partner = Column(Boolean, default=False)  # SunMax partnership status
     data_source = Column(String(20), default="json_api")  # Data source tracking
     scraped_at = Column(DateTime)  # When data was scraped
+    first_discovered_at = Column(DateTime)  # First time the ingest saw this distributor
+    last_verified_at = Column(DateTime)  # Last scrape that still listed it
+    deactivated_at = Column(DateTime)  # When it last disappeared from the scrape
+    reactivated_at = Column(DateTime)  # When it last came back after being deactivated
+    full_country_name = Column(String(100))  # Display name for country_state
+    city = Column(String(100))
     
     # Notion integration fields
     notion_page_id = Column(Text)  # Store Notion page ID for direct access
@@ -88,8 +94,10 @@ class ChangeHistory(Base):
     id = Column(Integer, primary_key=True)
     distributor_id = Column(Integer, ForeignKey('distributors.id'), nullable=True)
     change_type = Column(String(20), nullable=False)  # 'created', 'updated', 'deleted'
-    old_data = Column(Text)  # JSON string
-    new_data = Column(Text)  # JSON string
+    old_data = Column(Text)  # JSON string (legacy rows)
+    new_data = Column(Text)  # JSON string (legacy rows)
+    encoding = Column(String(20))  # 'full' / 'delta' [+zlib|+zstd], NULL for legacy rows
+    payload = Column(LargeBinary)  # see services.change_codec
     detected_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -100,7 +108,101 @@ class ChangeHistory(Base):
         Index('idx_change_distributor', 'distributor_id'),
         Index('idx_change_type', 'change_type'),
         Index('idx_change_date', 'detected_at'),
+        Index('idx_change_distributor_encoding', 'distributor_id', 'encoding'),
+    )
+    
+    def __repr__(self):
+        return f"<ChangeHistory(id={self.id}, type='{self.change_type}', detected_at={self.detected_at})>"
+
+class ChangeHistoryRollup(Base):
+    """Per-distributor, per-month summary of change_history rows that aged out of retention"""
+    __tablename__ = 'change_history_rollups'
+    
+    id = Column(Integer, primary_key=True)
+    distributor_id = Column(Integer, ForeignKey('distributors.id'), nullable=True)
+    month = Column(String(7), nullable=False)  # 'YYYY-MM'
+    created_count = Column(Integer, default=0, nullable=False)
+    updated_count = Column(Integer, default=0, nullable=False)
+    deleted_count = Column(Integer, default=0, nullable=False)
+    first_change_at = Column(DateTime)
+    last_change_at = Column(DateTime)
+    field_counts = Column(Text)  # JSON {field: number of changes}
+    first_values = Column(Text)  # JSON {field: value before the month's first change}
+    last_values = Column(Text)  # JSON {field: value after the month's last change}
+    compacted_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_rollup_distributor_month', 'distributor_id', 'month', unique=True),
+        Index('idx_rollup_month', 'month'),
+    )
+    
+    @property
+    def total_changes(self) -> int:
+        return (self.created_count or 0) + (self.updated_count or 0) + (self.deleted_count or 0)
+    
+    def __repr__(self):
+        return f"<ChangeHistoryRollup(distributor_id={self.distributor_id}, month='{self.month}', changes={self.total_changes})>"
+
+class ChannelMonitoringSession(Base):
+    """One processing run of scraped data, with lifecycle totals"""
+    __tablename__ = 'channel_monitoring_sessions'
+    
+    id = Column(Integer, primary_key=True)
+    session_start = Column(DateTime, default=datetime.utcnow)
+    session_end = Column(DateTime)
+    total_found = Column(Integer, default=0)
+    new_channels = Column(Integer, default=0)
+    updated_channels = Column(Integer, default=0)
+    deactivated_channels = Column(Integer, default=0)
+    reactivated_channels = Column(Integer, default=0)
+    status = Column(String(20), default='running')  # 'running', 'completed', 'failed'
+    error_message = Column(Text)
+    data_source = Column(String(50), default='api_scraping')
+    session_metadata = Column('metadata', Text)  # JSON string
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    events = relationship("ChannelLifecycleEvent", back_populates="session")
+    
+    # Indexes
+    __table_args__ = (
+        Index('idx_sessions_status', 'status'),
+        Index('idx_sessions_start', 'session_start'),
+    )
+    
+    def __repr__(self):
+        return f"<ChannelMonitoringSession(id={self.id}, status='{self.status}', total_found={self.total_found})>"
+
+class ChannelLifecycleEvent(Base):
+    """A distributor being discovered, updated, deactivated or reactivated"""
+    __tablename__ = 'channel_lifecycle_events'
+    
+    id = Column(Integer, primary_key=True)
+    distributor_id = Column(Integer, ForeignKey('distributors.id'), nullable=True)
+    unifi_id = Column(Integer)  # denormalized for lookups
+    event_type = Column(String(20), nullable=False)  # 'discovered', 'updated', 'deactivated', 'reactivated'
+    event_data = Column(Text)  # JSON string
+    old_data = Column(Text)  # JSON string
+    new_data = Column(Text)  # JSON string
+    session_id = Column(Integer, ForeignKey('channel_monitoring_sessions.id'), nullable=True)
+    significance_score = Column(Numeric(3, 2), default=0.50)
+    region = Column(String(50))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    session = relationship("ChannelMonitoringSession", back_populates="events")
+    
+    # Indexes (keyset paging walks id descending, optionally per event type / region)
+    __table_args__ = (
+        Index('idx_lifecycle_distributor', 'distributor_id'),
+        Index('idx_lifecycle_unifi_id', 'unifi_id'),
+        Index('idx_lifecycle_type_id', 'event_type', 'id'),
+        Index('idx_lifecycle_region_id', 'region', 'id'),
+        Index('idx_lifecycle_session', 'session_id'),
+        Index('idx_lifecycle_created', 'created_at'),
     )
     
     def __repr__(self):
-        return f"<ChangeHistory(id={self.id}, type='{self.change_type}', detected_at={self.detected_at})>"
\ No newline at end of file
+        return f"<ChannelLifecycleEvent(id={self.id}, type='{self.event_type}', unifi_id={self.unifi_id})>"
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl, EmailStr, Field, validator
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 from decimal import Decimal
 
@@ -51,6 +51,8 @@ class DistributorResponse(DistributorBase):
     id: int
     company_id: int
     company: CompanyResponse
+    deactivated_at: Optional[datetime] = None
+    reactivated_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
     
@@ -72,10 +74,17 @@ class ChangeHistoryResponse(ChangeHistoryBase):
     id: int
     distributor_id: Optional[int] = None
     detected_at: datetime
+    encoding: Optional[str] = None
+    changed_fields: List[str] = []
     
     class Config:
         from_attributes = True
 
+class DistributorStateResponse(BaseModel):
+    distributor_id: int
+    as_of: datetime
+    state: Dict[str, Any]  # fields as recorded in change_history (see services.change_capture)
+
 # Scraped data models
 class ScrapedDistributor(BaseModel):
     company_name: str
@@ -104,6 +113,56 @@ class SyncResponse(BaseModel):
     notion_results: Optional[dict] = None
     message: str
 
+class SyncJobResponse(BaseModel):
+    id: str
+    status: str
+    phase: str
+    pairs_total: int
+    pairs_fetched: int
+    distributors_found: int
+    rows_written: int
+    params: dict
+    result: Optional[dict] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    deduplicated: bool = False
+
+class LifecycleEventResponse(BaseModel):
+    id: int
+    distributor_id: Optional[int] = None
+    unifi_id: Optional[int] = None
+    event_type: str
+    region: Optional[str] = None
+    significance_score: float
+    event_data: Optional[dict] = None
+    old_data: Optional[dict] = None
+    new_data: Optional[dict] = None
+    session_id: Optional[int] = None
+    created_at: datetime
+
+class LifecycleEventPage(BaseModel):
+    items: List[LifecycleEventResponse]
+    next_cursor: Optional[int] = None  # pass as before_id to get the next (older) page
+    has_more: bool
+
+class MonitoringSessionResponse(BaseModel):
+    id: int
+    session_start: datetime
+    session_end: Optional[datetime] = None
+    status: str
+    total_found: int
+    new_channels: int
+    updated_channels: int
+    deactivated_channels: int
+    reactivated_channels: int
+    data_source: Optional[str] = None
+    error_message: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
 class AnalyticsSummary(BaseModel):
     total_distributors: int
     active_distributors: int
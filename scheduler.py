@@ -12,6 +12,7 @@ from config.logging import setup_logging
 from services.scraper import UnifiDistributorScraper
 from services.data_processor import DataProcessor
 from services.notion_integration import NotionIntegration
+from services.health_monitor import HealthMonitor
 
 # Setup logging
 setup_logging()
@@ -22,6 +23,7 @@ class DistributorScheduler:
     
     def __init__(self):
         self.scheduler = AsyncIOScheduler()
+        self.health_monitor = HealthMonitor()
         self.logger = logger
         self.logger.info("Distributor scheduler initialized")
     
@@ -103,37 +105,16 @@ class DistributorScheduler:
         try:
             self.logger.info("Running health check")
             
-            # Check database connection
-            db = SessionLocal()
-            try:
-                db.execute("SELECT 1")
-                self.logger.info("Database connection: OK")
-            except Exception as e:
-                self.logger.error(f"Database connection failed: {str(e)}")
-            finally:
-                db.close()
+            # Probes do blocking network/database calls - keep them off the event loop
+            results = await asyncio.to_thread(self.health_monitor.run_once)
             
-            # Check Notion connection
-            if settings.notion_sync_enabled:
-                try:
-                    notion = NotionIntegration()
-                    if notion.test_connection():
-                        self.logger.info("Notion connection: OK")
-                    else:
-                        self.logger.warning("Notion connection: FAILED")
-                except Exception as e:
-                    self.logger.error(f"Notion connection error: {str(e)}")
-            
-            # Check external API
-            try:
-                import requests
-                response = requests.get(settings.unifi_distributors_url, timeout=10)
-                if response.status_code == 200:
-                    self.logger.info("External API connection: OK")
+            for name, result in results.items():
+                if result.status == "healthy":
+                    self.logger.info(f"{name} check: OK ({result.latency_ms} ms)")
+                elif result.status == "not_configured":
+                    self.logger.info(f"{name} check: not configured")
                 else:
-                    self.logger.warning(f"External API responded with status: {response.status_code}")
-            except Exception as e:
-                self.logger.error(f"External API connection failed: {str(e)}")
+                    self.logger.warning(f"{name} check: {result.status} - {result.error or result.details}")
                 
         except Exception as e:
             self.logger.error(f"Health check failed: {str(e)}", exc_info=True)
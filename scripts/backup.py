@@ -138,14 +138,16 @@ class DatabaseBackup:
                     ChangeHistory.detected_at >= cutoff_date
                 ).all()
                 
+                from services.change_codec import decode_change
                 changes_data = []
                 for change in changes:
+                    decoded = decode_change(change)
                     changes_data.append({
                         'id': change.id,
                         'distributor_id': change.distributor_id,
                         'change_type': change.change_type,
-                        'old_data': change.old_data,
-                        'new_data': change.new_data,
+                        'old_data': json.dumps(decoded['old_data']) if decoded['old_data'] is not None else None,
+                        'new_data': json.dumps(decoded['new_data']) if decoded['new_data'] is not None else None,
                         'detected_at': change.detected_at.isoformat()
                     })
                 
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+End-to-End Benchmark Suite
+Generates synthetic distributors, replays them over a local JSON API and times
+scrape -> process -> export -> analytics at fixed sizes. Results are JSON so runs
+can be compared across commits
+"""
+
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+from config.logging import LoggerMixin
+from services.profiling import Profiler, span
+
+
+BENCH_SIZES = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+BENCH_STAGES = ('scrape', 'process', 'reprocess', 'export', 'analytics')
+# Later stages read the database these fill, so they always run
+REQUIRED_STAGES = ('scrape', 'process')
+RESULTS_SCHEMA_VERSION = 1
+
+
+def parse_sizes(spec: str) -> List[int]:
+    """'1k,10k' -> [1000, 10000]; plain integers are accepted too"""
+    sizes = []
+    for token in spec.split(','):
+        token = token.strip().lower()
+        if not token:
+            continue
+        sizes.append(BENCH_SIZES[token] if token in BENCH_SIZES else int(token))
+    return sizes
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if platform.system() == 'Darwin' else 1024), 1)
+
+
+def get_commit_info() -> Dict:
+    """Commit hash and dirty flag of the working tree, when run inside the git checkout"""
+    repo_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=repo_dir, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=repo_dir,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        return {'commit': commit, 'dirty': bool(status)}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'dirty': None}
+
+
+def create_schema(db_path: str):
+    """Create the application schema in a fresh SQLite file"""
+    from sqlalchemy import create_engine
+    from models.database import Base
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+
+
+class BenchmarkRunner(LoggerMixin):
+    """Runs the pipeline stages against synthetic data of a given size"""
+
+    def __init__(self, seed: int = 42, stages: Optional[List[str]] = None, work_dir: Optional[str] = None,
+                 scrape_workers: int = 1):
+        self.seed = seed
+        self.scrape_workers = scrape_workers
+        selected = set(stages or BENCH_STAGES)
+        unknown = selected - set(BENCH_STAGES)
+        if unknown:
+            raise ValueError(f"Unknown benchmark stages: {', '.join(sorted(unknown))}")
+        self.stages = [stage for stage in BENCH_STAGES if stage in selected or stage in REQUIRED_STAGES]
+        self.work_dir = work_dir
+
+    def run(self, sizes: List[int]) -> Dict:
+        """Benchmark every size and return the full results document"""
+        results = {
+            'schema_version': RESULTS_SCHEMA_VERSION,
+            **get_commit_info(),
+            'created_at': datetime.utcnow().isoformat(),
+            'seed': self.seed,
+            'scrape_workers': self.scrape_workers,
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count()
+            },
+            'runs': []
+        }
+        for size in sizes:
+            results['runs'].append(self.run_size(size))
+        return results
+
+    def run_size(self, size: int) -> Dict:
+        self.logger.info(f"🏁 Benchmarking {size:,} distributors (stages: {', '.join(self.stages)})")
+        if self.work_dir:
+            run_dir = os.path.join(self.work_dir, str(size))
+            os.makedirs(run_dir, exist_ok=True)
+            return self._run_in(run_dir, size)
+        with tempfile.TemporaryDirectory(prefix=f"unifi-bench-{size}-") as run_dir:
+            return self._run_in(run_dir, size)
+
+    def _run_in(self, run_dir: str, size: int) -> Dict:
+        from services.synthetic_data import SyntheticDataGenerator
+        from services.replay_server import ReplayServer
+
+        db_path = os.path.join(run_dir, 'bench.db')
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        create_schema(db_path)
+
+        run = {'size': size, 'stages': {}}
+        profiler = Profiler()
+        profiler.start()
+        try:
+            generator = SyntheticDataGenerator(size, seed=self.seed)
+            server = self._stage(run, 'generate', lambda: ReplayServer.from_generator(generator), items=size)
+            run['payload_bytes'] = server.payload_bytes
+
+            with server:
+                distributors = self._stage(run, 'scrape', lambda: self._scrape(server.base_url))
+                run['stages']['scrape']['requests'] = server.request_count
+                run['distributors_scraped'] = len(distributors)
+
+            for stage in ('process', 'reprocess'):
+                if stage in self.stages:
+                    outcome = self._stage(run, stage, lambda: self._process(db_path, distributors),
+                                          items=len(distributors))
+                    run['stages'][stage]['outcome'] = {
+                        key: (len(value) if isinstance(value, list) else value) for key, value in outcome.items()
+                    }
+
+            if 'export' in self.stages:
+                from extract_distributor_data import extract_distributor_data
+                output_file = os.path.join(run_dir, 'distributors.json')
+                ok = self._stage(run, 'export', lambda: extract_distributor_data(db_path, output_file) is not None)
+                run['stages']['export']['ok'] = ok
+
+            if 'analytics' in self.stages:
+                from generate_yearly_updates import generate_yearly_channel_updates
+                output_path = os.path.join(run_dir, 'yearly-channel-updates.json')
+                ok = self._stage(run, 'analytics', lambda: generate_yearly_channel_updates(db_path, output_path))
+                run['stages']['analytics']['ok'] = ok
+        finally:
+            profiler.stop()
+
+        run['db_bytes'] = os.path.getsize(db_path)
+        run['peak_rss_mb'] = peak_rss_mb()
+        run['profile'] = profiler.report()['stages']
+        return run
+
+    def _stage(self, run: Dict, name: str, func, items: Optional[int] = None):
+        """Time one stage, recording seconds, throughput and peak RSS after it"""
+        start = time.perf_counter()
+        with span(name):
+            result = func()
+        seconds = time.perf_counter() - start
+
+        if items is None:
+            items = len(result) if isinstance(result, list) else None
+        stage = {'seconds': round(seconds, 4), 'peak_rss_mb': peak_rss_mb()}
+        if items is not None:
+            stage['items'] = items
+            stage['items_per_second'] = round(items / seconds, 1) if seconds > 0 else None
+        run['stages'][name] = stage
+        self.logger.info(f"   {name}: {seconds:.2f}s")
+        return result
+
+    def _scrape(self, base_url: str):
+        from services.distributor_scraper import JsonDistributorScraper
+        scraper = JsonDistributorScraper(use_dynamic_mapping=False, base_url=base_url, request_delay=0)
+        return scraper.scrape_all_distributors(workers=self.scrape_workers)
+
+    def _process(self, db_path: str, distributors) -> Dict:
+        from services.enhanced_data_processor import EnhancedDataProcessor
+        return EnhancedDataProcessor(db_path=db_path).process_distributors(distributors)
+
+
+def compare_results(baseline: Dict, current: Dict, max_regression_pct: Optional[float] = None) -> List[Dict]:
+    """Per size/stage timing deltas between two results documents
+
+    A row is flagged as a regression when the current run is more than
+    max_regression_pct percent slower than the baseline.
+    """
+    baseline_runs = {run['size']: run for run in baseline.get('runs', [])}
+    rows = []
+    for run in current.get('runs', []):
+        base_run = baseline_runs.get(run['size'])
+        if not base_run:
+            continue
+        for stage, timing in run['stages'].items():
+            base_timing = base_run['stages'].get(stage)
+            if not base_timing or not base_timing.get('seconds'):
+                continue
+            change_pct = (timing['seconds'] - base_timing['seconds']) / base_timing['seconds'] * 100
+            rows.append({
+                'size': run['size'],
+                'stage': stage,
+                'baseline_seconds': base_timing['seconds'],
+                'current_seconds': timing['seconds'],
+                'change_pct': round(change_pct, 1),
+                'regression': max_regression_pct is not None and change_pct > max_regression_pct
+            })
+    return rows
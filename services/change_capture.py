@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Batched Change Capture for the JSON API processor
+Takes the prior state of the run's distributors once (the repository's bulk_read
+rows), diffs each written record against it in memory and appends compact
+change_history rows (see services.change_codec) with one executemany per
+batch - no per-record queries. Statements use qmark parameters; on PostgreSQL
+the repository hands out a cursor that translates them.
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from config.logging import LoggerMixin
+from services.change_codec import ChangeCodec
+
+# Fields identifying a distributor; captured in full snapshots but never diffed
+# (the processor does not rewrite them on update)
+IDENTITY_FIELDS = ('company_name', 'address', 'unifi_id')
+
+# Fields the processor writes on update, and therefore diffs
+DIFF_FIELDS = (
+    'partner_type', 'phone', 'contact_email', 'latitude', 'longitude', 'region', 'country_state',
+    'order_weight', 'logo_url', 'sunmax_partner', 'last_modified'
+)
+
+# Distributors without a unifi_id (legacy HTML records), which bulk_read cannot key
+UNKEYED_STATE_QUERY = """
+    SELECT d.id, c.name, d.address, d.unifi_id, d.partner_type, d.phone, d.contact_email,
+           d.latitude, d.longitude, d.region, d.country_state, d.order_weight, d.logo_url,
+           d.sunmax_partner, d.last_modified_at, d.is_active
+    FROM distributors d
+    JOIN companies c ON c.id = d.company_id
+    WHERE d.unifi_id IS NULL
+"""
+
+# Per distributor: changes recorded since its latest full snapshot
+SNAPSHOT_AGE_QUERY = """
+    WITH last_full AS (
+        SELECT distributor_id, MAX(id) AS id FROM change_history
+        WHERE distributor_id IS NOT NULL AND encoding LIKE 'full%'
+        GROUP BY distributor_id
+    )
+    SELECT last_full.distributor_id, COUNT(c.id)
+    FROM last_full
+    LEFT JOIN change_history c ON c.distributor_id = last_full.distributor_id AND c.id > last_full.id
+    GROUP BY last_full.distributor_id
+"""
+
+
+def _normalize(field: str, value):
+    if value is None:
+        return None
+    if field in ('latitude', 'longitude'):
+        try:
+            return round(float(value), 7)
+        except (TypeError, ValueError):
+            return None
+    if field == 'sunmax_partner' or field == 'is_active':
+        return bool(value)
+    if field == 'order_weight':
+        return int(value)
+    if field == 'last_modified':
+        return _normalize_timestamp(value)
+    return value
+
+
+def _normalize_timestamp(value) -> Optional[str]:
+    """ISO 8601 in UTC, whether stored as text (SQLite) or a naive UTC TIMESTAMP (PostgreSQL)"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+def row_state(row: Dict) -> Dict:
+    """Tracked state of a stored distributor (a repository row, joined with its company)"""
+    state = {field: row.get(field) for field in IDENTITY_FIELDS + DIFF_FIELDS if field != 'last_modified'}
+    state['last_modified'] = row.get('last_modified_at')
+    state['is_active'] = row.get('is_active')
+    return {field: _normalize(field, value) for field, value in state.items()}
+
+
+def record_state(distributor) -> Dict:
+    """Tracked state of a scraped record (JSON API or legacy)"""
+    state = {field: _normalize(field, getattr(distributor, field, None)) for field in IDENTITY_FIELDS + DIFF_FIELDS
+             if field != 'last_modified'}
+    state['last_modified'] = _normalize('last_modified', getattr(distributor, 'last_modified_iso', None))
+    state['is_active'] = True
+    return state
+
+
+class ChangeCapture(LoggerMixin):
+    """In-memory diffing against preloaded state; change rows are written in batches"""
+
+    def __init__(self, cursor, codec: Optional[ChangeCodec] = None, batch_size: int = 500):
+        self.cursor = cursor
+        self.codec = codec or ChangeCodec()
+        self.batch_size = batch_size
+        # Same format SQLAlchemy uses for ChangeHistory.detected_at (UTC)
+        self.detected_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+        self.states: Dict[int, Dict] = {}
+        self.snapshot_age: Dict[int, int] = {}
+        self.pending: List[Tuple] = []
+        self.recorded = {'created': 0, 'updated': 0, 'deactivated': 0, 'reactivated': 0}
+
+    def load(self, rows: Iterable[Dict] = (), unkeyed: bool = False):
+        """Preload prior state from repository rows, plus snapshot ages (one query)
+
+        With unkeyed, distributors without a unifi_id are read as well (one more query).
+        """
+        self.add_states(rows)
+        if unkeyed:
+            self.cursor.execute(UNKEYED_STATE_QUERY)
+            columns = ('id', 'company_name', 'address', 'unifi_id', 'partner_type', 'phone', 'contact_email',
+                       'latitude', 'longitude', 'region', 'country_state', 'order_weight', 'logo_url',
+                       'sunmax_partner', 'last_modified_at', 'is_active')
+            self.add_states(dict(zip(columns, values)) for values in self.cursor.fetchall())
+        self.cursor.execute(SNAPSHOT_AGE_QUERY)
+        self.snapshot_age = dict(self.cursor.fetchall())
+
+    def add_states(self, rows: Iterable[Dict]):
+        """Track the prior state of more distributors (repository rows)"""
+        for row in rows:
+            self.states[row['id']] = row_state(row)
+
+    def record_write(self, distributor_id: int, result: str, distributor) -> Optional[Tuple]:
+        """Diff a just-written record against its prior state and queue the change, if any
+
+        Returns the lifecycle classification (event type, old state, new state,
+        changed fields) with event type 'discovered', 'reactivated' or 'updated',
+        or None when nothing changed.
+        """
+        new_state = record_state(distributor)
+        old_state = self.states.get(distributor_id)
+
+        if result == 'created' or old_state is None:
+            self._queue(distributor_id, 'created', None, new_state)
+            self.recorded['created'] += 1
+            self.states[distributor_id] = new_state
+            return 'discovered', None, new_state, []
+
+        # Only the fields the update actually writes can change
+        merged = dict(old_state)
+        merged.update({field: new_state[field] for field in DIFF_FIELDS})
+        changed_fields = [field for field in DIFF_FIELDS if merged[field] != old_state.get(field)]
+        # Listed again after being deactivated: the upsert flips is_active back
+        reactivated = not old_state.get('is_active')
+        if reactivated:
+            merged['is_active'] = True
+        if changed_fields or reactivated:
+            self._queue(distributor_id, 'updated', old_state, merged)
+            self.recorded['reactivated' if reactivated else 'updated'] += 1
+        self.states[distributor_id] = merged
+
+        if reactivated:
+            return 'reactivated', old_state, merged, changed_fields
+        if changed_fields:
+            return 'updated', old_state, merged, changed_fields
+        return None
+
+    def record_deactivation(self, distributor_id: int) -> Optional[Dict]:
+        """Queue the is_active change of a deactivated distributor; returns its prior state"""
+        old_state = self.states.get(distributor_id)
+        if old_state is None:
+            return None
+        new_state = dict(old_state, is_active=False)
+        self._queue(distributor_id, 'updated', old_state, new_state)
+        self.recorded['deactivated'] += 1
+        self.states[distributor_id] = new_state
+        return old_state
+
+    def _queue(self, distributor_id: int, change_type: str, old_state: Optional[Dict], new_state: Dict):
+        full_snapshot = change_type != 'created' and self.codec.needs_snapshot(self.snapshot_age.get(distributor_id))
+        encoding, payload = self.codec.encode(change_type, old_state, new_state, full_snapshot=full_snapshot)
+        self.snapshot_age[distributor_id] = 0 if encoding.startswith('full') else self.snapshot_age[distributor_id] + 1
+        self.pending.append((distributor_id, change_type, encoding, payload, self.detected_at))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write queued change rows with a single executemany"""
+        if not self.pending:
+            return
+        self.cursor.executemany("""
+            INSERT INTO change_history (distributor_id, change_type, encoding, payload, detected_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, self.pending)
+        self.pending = []
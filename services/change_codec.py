@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Compact Change History Encoding
+Stores change_history rows as field-level deltas (only the fields that changed,
+as [old, new] pairs) with a periodic full snapshot per distributor, optionally
+compressed with zlib or zstd. Legacy rows (old_data / new_data JSON text) are
+still decoded transparently.
+
+Row encoding is "<kind>[+<compression>]", e.g. "delta", "delta+zlib", "full+zstd".
+"""
+
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from config.settings import settings
+from config.logging import LoggerMixin
+
+
+ENCODING_KINDS = ('full', 'delta')
+COMPRESSIONS = ('none', 'zlib', 'zstd')
+
+# Payloads smaller than this are stored uncompressed (compression headers would outweigh the gain)
+MIN_COMPRESS_BYTES = 96
+
+# Payloads are a few hundred bytes: a 1 KiB window and small memLevel compress as well as
+# the defaults but avoid allocating the full deflate state (~5x faster per row)
+ZLIB_LEVEL, ZLIB_WBITS, ZLIB_MEMLEVEL = 6, 10, 4
+
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        raise RuntimeError("zstd change history compression requires zstandard (pip install zstandard)")
+
+
+def field_delta(old_data: Optional[Dict], new_data: Optional[Dict]) -> Dict[str, List]:
+    """{field: [old, new]} for every field whose value differs"""
+    old_data, new_data = old_data or {}, new_data or {}
+    return {
+        field: [old_data.get(field), new_data.get(field)]
+        for field in sorted(old_data.keys() | new_data.keys())
+        if old_data.get(field) != new_data.get(field)
+    }
+
+
+class ChangeCodec(LoggerMixin):
+    """Encodes / decodes change_history payloads"""
+
+    def __init__(self, compression: Optional[str] = None, snapshot_every: Optional[int] = None):
+        compression = (compression or settings.change_history_compression).lower()
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown change history compression: {compression}")
+        if compression == 'zstd':
+            _zstd()
+        self.compression = compression
+        # A full snapshot is written for a distributor after this many deltas
+        self.snapshot_every = snapshot_every if snapshot_every is not None else settings.change_history_snapshot_every
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+
+    def encode(self, change_type: str, old_data: Optional[Dict], new_data: Optional[Dict],
+               full_snapshot: bool = False) -> Tuple[str, bytes]:
+        """(encoding, payload) for one change
+
+        Creations carry only the new state; changes flagged full_snapshot carry the
+        complete new state next to the delta; everything else carries only the delta.
+        """
+        if change_type == 'created' or old_data is None:
+            kind, document = 'full', {'state': new_data}
+        elif full_snapshot:
+            kind, document = 'full', {'state': new_data, 'delta': field_delta(old_data, new_data)}
+        else:
+            kind, document = 'delta', {'delta': field_delta(old_data, new_data)}
+
+        raw = json.dumps(document, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+        if self.compression == 'none' or len(raw) < MIN_COMPRESS_BYTES:
+            return kind, raw
+        if self.compression == 'zlib':
+            compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, ZLIB_WBITS, ZLIB_MEMLEVEL)
+            compressed = compressor.compress(raw) + compressor.flush()
+        else:
+            compressed = _zstd().ZstdCompressor(level=6).compress(raw)
+        if len(compressed) >= len(raw):
+            return kind, raw
+        return f"{kind}+{self.compression}", compressed
+
+    def needs_snapshot(self, deltas_since_snapshot: Optional[int]) -> bool:
+        """Whether the next change should be a full snapshot (None: no snapshot recorded yet)"""
+        return deltas_since_snapshot is None or deltas_since_snapshot + 1 >= self.snapshot_every
+
+    # ------------------------------------------------------------------
+    # Decoding
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def decode_payload(encoding: str, payload: bytes) -> Dict:
+        kind, _, compression = encoding.partition('+')
+        if kind not in ENCODING_KINDS:
+            raise ValueError(f"Unknown change history encoding: {encoding}")
+        if compression == 'zlib':
+            payload = zlib.decompress(payload)
+        elif compression == 'zstd':
+            payload = _zstd().ZstdDecompressor().decompress(payload)
+        elif compression:
+            raise ValueError(f"Unknown change history compression: {compression}")
+        return json.loads(payload)
+
+    @classmethod
+    def decode(cls, change) -> Dict:
+        """Decoded view of a ChangeHistory row (compact or legacy)
+
+        Returns {'old_data', 'new_data', 'changed_fields', 'full_state'}. For
+        deltas, old_data / new_data hold only the changed fields.
+        """
+        encoding = getattr(change, 'encoding', None)
+        if not encoding or encoding == 'json':
+            old_data = json.loads(change.old_data) if change.old_data else None
+            new_data = json.loads(change.new_data) if change.new_data else None
+            delta = field_delta(old_data, new_data)
+            return {
+                'old_data': old_data,
+                'new_data': new_data,
+                'changed_fields': sorted(delta),
+                'full_state': new_data
+            }
+
+        document = cls.decode_payload(encoding, bytes(change.payload))
+        delta = document.get('delta', {})
+        state = document.get('state')
+        if change.change_type == 'created':
+            old_data, new_data = None, state
+            delta = {field: [None, value] for field, value in (state or {}).items() if value is not None}
+        else:
+            old_data = {field: values[0] for field, values in delta.items()}
+            new_data = {field: values[1] for field, values in delta.items()}
+        return {
+            'old_data': old_data,
+            'new_data': new_data,
+            'changed_fields': sorted(delta),
+            'full_state': state
+        }
+
+
+def decode_change(change) -> Dict:
+    """Shortcut for ChangeCodec.decode"""
+    return ChangeCodec.decode(change)
+
+
+def reconstruct_state(changes) -> Optional[Dict]:
+    """Full state after a distributor's changes (oldest first), replaying from the last full snapshot"""
+    state = None
+    for change in changes:
+        decoded = ChangeCodec.decode(change)
+        if decoded['full_state'] is not None:
+            state = dict(decoded['full_state'])
+        elif state is not None and decoded['new_data']:
+            state.update(decoded['new_data'])
+    return state
+
+
+def full_state_filter():
+    """Filter on change_history rows that carry a full state: compact snapshots and legacy JSON rows"""
+    from sqlalchemy import and_, or_
+    from models.database import ChangeHistory
+
+    return or_(
+        ChangeHistory.encoding.like('full%'),
+        and_(or_(ChangeHistory.encoding.is_(None), ChangeHistory.encoding == 'json'), ChangeHistory.new_data.isnot(None))
+    )
+
+
+def distributor_state_at(db, distributor_id: int, as_of: Optional[datetime] = None) -> Optional[Dict]:
+    """A distributor's state as change_history recorded it at as_of (default: now; naive means UTC)
+
+    Replays from the newest full snapshot at or before as_of, so a read touches at
+    most snapshot_every rows however long the history is. None when nothing was
+    recorded by then.
+    """
+    from sqlalchemy import func
+    from models.database import ChangeHistory
+
+    if as_of is not None and as_of.tzinfo is not None:
+        as_of = as_of.astimezone(timezone.utc).replace(tzinfo=None)
+    recorded = [ChangeHistory.distributor_id == distributor_id]
+    if as_of is not None:
+        recorded.append(ChangeHistory.detected_at <= as_of)
+    base_id = db.query(func.max(ChangeHistory.id)).filter(*recorded, full_state_filter()).scalar()
+    if base_id is None:
+        return None
+    return reconstruct_state(
+        db.query(ChangeHistory).filter(*recorded, ChangeHistory.id >= base_id).order_by(ChangeHistory.id).all()
+    )
+
+
+def compact_legacy_changes(db, codec: Optional[ChangeCodec] = None, batch_size: int = 500) -> Dict:
+    """Re-encode legacy change_history rows (old_data / new_data JSON text) in place
+
+    Rows are processed per distributor, oldest first, so each distributor gets a
+    full snapshot on its first row and then every codec.snapshot_every changes.
+    Commits once per batch_size distributors.
+    """
+    from models.database import ChangeHistory
+
+    codec = codec or ChangeCodec()
+    results = {'rows': 0, 'bytes_before': 0, 'bytes_after': 0, 'distributors': 0}
+    legacy = ChangeHistory.encoding.is_(None)
+    distributor_ids = [row[0] for row in db.query(ChangeHistory.distributor_id).filter(legacy).distinct()]
+
+    for position, distributor_id in enumerate(distributor_ids, 1):
+        since_snapshot = None
+        same_distributor = (ChangeHistory.distributor_id.is_(None) if distributor_id is None
+                            else ChangeHistory.distributor_id == distributor_id)
+        for change in db.query(ChangeHistory).filter(legacy, same_distributor).order_by(ChangeHistory.id).all():
+            old_data = json.loads(change.old_data) if change.old_data else None
+            new_data = json.loads(change.new_data) if change.new_data else None
+            full_snapshot = codec.needs_snapshot(since_snapshot)
+            encoding, payload = codec.encode(change.change_type, old_data, new_data, full_snapshot=full_snapshot)
+
+            results['bytes_before'] += len(change.old_data or '') + len(change.new_data or '')
+            results['bytes_after'] += len(payload)
+            change.encoding, change.payload = encoding, payload
+            change.old_data = change.new_data = None
+            since_snapshot = 0 if encoding.startswith('full') else since_snapshot + 1
+            results['rows'] += 1
+
+        results['distributors'] += 1
+        if position % batch_size == 0:
+            db.commit()
+
+    db.commit()
+    return results
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Change History Rollup Compaction
+Folds change_history rows older than the retention window into per-distributor,
+per-month summary rows (counts plus first/last field values), then deletes the
+originals. Works in small batches, each in its own short transaction, so the
+table is never locked for long and long-range trends stay queryable.
+
+A distributor's newest full snapshot and the deltas after it are never compacted,
+however old: services.change_codec.distributor_state_at replays from that row.
+"""
+
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+from config.logging import LoggerMixin
+from models.database import ChangeHistory, ChangeHistoryRollup
+from services.change_codec import decode_change, full_state_filter
+from services.profiling import timed
+
+
+class ChangeRollupJob(LoggerMixin):
+    """Batched compaction of expired change_history rows into change_history_rollups"""
+
+    def __init__(self, db: Session, batch_size: int = 1000):
+        self.db = db
+        self.batch_size = batch_size
+
+    @timed('change_rollup')
+    def run(self, days_to_keep: int = 90, max_batches: Optional[int] = None) -> Dict:
+        """Compact every row detected before now - days_to_keep (oldest first)
+
+        max_batches bounds the work done by one call; the remainder is picked up
+        by the next run.
+        """
+        cutoff_date = datetime.utcnow() - timedelta(days=days_to_keep)
+        results = {'compacted': 0, 'retained': 0, 'batches': 0, 'rollups_created': 0, 'rollups_updated': 0,
+                   'errors': []}
+
+        last_id = 0
+        while max_batches is None or results['batches'] < max_batches:
+            batch = self.db.query(ChangeHistory).filter(
+                ChangeHistory.detected_at < cutoff_date,
+                ChangeHistory.id > last_id
+            ).order_by(ChangeHistory.id).limit(self.batch_size).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            try:
+                expired = self._expired(batch)
+                created, updated = self._fold_batch(expired)
+                if expired:
+                    self.db.query(ChangeHistory).filter(
+                        ChangeHistory.id.in_([change.id for change in expired])
+                    ).delete(synchronize_session=False)
+                self.db.commit()
+            except Exception as e:
+                self.db.rollback()
+                error_msg = f"Rollup batch ending at change {last_id} failed: {str(e)}"
+                self.logger.error(error_msg)
+                results['errors'].append(error_msg)
+                break
+
+            results['compacted'] += len(expired)
+            results['retained'] += len(batch) - len(expired)
+            results['batches'] += 1
+            results['rollups_created'] += created
+            results['rollups_updated'] += updated
+
+        if results['compacted']:
+            self.logger.info(f"🗜️ Compacted {results['compacted']} change rows into monthly rollups "
+                             f"({results['batches']} batches)")
+        return results
+
+    def _expired(self, batch: List[ChangeHistory]) -> List[ChangeHistory]:
+        """The batch without each distributor's newest full-state row and the rows after it"""
+        distributor_ids = {change.distributor_id for change in batch if change.distributor_id is not None}
+        if not distributor_ids:
+            return batch
+        newest_full = dict(self.db.query(ChangeHistory.distributor_id, func.max(ChangeHistory.id)).filter(
+            ChangeHistory.distributor_id.in_(distributor_ids), full_state_filter()
+        ).group_by(ChangeHistory.distributor_id).all())
+        return [
+            change for change in batch
+            if change.distributor_id not in newest_full or change.id < newest_full[change.distributor_id]
+        ]
+
+    def _fold_batch(self, batch: List[ChangeHistory]) -> Tuple[int, int]:
+        """Merge a batch (ordered by id) into its rollup rows; returns (created, updated)"""
+        groups: Dict[Tuple[Optional[int], str], List[ChangeHistory]] = {}
+        for change in batch:
+            groups.setdefault((change.distributor_id, change.detected_at.strftime('%Y-%m')), []).append(change)
+        if not groups:
+            return 0, 0
+
+        # Every rollup the batch touches, in one query
+        distributor_ids = {distributor_id for distributor_id, _ in groups}
+        same_distributor = [ChangeHistoryRollup.distributor_id.in_(distributor_ids - {None})]
+        if None in distributor_ids:
+            same_distributor.append(ChangeHistoryRollup.distributor_id.is_(None))
+        rollups = {
+            (rollup.distributor_id, rollup.month): rollup
+            for rollup in self.db.query(ChangeHistoryRollup).filter(
+                or_(*same_distributor), ChangeHistoryRollup.month.in_({month for _, month in groups})
+            )
+        }
+
+        created = updated = 0
+        for (distributor_id, month), changes in groups.items():
+            rollup = rollups.get((distributor_id, month))
+            if rollup is None:
+                rollup = ChangeHistoryRollup(distributor_id=distributor_id, month=month,
+                                             created_count=0, updated_count=0, deleted_count=0)
+                self.db.add(rollup)
+                created += 1
+            else:
+                updated += 1
+            self._fold_changes(rollup, changes)
+        self.db.flush()
+        return created, updated
+
+    @staticmethod
+    def _fold_changes(rollup: ChangeHistoryRollup, changes: List[ChangeHistory]):
+        field_counts = json.loads(rollup.field_counts) if rollup.field_counts else {}
+        first_values = json.loads(rollup.first_values) if rollup.first_values else {}
+        last_values = json.loads(rollup.last_values) if rollup.last_values else {}
+
+        for change in changes:
+            count_column = f"{change.change_type}_count"
+            if hasattr(rollup, count_column):
+                setattr(rollup, count_column, (getattr(rollup, count_column) or 0) + 1)
+
+            decoded = decode_change(change)
+            old_data = decoded['old_data'] or {}
+            new_data = decoded['new_data'] or {}
+            fields = decoded['changed_fields'] if change.change_type != 'created' else sorted(new_data)
+            for field in fields:
+                field_counts[field] = field_counts.get(field, 0) + 1
+                first_values.setdefault(field, old_data.get(field))
+                last_values[field] = new_data.get(field)
+
+            if rollup.first_change_at is None or change.detected_at < rollup.first_change_at:
+                rollup.first_change_at = change.detected_at
+            if rollup.last_change_at is None or change.detected_at > rollup.last_change_at:
+                rollup.last_change_at = change.detected_at
+
+        rollup.field_counts = json.dumps(field_counts, sort_keys=True)
+        rollup.first_values = json.dumps(first_values, sort_keys=True, default=str)
+        rollup.last_values = json.dumps(last_values, sort_keys=True, default=str)
+        rollup.compacted_at = datetime.utcnow()
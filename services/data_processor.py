@@ -1,9 +1,13 @@
 from typing import List, Dict, Tuple, Optional
+from sqlalchemy import func, text
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from models.database import Company, Distributor, ChangeHistory
 from models.schemas import ScrapedDistributor
 from config.logging import LoggerMixin
+from config.settings import settings
+from services.change_codec import ChangeCodec
+from services.change_capture import SNAPSHOT_AGE_QUERY
 import json
 import hashlib
 from datetime import datetime, timedelta
@@ -14,6 +18,9 @@ class DataProcessor(LoggerMixin):
     
     def __init__(self, db: Session):
         self.db = db
+        self.codec = ChangeCodec()
+        # distributor_id -> changes since its last full snapshot; loaded once, then kept in memory
+        self._snapshot_age: Optional[Dict[int, int]] = None
         self.logger.info("Data processor initialized")
     
     def process_scraped_data(self, scraped_distributors: List[ScrapedDistributor]) -> Dict:
@@ -27,6 +34,7 @@ class DataProcessor(LoggerMixin):
         
         try:
             self.logger.info(f"Processing {len(scraped_distributors)} scraped distributors")
+            self._snapshot_age = None
             
             for scraped in scraped_distributors:
                 try:
@@ -246,22 +254,37 @@ class DataProcessor(LoggerMixin):
         }
     
     def _record_change(self, distributor_id: int, change_type: str, old_data: Optional[Dict], new_data: Optional[Dict]):
-        """Record a change in the change history"""
+        """Record a change in the change history (compact encoding, see services.change_codec)"""
         try:
+            deltas = self._deltas_since_snapshot(distributor_id)
+            full_snapshot = change_type != 'created' and self.codec.needs_snapshot(deltas)
+            encoding, payload = self.codec.encode(change_type, old_data, new_data, full_snapshot=full_snapshot)
+            self._snapshot_age[distributor_id] = (
+                0 if encoding.startswith('full') else self._snapshot_age.get(distributor_id, 0) + 1
+            )
             change = ChangeHistory(
                 distributor_id=distributor_id,
                 change_type=change_type,
-                old_data=json.dumps(old_data) if old_data else None,
-                new_data=json.dumps(new_data) if new_data else None
+                encoding=encoding,
+                payload=payload
             )
             
+            # Written with the run's commit; nothing reads the row back before then
             self.db.add(change)
-            self.db.flush()
             
         except Exception as e:
             self.logger.error(f"Error recording change: {str(e)}")
             # Don't raise here - change recording is not critical
     
+    def _deltas_since_snapshot(self, distributor_id: int) -> Optional[int]:
+        """Changes recorded for a distributor since its last full snapshot (None if it has none)
+
+        Snapshot ages are read with one query per run and tracked in memory as changes are recorded.
+        """
+        if self._snapshot_age is None:
+            self._snapshot_age = dict(self.db.execute(text(SNAPSHOT_AGE_QUERY)).fetchall())
+        return self._snapshot_age.get(distributor_id)
+    
     def detect_missing_distributors(self, scraped_distributors: List[ScrapedDistributor]) -> List[Distributor]:
         """Detect distributors that are no longer active (not found in scraped data)"""
         try:
@@ -336,7 +359,6 @@ class DataProcessor(LoggerMixin):
             }
             
             # Regional distribution
-            from sqlalchemy import func
             region_stats = self.db.query(
                 Distributor.region,
                 func.count(Distributor.id).label('count')
@@ -355,18 +377,13 @@ class DataProcessor(LoggerMixin):
             return {}
     
     def cleanup_old_changes(self, days_to_keep: int = 90) -> int:
-        """Clean up old change history records"""
+        """Fold change history older than days_to_keep into monthly rollups (see services.change_rollup)"""
+        from services.change_rollup import ChangeRollupJob
+        
         try:
-            cutoff_date = datetime.utcnow() - timedelta(days=days_to_keep)
-            
-            deleted_count = self.db.query(ChangeHistory).filter(
-                ChangeHistory.detected_at < cutoff_date
-            ).delete()
-            
-            self.db.commit()
-            
-            self.logger.info(f"Cleaned up {deleted_count} old change records")
-            return deleted_count
+            result = ChangeRollupJob(self.db, batch_size=settings.change_rollup_batch_size).run(days_to_keep)
+            self.logger.info(f"Compacted {result['compacted']} old change records into monthly rollups")
+            return result['compacted']
             
         except Exception as e:
             self.db.rollback()
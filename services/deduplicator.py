@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Scrape Deduplicator
+Collapses repeated distributor records - the same partner listed under several
+country/state pairs, or the same company at a differently formatted address -
+into one record per distributor.
+
+Records are matched by unifi_id, and by a 64-bit blake2b fingerprint of the
+normalized company name and address (so "Acme Networks, Inc." at "12 Main
+Street, Suite 4" matches "ACME NETWORKS INC" at "12 Main St. Ste 4"). Every
+fingerprint seen for a unifi_id - losing duplicates included - claims
+matching records without one. Two different unifi_ids are never merged. When records collide the winner is
+chosen by a total order - a record with a unifi_id, then highest order_weight,
+then latest last_modified, then the lowest unifi_id / region / country_state -
+so the result does not depend on arrival order. That makes deduplicators for
+separate shards or micro-batches mergeable: merge() gives the same records as
+deduplicating everything in one pass.
+"""
+
+import hashlib
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Address words written several ways, reduced to one spelling
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'str': 'st', 'avenue': 'ave', 'av': 'ave', 'road': 'rd', 'boulevard': 'blvd',
+    'drive': 'dr', 'lane': 'ln', 'court': 'ct', 'place': 'pl', 'highway': 'hwy', 'parkway': 'pkwy',
+    'suite': 'ste', 'floor': 'fl', 'building': 'bldg', 'apartment': 'apt', 'number': 'no',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+}
+
+# Legal-form suffixes dropped from company names
+COMPANY_SUFFIXES = frozenset({
+    'inc', 'incorporated', 'llc', 'ltd', 'limited', 'corp', 'corporation', 'co', 'company',
+    'gmbh', 'ag', 'sa', 'sas', 'sarl', 'srl', 'spa', 'bv', 'nv', 'pty', 'plc', 'lda', 'sro', 'oy', 'ab', 'as',
+})
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_text(value: Optional[str], abbreviations: Optional[Dict[str, str]] = None,
+                   drop: frozenset = frozenset()) -> str:
+    """Casefolded, accent- and punctuation-free words, with abbreviations applied and drop words removed"""
+    if not value:
+        return ''
+    if value.isascii():
+        text = value.lower()
+    else:
+        decomposed = unicodedata.normalize('NFKD', value)
+        text = ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    words = _NON_WORD.sub(' ', text).split()
+    if abbreviations:
+        words = [abbreviations.get(word, word) for word in words]
+    return ' '.join(word for word in words if word not in drop)
+
+
+def fingerprint(company_name: Optional[str], address: Optional[str]) -> int:
+    """64-bit fingerprint of a normalized (company name, address) pair"""
+    key = (normalize_text(company_name, drop=COMPANY_SUFFIXES) + '\0' +
+           normalize_text(address, ADDRESS_ABBREVIATIONS))
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def _modified_ts(record) -> float:
+    ts = getattr(record, 'last_modified_ts', None)
+    if ts is None:
+        modified = getattr(record, 'last_modified', None)
+        ts = modified.timestamp() if modified is not None else None
+    return ts if ts is not None else float('-inf')
+
+
+def winner_rank(record) -> Tuple:
+    """Higher wins: has a unifi_id, order_weight, last_modified"""
+    order_weight = getattr(record, 'order_weight', None)
+    return (
+        getattr(record, 'unifi_id', None) is not None,
+        order_weight if order_weight is not None else float('-inf'),
+        _modified_ts(record),
+    )
+
+
+def _tiebreak(record) -> Tuple:
+    """Lower wins among records of equal rank"""
+    return (getattr(record, 'unifi_id', None) or 0, record.region or '', record.country_state or '',
+            record.company_name or '', record.address or '')
+
+
+def _better(candidate, incumbent) -> bool:
+    candidate_rank, incumbent_rank = winner_rank(candidate), winner_rank(incumbent)
+    if candidate_rank != incumbent_rank:
+        return candidate_rank > incumbent_rank
+    return _tiebreak(candidate) < _tiebreak(incumbent)
+
+
+class Deduplicator:
+    """Incremental, mergeable deduplication of scraped distributor records
+
+    Feed records with add() / add_batch(), combine per-shard instances with
+    merge(), read the survivors with records() and the counts with report().
+    Instances pickle, so workers can send them across processes.
+    """
+
+    def __init__(self):
+        # unifi_id (or ('fp', fingerprint) for records without one) -> kept record, in first-seen order
+        self._kept: Dict[object, object] = {}
+        # fingerprint -> the unifi_id of any record seen with it (kept or not), else its id-less key
+        self._fingerprints: Dict[int, object] = {}
+        self.seen = 0
+        self.duplicates_by_region: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self._kept)
+
+    def _claim(self, record_fp: int, unifi_id: int):
+        """Tie a fingerprint to a unifi_id, absorbing an id-less record kept under it
+
+        A fingerprint already tied to another unifi_id stays with it: records with
+        an id outrank id-less ones, so which id absorbs them never changes the winners.
+        """
+        claimed = self._fingerprints.get(record_fp)
+        if claimed is not None and not isinstance(claimed, tuple):
+            return
+        self._fingerprints[record_fp] = unifi_id
+        absorbed = self._kept.pop(claimed, None) if claimed is not None else None
+        if absorbed is not None:
+            # An id-less record of the same company and address: the record with an id replaces it
+            self.duplicates_by_region[absorbed.region or 'unknown'] += 1
+
+    def add(self, record) -> bool:
+        """Add one record; True when it is now the kept record for its distributor"""
+        self.seen += 1
+        unifi_id = getattr(record, 'unifi_id', None)
+        record_fp = fingerprint(record.company_name, record.address)
+        if unifi_id is None:
+            key = self._fingerprints.setdefault(record_fp, ('fp', record_fp))
+        else:
+            key = unifi_id
+            self._claim(record_fp, unifi_id)
+
+        incumbent = self._kept.get(key)
+        if incumbent is None:
+            self._kept[key] = record
+            return True
+        if _better(record, incumbent):
+            self._kept[key] = record
+            self.duplicates_by_region[incumbent.region or 'unknown'] += 1
+            return True
+        self.duplicates_by_region[record.region or 'unknown'] += 1
+        return False
+
+    def add_batch(self, records: Iterable) -> List:
+        """Add a micro-batch; returns its records that are new or replace an earlier winner (to upsert)"""
+        return [record for record in records if self.add(record)]
+
+    def merge(self, other: 'Deduplicator') -> 'Deduplicator':
+        """Fold another deduplicator (e.g. a shard's) into this one"""
+        self.seen -= len(other._kept)
+        for record in other._kept.values():
+            self.add(record)
+        self.seen += other.seen
+        self.duplicates_by_region.update(other.duplicates_by_region)
+        # Fingerprints of the other side's losing duplicates still claim id-less records here
+        for record_fp, key in other._fingerprints.items():
+            if not isinstance(key, tuple):
+                self._claim(record_fp, key)
+        return self
+
+    def records(self) -> List:
+        """Kept records, in the order their distributors were first seen"""
+        return list(self._kept.values())
+
+    @property
+    def duplicates(self) -> int:
+        return sum(self.duplicates_by_region.values())
+
+    def report(self) -> Dict:
+        return {
+            'seen': self.seen,
+            'unique': len(self._kept),
+            'duplicates': self.duplicates,
+            'duplicates_by_region': dict(sorted(self.duplicates_by_region.items()))
+        }
+
+
+def deduplicate(records: Iterable) -> Tuple[List, Dict]:
+    """(kept records, report) for one pass over records"""
+    deduplicator = Deduplicator()
+    deduplicator.add_batch(records)
+    return deduplicator.records(), deduplicator.report()
@@ -6,13 +6,29 @@ Direct JSON API access with X-Requested-With header for 95% performance improvem
 
 import requests
 import json
+import multiprocessing
+import queue
+import sys
 import time
 from datetime import datetime, timezone
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Callable
 from dataclasses import dataclass
 from config.settings import settings
-from config.logging import LoggerMixin
+from config.logging import LoggerMixin, get_logger
 from services.region_mapping_manager import RegionMappingManager
+from services.metrics import SCRAPE_REQUEST_SECONDS, SCRAPE_REQUESTS, SCRAPE_BYTES, SCRAPE_LAST_RUN
+from services.deduplicator import Deduplicator
+from services.profiling import span, timed
+from services.scrape_watermarks import WatermarkStore, payload_hash, payload_watermark, watermark_unchanged
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    # orjson is optional; the stdlib decoder reads the same bytes, just slower
+    _json_loads = json.loads
+
+logger = get_logger('jsondistributorscraper')
 
 
 @dataclass
@@ -43,16 +59,246 @@ class JsonScrapedDistributor:
     # Metadata
     data_source: str = "json_api"
     scraped_at: Optional[datetime] = None
+    
+    @property
+    def last_modified_iso(self) -> Optional[str]:
+        return self.last_modified.isoformat() if self.last_modified else None
+    
+    @property
+    def scraped_at_iso(self) -> Optional[str]:
+        return self.scraped_at.isoformat() if self.scraped_at else None
+
+
+def _epoch_to_iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp is not None else None
+
+
+class CompactDistributor:
+    """Memory-compact scraped distributor - what the scraper, dedupe and processor pass around
+    
+    Same field names as JsonScrapedDistributor, but slotted (no per-instance __dict__),
+    float coordinates, epoch-second timestamps and interned region/type strings.
+    Convert with to_rich() / from_rich() where the dataclass is needed.
+    """
+    
+    __slots__ = (
+        'company_name', 'partner_type', 'website_url', 'address', 'phone', 'contact_email',
+        'latitude', 'longitude', 'region', 'country_state',
+        'unifi_id', 'last_modified_ts', 'order_weight', 'logo_url', 'sunmax_partner',
+        'data_source', 'scraped_at_ts'
+    )
+    
+    def __init__(self, company_name: str, partner_type: str, website_url: Optional[str] = None,
+                 address: str = "", phone: Optional[str] = None, contact_email: Optional[str] = None,
+                 latitude: Optional[float] = None, longitude: Optional[float] = None,
+                 region: Optional[str] = None, country_state: Optional[str] = None,
+                 unifi_id: Optional[int] = None, last_modified_ts: Optional[float] = None,
+                 order_weight: Optional[int] = None, logo_url: Optional[str] = None,
+                 sunmax_partner: bool = False, data_source: str = "json_api",
+                 scraped_at_ts: Optional[float] = None):
+        self.company_name = company_name
+        self.partner_type = sys.intern(partner_type)
+        self.website_url = website_url
+        self.address = address
+        self.phone = phone
+        self.contact_email = contact_email
+        self.latitude = latitude
+        self.longitude = longitude
+        self.region = sys.intern(region) if region else region
+        self.country_state = sys.intern(country_state) if country_state else country_state
+        self.unifi_id = unifi_id
+        self.last_modified_ts = last_modified_ts
+        self.order_weight = order_weight
+        self.logo_url = logo_url
+        self.sunmax_partner = sunmax_partner
+        self.data_source = sys.intern(data_source)
+        self.scraped_at_ts = scraped_at_ts
+    
+    @property
+    def last_modified(self) -> Optional[datetime]:
+        return datetime.fromtimestamp(self.last_modified_ts, timezone.utc) if self.last_modified_ts is not None else None
+    
+    @property
+    def scraped_at(self) -> Optional[datetime]:
+        return datetime.fromtimestamp(self.scraped_at_ts, timezone.utc) if self.scraped_at_ts is not None else None
+    
+    @property
+    def last_modified_iso(self) -> Optional[str]:
+        return _epoch_to_iso(self.last_modified_ts)
+    
+    @property
+    def scraped_at_iso(self) -> Optional[str]:
+        return _epoch_to_iso(self.scraped_at_ts)
+    
+    def to_rich(self) -> JsonScrapedDistributor:
+        """Expand into the JsonScrapedDistributor dataclass (string coordinates, datetimes)"""
+        return JsonScrapedDistributor(
+            company_name=self.company_name,
+            partner_type=self.partner_type,
+            website_url=self.website_url,
+            address=self.address,
+            phone=self.phone,
+            contact_email=self.contact_email,
+            latitude=repr(self.latitude) if self.latitude is not None else None,
+            longitude=repr(self.longitude) if self.longitude is not None else None,
+            region=self.region,
+            country_state=self.country_state,
+            unifi_id=self.unifi_id,
+            last_modified=self.last_modified,
+            order_weight=self.order_weight,
+            logo_url=self.logo_url,
+            sunmax_partner=self.sunmax_partner,
+            data_source=self.data_source,
+            scraped_at=self.scraped_at
+        )
+    
+    @classmethod
+    def from_rich(cls, distributor: JsonScrapedDistributor) -> 'CompactDistributor':
+        return cls(
+            company_name=distributor.company_name,
+            partner_type=distributor.partner_type,
+            website_url=distributor.website_url,
+            address=distributor.address,
+            phone=distributor.phone,
+            contact_email=distributor.contact_email,
+            latitude=_parse_coordinate(distributor.latitude),
+            longitude=_parse_coordinate(distributor.longitude),
+            region=distributor.region,
+            country_state=distributor.country_state,
+            unifi_id=distributor.unifi_id,
+            last_modified_ts=distributor.last_modified.timestamp() if distributor.last_modified else None,
+            order_weight=distributor.order_weight,
+            logo_url=distributor.logo_url,
+            sunmax_partner=bool(distributor.sunmax_partner),
+            data_source=distributor.data_source,
+            scraped_at_ts=distributor.scraped_at.timestamp() if distributor.scraped_at else None
+        )
+    
+    def astuple(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+    
+    def __eq__(self, other) -> bool:
+        return isinstance(other, CompactDistributor) and self.astuple() == other.astuple()
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return f"CompactDistributor(unifi_id={self.unifi_id}, company_name={self.company_name!r}, region={self.region}-{self.country_state})"
+
+
+# Record types produced by the JSON API scraper
+JSON_RECORD_TYPES = (JsonScrapedDistributor, CompactDistributor)
+
+
+def distributor_key(unifi_id: Optional[int], company_name: str, address: str) -> str:
+    """Identity of a distributor across scrapes: Unifi ID, else company name + address"""
+    if unifi_id:
+        return f"id:{unifi_id}"
+    return f"name_addr:{(company_name or '').lower().strip()}:{(address or '').lower().strip()}"
+
+
+def _parse_coordinate(value) -> Optional[float]:
+    """'42.2292779' -> 42.2292779; empty or invalid values -> None"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _compact_records(records: List[Dict], partner_type: str, region: str, country_state: str,
+                     scraped_at: float) -> List[CompactDistributor]:
+    """Convert one partner list of an API payload into CompactDistributors (scraped_at is epoch seconds)
+
+    The per-record hot path of parsing, kept in one loop: slots are filled
+    directly instead of going through __init__, and the region/type strings are
+    interned once per list. Cleaning rules: records without a name or address
+    are dropped, names/addresses/emails are stripped, 'mailto:' is removed from
+    emails and URLs in the email field are dropped, unparseable coordinates and
+    timestamps become None.
+    """
+    partner_type = sys.intern(partner_type)
+    region = sys.intern(region) if region else region
+    country_state = sys.intern(country_state) if country_state else country_state
+    data_source = sys.intern("json_api")
+    fromisoformat = datetime.fromisoformat
+    new = CompactDistributor.__new__
+    
+    distributors = []
+    append = distributors.append
+    for data in records:
+        try:
+            get = data.get
+            company_name = (get('name') or '').strip()
+            address = (get('address') or '').strip()
+            if not company_name or not address:
+                continue
+            
+            email = (get('email') or '').strip()
+            if email.startswith('mailto:'):
+                email = email[7:]
+            elif email.startswith('http'):  # Sometimes email field contains URLs
+                email = None
+            
+            try:
+                latitude = float(get('latitude'))
+            except (TypeError, ValueError):
+                latitude = None
+            try:
+                longitude = float(get('longitude'))
+            except (TypeError, ValueError):
+                longitude = None
+            
+            last_modified = get('last_modified')
+            if last_modified:
+                try:
+                    last_modified = fromisoformat(last_modified.replace('Z', '+00:00')).timestamp()
+                except (TypeError, ValueError, AttributeError):
+                    last_modified = None
+            else:
+                last_modified = None
+            
+            distributor = new(CompactDistributor)
+            distributor.company_name = company_name
+            distributor.partner_type = partner_type
+            distributor.website_url = get('url') or None
+            distributor.address = address
+            distributor.phone = get('phone') or None
+            distributor.contact_email = email or None
+            distributor.latitude = latitude
+            distributor.longitude = longitude
+            distributor.region = region
+            distributor.country_state = country_state
+            distributor.unifi_id = get('id')
+            distributor.last_modified_ts = last_modified
+            distributor.order_weight = get('order')
+            distributor.logo_url = get('logo') or None
+            distributor.sunmax_partner = bool(get('sunmax', False))
+            distributor.data_source = data_source
+            distributor.scraped_at_ts = scraped_at
+            append(distributor)
+        except Exception as e:
+            # A malformed record is skipped, not the whole response
+            logger.error(f"Error converting JSON data to distributor: {str(e)}")
+    
+    return distributors
 
 
 class JsonDistributorScraper(LoggerMixin):
     """JSON API-based distributor scraper - 95% performance improvement over HTML parsing"""
     
-    def __init__(self, use_dynamic_mapping: bool = True):
-        self.base_url = "https://www.ui.com/distributors/"
-        self.session = self._create_json_session()
+    # Pause between region/country requests - be gentle on the API
+    DEFAULT_REQUEST_DELAY = 0.2
+    
+    def __init__(self, use_dynamic_mapping: bool = True, base_url: Optional[str] = None,
+                 request_delay: Optional[float] = None):
+        # base_url / request_delay can point the scraper at a local replay server (see services/replay_server.py)
+        self.base_url = base_url or "https://www.ui.com/distributors/"
+        self.request_delay = self.DEFAULT_REQUEST_DELAY if request_delay is None else request_delay
+        self._session = None
         
-        # Region mapping
+        # Region mapping (served from the process-wide mapping cache)
         self.use_dynamic_mapping = use_dynamic_mapping
         if use_dynamic_mapping:
             self.mapping_manager = RegionMappingManager()
@@ -64,11 +310,20 @@ class JsonDistributorScraper(LoggerMixin):
         self.request_count = 0
         self.total_distributors = 0
         self.start_time = None
+        self.last_dedupe_report = None
         
         self.logger.info("JSON API distributor scraper initialized")
         self.logger.info(f"Loaded {len(self.region_country_mapping)} regions with {sum(len(countries) for countries in self.region_country_mapping.values())} combinations")
     
-    def _create_json_session(self) -> requests.Session:
+    @property
+    def session(self) -> requests.Session:
+        """JSON API session, created on the first request"""
+        if self._session is None:
+            self._session = self.create_json_session()
+        return self._session
+    
+    @staticmethod
+    def create_json_session() -> requests.Session:
         """Create session optimized for JSON API requests"""
         session = requests.Session()
         session.headers.update({
@@ -85,14 +340,26 @@ class JsonDistributorScraper(LoggerMixin):
         })
         return session
     
-    def scrape_all_distributors(self) -> List[JsonScrapedDistributor]:
-        """Scrape all distributors using JSON API - Revolutionary performance"""
+    @timed('scrape')
+    def scrape_all_distributors(self, progress_callback: Optional[Callable[[int, int, int], None]] = None,
+                                workers: Optional[int] = None) -> List[CompactDistributor]:
+        """Scrape all distributors using JSON API - Revolutionary performance
+
+        progress_callback, if given, is called after every region/country pair with
+        (pairs_done, pairs_total, distributors_found).
+        workers > 1 (default: SCRAPE_WORKERS) shards the pairs across that many
+        processes, see scrape_sharded().
+        """
+        workers = settings.scrape_workers if workers is None else workers
         self.logger.info("🚀 Starting JSON API scraping - Revolutionary performance mode")
         
         self.start_time = time.time()
         self.request_count = 0
         self.total_distributors = 0
         
+        if workers > 1:
+            return self._finalize_scrape(self.scrape_sharded(workers, progress_callback))
+        
         all_distributors = []
         total_combinations = sum(len(countries) for countries in self.region_country_mapping.values())
         current_combination = 0
@@ -131,13 +398,18 @@ class JsonDistributorScraper(LoggerMixin):
                         region_stats['errors'] += 1
                         self.logger.warning(f"❌ {region}-{country}: Failed to fetch data")
                     
-                    # Rate limiting - be gentle on the API
-                    time.sleep(0.2)
-                    
                 except Exception as e:
                     region_stats['errors'] += 1
                     self.logger.error(f"💥 Error processing {region}-{country}: {str(e)}")
                     continue
+                finally:
+                    if progress_callback:
+                        progress_callback(current_combination, total_combinations,
+                                          len(all_distributors) + len(region_distributors))
+                    # Rate limiting - be gentle on the API, failed requests included
+                    if self.request_delay > 0:
+                        with span('rate_limit'):
+                            time.sleep(self.request_delay)
             
             # Log regional summary
             if region_stats['total'] > 0:
@@ -146,6 +418,10 @@ class JsonDistributorScraper(LoggerMixin):
             regional_stats[region] = region_stats
             all_distributors.extend(region_distributors)
         
+        return self._finalize_scrape(all_distributors)
+    
+    def _finalize_scrape(self, all_distributors: List[CompactDistributor]) -> List[CompactDistributor]:
+        """Deduplicate a run's records, log the performance summary and publish run metrics"""
         # Deduplicate and finalize
         unique_distributors = self.deduplicate_distributors(all_distributors)
         
@@ -157,33 +433,200 @@ class JsonDistributorScraper(LoggerMixin):
         self.logger.info(f"📊 Performance metrics:")
         self.logger.info(f"   ⏱️  Total time: {elapsed_time:.1f} seconds")
         self.logger.info(f"   🔄 API requests: {self.request_count}")
-        self.logger.info(f"   📈 Avg request time: {elapsed_time/self.request_count:.2f}s")
+        self.logger.info(f"   📈 Avg request time: {elapsed_time/max(self.request_count, 1):.2f}s")
         self.logger.info(f"   🎯 Total distributors: {self.total_distributors}")
         self.logger.info(f"   ⚡ Performance: {self.total_distributors/elapsed_time:.1f} distributors/second")
         
+        for metric, value in self.get_performance_metrics().items():
+            SCRAPE_LAST_RUN.set(value, metric=metric)
+        
         return unique_distributors
     
+    @timed('scrape')
+    def scrape_incremental(self, progress_callback: Optional[Callable[[int, int, int], None]] = None,
+                           full_pass: Optional[bool] = None,
+                           store: Optional[WatermarkStore] = None,
+                           scheduler=None) -> Tuple[List[CompactDistributor], Dict]:
+        """Fetch pairs, but only convert pairs whose watermark moved since the last processed run
+
+        A pair with the same payload hash, or the same reseller counts and newest
+        last_modified, is skipped after decoding. full_pass (default: when
+        SCRAPE_FULL_PASS_HOURS have passed since the last one) converts every pair
+        regardless. With a PairScheduler (services.pair_scheduler), runs other than
+        full passes only fetch the pairs it reports due, and every run's requests are
+        charged to its daily budget as soon as they are made.
+        
+        Returns (distributors, run): run lists changed / unchanged / failed /
+        unscheduled pairs, excluded_pairs (all but the changed ones - keep them out
+        of missing detection) and the new watermarks. Save those with
+        WatermarkStore.save() (and PairScheduler.record_run()) once the
+        distributors are stored.
+        """
+        store = store or WatermarkStore()
+        if full_pass is None:
+            full_pass = store.full_pass_due()
+        previous = store.load()
+        self.logger.info(f"🚀 Starting incremental JSON API scraping ({'full pass' if full_pass else 'changed pairs only'})")
+        
+        self.start_time = time.time()
+        self.request_count = 0
+        self.total_distributors = 0
+        
+        now = datetime.utcnow().isoformat()
+        run = {'full_pass': full_pass, 'changed_pairs': [], 'unchanged_pairs': [], 'failed_pairs': [],
+               'unscheduled_pairs': [], 'watermarks': []}
+        all_distributors = []
+        pairs = [(region, country) for region, countries in self.region_country_mapping.items() for country in countries]
+        if scheduler is not None and not full_pass:
+            due = set(scheduler.due_pairs(pairs))
+            run['unscheduled_pairs'] = [pair for pair in pairs if pair not in due]
+            pairs = [pair for pair in pairs if pair in due]
+        
+        for done, (region, country) in enumerate(pairs, 1):
+            try:
+                json_data, stats = self.fetch_region_country_json(region, country)
+                if not json_data:
+                    run['failed_pairs'].append((region, country))
+                    self.logger.warning(f"❌ {region}-{country}: Failed to fetch data")
+                    continue
+                
+                prior = previous.get((region, country))
+                watermark = dict(payload_watermark(json_data, stats['payload_hash']),
+                                 region=region, country_state=country, checked_at=now)
+                if not full_pass and watermark_unchanged(prior, watermark):
+                    run['unchanged_pairs'].append((region, country))
+                    watermark.update(changed_at=prior['changed_at'], full_at=prior['full_at'])
+                else:
+                    distributors = self.parse_json_response(json_data, region, country)
+                    all_distributors.extend(distributors)
+                    run['changed_pairs'].append((region, country))
+                    changed = not watermark_unchanged(prior, watermark)
+                    watermark.update(changed_at=now if changed else prior['changed_at'],
+                                     full_at=now if full_pass else (prior or {}).get('full_at'))
+                run['watermarks'].append(watermark)
+            except Exception as e:
+                run['failed_pairs'].append((region, country))
+                self.logger.error(f"💥 Error processing {region}-{country}: {str(e)}")
+            finally:
+                if progress_callback:
+                    progress_callback(done, len(pairs), len(all_distributors))
+                # Failed requests are paced too, so an outage is not hammered back to back
+                if self.request_delay > 0:
+                    with span('rate_limit'):
+                        time.sleep(self.request_delay)
+        
+        if scheduler is not None:
+            scheduler.record_requests(len(pairs))
+        run['excluded_pairs'] = run['unchanged_pairs'] + run['failed_pairs'] + run['unscheduled_pairs']
+        self.logger.info(f"💧 {len(run['changed_pairs'])} changed, {len(run['unchanged_pairs'])} unchanged, "
+                         f"{len(run['failed_pairs'])} failed, {len(run['unscheduled_pairs'])} not due pairs")
+        return self._finalize_scrape(all_distributors), run
+    
+    def scrape_sharded(self, workers: int,
+                       progress_callback: Optional[Callable[[int, int, int], None]] = None) -> List[CompactDistributor]:
+        """Scrape every region/country pair across worker processes (before deduplication)
+
+        Pairs are dealt round-robin to the workers so each shard mixes large and
+        small regions. Every worker opens its own session and waits
+        request_delay * workers between its requests, so together they keep the
+        serial request rate. Results come back through a queue and are merged in
+        mapping order - the same list a serial run builds. Request/byte counters
+        recorded inside workers stay in those processes (not in /metrics).
+        """
+        pairs = [(region, country) for region, countries in self.region_country_mapping.items()
+                 for country in countries]
+        workers = min(workers, len(pairs)) or 1
+        self.logger.info(f"🧩 Sharding {len(pairs)} region/country pairs across {workers} worker processes")
+        
+        context = multiprocessing.get_context('spawn')
+        results_queue = context.Queue()
+        processes = [
+            context.Process(
+                target=_scrape_shard, name=f"scrape-shard-{shard}", daemon=True,
+                args=(self.base_url, self.request_delay * workers,
+                      [(index, *pairs[index]) for index in range(shard, len(pairs), workers)], results_queue)
+            )
+            for shard in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        
+        results: Dict[int, Optional[List[CompactDistributor]]] = {}
+        found = 0
+        finished = 0
+        try:
+            while finished < workers:
+                try:
+                    index, payload, requests_made = results_queue.get(timeout=1.0)
+                except queue.Empty:
+                    if not any(process.is_alive() for process in processes):
+                        self.logger.error("💥 Scrape workers exited before reporting every pair")
+                        break
+                    continue
+                if index is None:
+                    finished += 1
+                    self.request_count += requests_made
+                    continue
+                results[index] = payload
+                found += len(payload or ())
+                if progress_callback:
+                    progress_callback(len(results), len(pairs), found)
+        finally:
+            for process in processes:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        
+        # Merge in mapping order so records come out in the same order as a serial run
+        all_distributors = []
+        regional_stats = {}
+        for index, (region, country) in enumerate(pairs):
+            region_stats = regional_stats.setdefault(region, {'total': 0, 'masters': 0, 'resellers': 0, 'errors': 0})
+            distributors = results.get(index)
+            if distributors is None:
+                region_stats['errors'] += 1
+                self.logger.warning(f"❌ {region}-{country}: Failed to fetch data")
+                continue
+            all_distributors.extend(distributors)
+            region_stats['total'] += len(distributors)
+            region_stats['masters'] += sum(1 for d in distributors if d.partner_type == 'master')
+            region_stats['resellers'] += sum(1 for d in distributors if d.partner_type == 'simple')
+        
+        for region, region_stats in regional_stats.items():
+            if region_stats['total'] > 0:
+                self.logger.info(f"📊 {region.upper()} summary: {region_stats['total']} total ({region_stats['masters']} masters, {region_stats['resellers']} resellers)")
+        
+        return all_distributors
+    
+    @timed('fetch')
     def fetch_region_country_json(self, region: str, country_state: str) -> Tuple[Optional[Dict], Dict]:
         """Fetch JSON data for specific region-country combination"""
         url = f"{self.base_url}?region={region}&country_state={country_state}"
         
+        outcome = 'error'
+        request_start = time.perf_counter()
         try:
             self.request_count += 1
             response = self.session.get(url, timeout=30)
+            SCRAPE_REQUEST_SECONDS.observe(time.perf_counter() - request_start, region=region)
+            SCRAPE_BYTES.inc(len(response.content), region=region)
             response.raise_for_status()
             
             # Verify JSON response
             if 'application/json' not in response.headers.get('Content-Type', ''):
                 self.logger.warning(f"Non-JSON response for {region}-{country_state}")
+                outcome = 'non_json'
                 return None, {}
             
-            json_data = response.json()
+            json_data = _json_loads(response.content)
+            outcome = 'ok'
             
             # Extract statistics from response
             stats = {
                 'resellers_count': json_data.get('resellers_count', 0),
                 'master_resellers_count': json_data.get('master_resellers_count', 0),
-                'total_count': json_data.get('resellers_count', 0) + json_data.get('master_resellers_count', 0)
+                'total_count': json_data.get('resellers_count', 0) + json_data.get('master_resellers_count', 0),
+                'payload_hash': payload_hash(response.content)
             }
             
             return json_data, stats
@@ -197,138 +640,46 @@ class JsonDistributorScraper(LoggerMixin):
         except Exception as e:
             self.logger.error(f"Unexpected error for {region}-{country_state}: {str(e)}")
             return None, {}
+        finally:
+            SCRAPE_REQUESTS.inc(region=region, outcome=outcome)
     
-    def parse_json_response(self, json_data: Dict, region: str, country_state: str) -> List[JsonScrapedDistributor]:
+    @timed('parse')
+    def parse_json_response(self, json_data: Dict, region: str, country_state: str) -> List[CompactDistributor]:
         """Parse JSON response into distributor objects"""
-        distributors = []
-        scraped_at = datetime.now(timezone.utc)
+        # One float shared by every record of the response; microsecond precision keeps to_rich()/from_rich() lossless
+        scraped_at = round(time.time(), 6)
         
         try:
-            # Process regular resellers
-            for reseller_data in json_data.get('resellers', []):
-                distributor = self._convert_json_to_distributor(
-                    reseller_data, 'simple', region, country_state, scraped_at
-                )
-                if distributor:
-                    distributors.append(distributor)
-            
-            # Process master resellers
-            for master_data in json_data.get('master_resellers', []):
-                distributor = self._convert_json_to_distributor(
-                    master_data, 'master', region, country_state, scraped_at
-                )
-                if distributor:
-                    distributors.append(distributor)
-            
+            # Regular resellers first, then master resellers
+            distributors = _compact_records(json_data.get('resellers') or [], 'simple', region, country_state, scraped_at)
+            distributors.extend(_compact_records(json_data.get('master_resellers') or [], 'master', region,
+                                                 country_state, scraped_at))
         except Exception as e:
             self.logger.error(f"Error parsing JSON response for {region}-{country_state}: {str(e)}")
+            return []
         
         return distributors
     
-    def _convert_json_to_distributor(self, data: Dict, partner_type: str, region: str, 
-                                   country_state: str, scraped_at: datetime) -> Optional[JsonScrapedDistributor]:
-        """Convert JSON data to JsonScrapedDistributor object"""
-        try:
-            # Parse last_modified
-            last_modified = None
-            if data.get('last_modified'):
-                try:
-                    last_modified = datetime.fromisoformat(data['last_modified'].replace('Z', '+00:00'))
-                except:
-                    pass
-            
-            # Clean and validate data
-            company_name = data.get('name', '').strip()
-            if not company_name:
-                return None
-            
-            address = data.get('address', '').strip()
-            if not address:
-                return None
-            
-            # Clean email (remove mailto: prefix if present)
-            email = data.get('email', '').strip()
-            if email.startswith('mailto:'):
-                email = email[7:]
-            elif email.startswith('http'):  # Sometimes email field contains URLs
-                email = None
-            
-            # Validate coordinates
-            latitude = data.get('latitude')
-            longitude = data.get('longitude')
-            if latitude:
-                try:
-                    float(latitude)
-                except:
-                    latitude = None
-            if longitude:
-                try:
-                    float(longitude)
-                except:
-                    longitude = None
-            
-            return JsonScrapedDistributor(
-                # Basic information
-                company_name=company_name,
-                partner_type=partner_type,
-                website_url=data.get('url') or None,
-                address=address,
-                phone=data.get('phone') or None,
-                contact_email=email or None,
-                
-                # Geographic data
-                latitude=latitude,
-                longitude=longitude,
-                region=region,
-                country_state=country_state,
-                
-                # Enhanced JSON API fields
-                unifi_id=data.get('id'),
-                last_modified=last_modified,
-                order_weight=data.get('order'),
-                logo_url=data.get('logo') or None,
-                sunmax_partner=data.get('sunmax', False),
-                
-                # Metadata
-                data_source="json_api",
-                scraped_at=scraped_at
-            )
-            
-        except Exception as e:
-            self.logger.error(f"Error converting JSON data to distributor: {str(e)}")
-            return None
-    
-    def deduplicate_distributors(self, distributors: List[JsonScrapedDistributor]) -> List[JsonScrapedDistributor]:
-        """Advanced deduplication using multiple criteria"""
+    @timed('dedupe')
+    def deduplicate_distributors(self, distributors: List[CompactDistributor]) -> List[CompactDistributor]:
+        """One record per distributor: matched by Unifi ID or normalized name + address, winner by rank
+        
+        See services.deduplicator; the winner does not depend on record order, so
+        serial and sharded runs keep the same records.
+        """
         if not distributors:
+            self.last_dedupe_report = None
             return []
         
-        seen = set()
-        unique_distributors = []
-        duplicates_found = 0
-        
-        for distributor in distributors:
-            # Create composite key for deduplication
-            # Priority: unifi_id > (company_name + address) > (company_name + coordinates)
-            
-            if distributor.unifi_id:
-                # Use Unifi ID as primary key (most reliable)
-                key = f"id:{distributor.unifi_id}"
-            else:
-                # Fallback to company name + address
-                key = f"name_addr:{distributor.company_name.lower().strip()}:{distributor.address.lower().strip()}"
-            
-            if key not in seen:
-                seen.add(key)
-                unique_distributors.append(distributor)
-            else:
-                duplicates_found += 1
-                self.logger.debug(f"Duplicate found: {distributor.company_name} ({key})")
+        deduplicator = Deduplicator()
+        deduplicator.add_batch(distributors)
+        self.last_dedupe_report = deduplicator.report()
         
-        if duplicates_found > 0:
-            self.logger.info(f"🔍 Deduplication: Removed {duplicates_found} duplicates, kept {len(unique_distributors)} unique")
+        if deduplicator.duplicates > 0:
+            by_region = ', '.join(f"{region}: {count}" for region, count in self.last_dedupe_report['duplicates_by_region'].items())
+            self.logger.info(f"🔍 Deduplication: Removed {deduplicator.duplicates} duplicates, kept {len(deduplicator)} unique ({by_region})")
         
-        return unique_distributors
+        return deduplicator.records()
     
     def get_performance_metrics(self) -> Dict:
         """Get detailed performance metrics"""
@@ -343,10 +694,12 @@ class JsonDistributorScraper(LoggerMixin):
             'total_distributors': self.total_distributors,
             'avg_request_time': elapsed_time / self.request_count if self.request_count > 0 else 0,
             'distributors_per_second': self.total_distributors / elapsed_time if elapsed_time > 0 else 0,
-            'requests_per_minute': (self.request_count / elapsed_time) * 60 if elapsed_time > 0 else 0
+            'requests_per_minute': (self.request_count / elapsed_time) * 60 if elapsed_time > 0 else 0,
+            'duplicates_removed': self.last_dedupe_report['duplicates'] if self.last_dedupe_report else 0
         }
     
-    def _get_static_mapping(self) -> Dict[str, List[str]]:
+    @staticmethod
+    def _get_static_mapping() -> Dict[str, List[str]]:
         """Static backup mapping"""
         return {
             'af': ['CD', 'GH', 'KE', 'LY', 'NA', 'NG', 'ZA', 'TZ', 'UG', 'ZW'],
@@ -419,4 +772,25 @@ class JsonApiValidator:
             except:
                 errors.append(f"Invalid longitude format: {data['longitude']}")
         
-        return len(errors) == 0, errors
\ No newline at end of file
+        return len(errors) == 0, errors
+
+
+def _scrape_shard(base_url: str, request_delay: float, pairs: List[Tuple[int, str, str]], results_queue):
+    """Worker process body of JsonDistributorScraper.scrape_sharded()
+
+    Puts (index, distributors or None on failure, 0) per pair, then a final
+    (None, None, requests_made) once the shard is done.
+    """
+    scraper = JsonDistributorScraper(use_dynamic_mapping=False, base_url=base_url, request_delay=request_delay)
+    for index, region, country in pairs:
+        distributors = None
+        try:
+            json_data, _ = scraper.fetch_region_country_json(region, country)
+            if json_data:
+                distributors = scraper.parse_json_response(json_data, region, country)
+        except Exception as e:
+            scraper.logger.error(f"💥 Error processing {region}-{country}: {str(e)}")
+        results_queue.put((index, distributors, 0))
+        if request_delay > 0:
+            time.sleep(request_delay)
+    results_queue.put((None, None, scraper.request_count))
@@ -1,43 +1,87 @@
 #!/usr/bin/env python3
 """
 Enhanced Data Processor for JSON API enriched data
-Handles both legacy ScrapedDistributor and new JsonScrapedDistributor
+Handles legacy ScrapedDistributor and JSON API records (CompactDistributor / JsonScrapedDistributor)
+
+On every backend, JSON API records go through the repository in bulk: one read of
+their prior state, one company upsert, one distributor upsert and one bulk
+deactivation of missing distributors. Change history and lifecycle events are
+diffed in memory against the prior state and written in batches. Legacy records
+(no unifi_id) are written row by row, on SQLite only.
+
+Everything after the monitoring session is opened - upserts, change history,
+lifecycle events and deactivations - runs in one transaction on the
+repository's connection, so a failed run leaves no half-recorded changes.
 """
 
-import sqlite3
+import time
 from datetime import datetime
-from typing import List, Union, Dict
+from typing import Collection, List, Union, Dict, Optional, Callable, Tuple
 from config.logging import LoggerMixin
-from services.distributor_scraper import JsonScrapedDistributor
+from services.distributor_scraper import JsonScrapedDistributor, CompactDistributor, JSON_RECORD_TYPES
 from models.schemas import ScrapedDistributor
+from services.profiling import span, timed
+from services.history_store import HistoryStore
+from services.change_capture import ChangeCapture
+from services.lifecycle_tracker import LifecycleTracker
+from config.settings import settings
+from config.sqlite import database_path
+from services.repository import DistributorRepository, SQLiteDistributorRepository, get_repository, scraped_row
+from services.metrics import (
+    PROCESSOR_ROWS, PROCESSOR_ROWS_PER_SECOND, PROCESSOR_SQL_STATEMENTS, PROCESSOR_SQL_STATEMENTS_LAST_RUN
+)
 
 
 class EnhancedDataProcessor(LoggerMixin):
     """Enhanced data processor with JSON API support"""
     
-    def __init__(self, db_path: str = "unifi_distributors.db"):
-        self.db_path = db_path
-        self.logger.info("Enhanced data processor initialized")
+    # How often (in rows) progress callbacks fire
+    PROGRESS_INTERVAL = 100
+    
+    # Change history rows written per executemany
+    CHANGE_BATCH_SIZE = 500
     
-    def process_distributors(self, distributors: List[Union[JsonScrapedDistributor, ScrapedDistributor]]) -> Dict:
-        """Process distributors with enhanced JSON API field support"""
+    def __init__(self, db_path: Optional[str] = None, repository: Optional[DistributorRepository] = None):
+        """db_path / repository default to the database behind DATABASE_URL"""
+        self.db_path = db_path or database_path()
+        self.repository = repository or (SQLiteDistributorRepository(db_path) if db_path else get_repository())
+        self._company_ids: Dict[str, int] = {}
+        self.logger.info(f"Enhanced data processor initialized ({self.repository.backend})")
+    
+    @timed('process')
+    def process_distributors(self, distributors: List[Union[CompactDistributor, JsonScrapedDistributor, ScrapedDistributor]],
+                             detect_missing: bool = True,
+                             progress_callback: Optional[Callable[[int], None]] = None,
+                             excluded_pairs: Optional[Collection[Tuple[str, str]]] = None) -> Dict:
+        """Process distributors with enhanced JSON API field support
+
+        progress_callback, if given, is called every PROGRESS_INTERVAL rows (and once at
+        the end) with the number of rows written so far.
+        excluded_pairs are (region, country_state) pairs that were not re-scraped
+        (incremental runs): their distributors are never treated as missing, and
+        keep that pair when also listed under a re-scraped one.
+        """
         
         results = {
             'created': 0,
             'updated': 0,
             'skipped': 0,
             'deactivated': 0,
+            'reactivated': 0,
             'errors': [],
             'missing_errors': [],
             'json_api_records': 0,
-            'legacy_records': 0
+            'legacy_records': 0,
+            'changes_recorded': 0,
+            'lifecycle': {},
+            'session_id': None
         }
         
         if not distributors:
             return results
         
         # Count record types
-        json_api_count = sum(1 for d in distributors if isinstance(d, JsonScrapedDistributor))
+        json_api_count = sum(1 for d in distributors if isinstance(d, JSON_RECORD_TYPES))
         legacy_count = len(distributors) - json_api_count
         
         results['json_api_records'] = json_api_count
@@ -47,116 +91,201 @@ class EnhancedDataProcessor(LoggerMixin):
         self.logger.info(f"   🚀 JSON API records: {json_api_count}")
         self.logger.info(f"   🔧 Legacy records: {legacy_count}")
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        keyed = [d for d in distributors if isinstance(d, JSON_RECORD_TYPES) and d.unifi_id]
+        legacy = [d for d in distributors if not isinstance(d, JSON_RECORD_TYPES)]
+        # JSON API records without a unifi_id cannot be keyed for the upsert
+        results['skipped'] = json_api_count - len(keyed)
+        if legacy and self.repository.backend != 'sqlite':
+            self.logger.warning(f"⏭️ {len(legacy)} legacy records skipped: only the SQLite backend writes them")
+            results['skipped'] += len(legacy)
+            legacy = []
+        
+        conn = self.repository.connection()
+        cursor = self.repository.cursor(conn)
+        rows_written = 0
+        
+        # Count every statement the run issues on its own connection (including BEGIN/COMMIT);
+        # on SQLite that connection also carries the repository's bulk writes
+        sql_statements = 0
+        
+        def count_statement(_statement):
+            nonlocal sql_statements
+            sql_statements += 1
+        
+        if self.repository.backend == 'sqlite':
+            conn.set_trace_callback(count_statement)
+        run_start = time.perf_counter()
+        
+        lifecycle = LifecycleTracker(cursor, batch_size=self.CHANGE_BATCH_SIZE)
+        try:
+            results['session_id'] = lifecycle.open_session(len(distributors), {
+                'json_api_records': json_api_count, 'legacy_records': legacy_count, 'detect_missing': detect_missing
+            })
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            lifecycle.enabled = False
+            self.logger.warning(f"Monitoring session not opened, lifecycle events disabled: {str(e)}")
         
         try:
-            for distributor in distributors:
-                try:
-                    if isinstance(distributor, JsonScrapedDistributor):
-                        result = self._process_json_distributor(cursor, distributor)
-                    else:
-                        result = self._process_legacy_distributor(cursor, distributor)
+            with span('change_preload'):
+                # Prior state of exactly the distributors this run touches, in one bulk read
+                prior = self.repository.bulk_read({d.unifi_id for d in keyed}, conn)
+                if excluded_pairs:
+                    self._keep_excluded_pairs(keyed, prior, excluded_pairs)
+                changes = ChangeCapture(cursor, batch_size=self.CHANGE_BATCH_SIZE)
+                changes.load(prior.values(), unkeyed=bool(legacy))
+                # Every company of the run resolved in one bulk upsert instead of a lookup per row
+                self._company_ids = self.repository.upsert_companies(
+                    {d.company_name: d.website_url for d in keyed + legacy}, conn)
+            
+            with span('db_write'):
+                upserted = self.repository.bulk_upsert(
+                    [scraped_row(d, self._company_ids[d.company_name]) for d in keyed], conn)
+                results['created'] += upserted['created']
+                results['updated'] += upserted['updated']
+                results['reactivated'] = sum(1 for row in prior.values() if not row['is_active'])
+                if results['reactivated']:
+                    self.logger.info(f"♻️ Reactivated {results['reactivated']} returning distributors")
+                
+                distributor_ids = {unifi_id: row['id'] for unifi_id, row in prior.items()}
+                distributor_ids.update((unifi_id, row['id']) for unifi_id, row in self.repository.bulk_read(
+                    {d.unifi_id for d in keyed if d.unifi_id not in distributor_ids}, conn).items())
+                
+                for distributor in keyed:
+                    distributor_id = distributor_ids[distributor.unifi_id]
+                    result = 'updated' if distributor_id in changes.states else 'created'
+                    event = changes.record_write(distributor_id, result, distributor)
+                    if event:
+                        self._record_lifecycle_event(lifecycle, distributor_id, event)
+                    rows_written += 1
+                    if progress_callback and rows_written % self.PROGRESS_INTERVAL == 0:
+                        progress_callback(rows_written)
+                
+                for distributor in legacy:
+                    try:
+                        result, distributor_id = self._process_legacy_distributor(cursor, distributor)
+                        event = changes.record_write(distributor_id, result, distributor)
+                        if event:
+                            self._record_lifecycle_event(lifecycle, distributor_id, event)
+                        results[result] += 1
+                        rows_written += 1
                     
-                    results[result] += 1
+                    except Exception as e:
+                        error_msg = f"Error processing {distributor.company_name}: {str(e)}"
+                        self.logger.error(error_msg)
+                        results['errors'].append(error_msg)
+                        continue
                     
-                except Exception as e:
-                    error_msg = f"Error processing {distributor.company_name}: {str(e)}"
-                    self.logger.error(error_msg)
-                    results['errors'].append(error_msg)
-                    continue
+                    if progress_callback and rows_written % self.PROGRESS_INTERVAL == 0:
+                        progress_callback(rows_written)
+                
+                changes.flush()
+                lifecycle.flush()
+            if progress_callback:
+                progress_callback(rows_written)
             
+            # Detect missing distributors (existing in DB but not in current scrape)
+            if detect_missing:
+                with span('missing_detection'):
+                    missing_results = self._detect_missing_distributors(conn, cursor, keyed, changes, lifecycle,
+                                                                        excluded_pairs)
+                    results['deactivated'] = missing_results['deactivated']
+                    results['missing_errors'] = missing_results['errors']
+                    changes.flush()
+                    lifecycle.flush()
+            
+            results['changes_recorded'] = sum(changes.recorded.values())
+            results['lifecycle'] = dict(lifecycle.totals)
+            lifecycle.close_session('completed')
+            # The run's only commit: distributors, change history and lifecycle events land together
             conn.commit()
             
-            # Detect missing distributors (existing in DB but not in current scrape)
-            missing_results = self._detect_missing_distributors(cursor, distributors)
-            results['deactivated'] = missing_results['deactivated']
-            results['missing_errors'] = missing_results['errors']
+            if settings.history_enabled:
+                results['history'] = self._record_history(distributors, full_run=detect_missing and not excluded_pairs)
             
-            self.logger.info(f"✅ Processing completed: Created {results['created']}, Updated {results['updated']}, Deactivated {results['deactivated']}, Errors {len(results['errors']) + len(results['missing_errors'])}")
+            self.logger.info(f"✅ Processing completed ({self.repository.backend}): Created {results['created']}, Updated {results['updated']}, Reactivated {results['reactivated']}, Skipped {results['skipped']}, Deactivated {results['deactivated']}, Errors {len(results['errors']) + len(results['missing_errors'])}")
             
         except Exception as e:
             conn.rollback()
             error_msg = f"Database transaction failed: {str(e)}"
             self.logger.error(error_msg)
             results['errors'].append(error_msg)
+            # Rolled back: nothing of this run was written
+            results.update(created=0, updated=0, reactivated=0, deactivated=0, changes_recorded=0, lifecycle={})
+            try:
+                lifecycle.close_session('failed', error_msg)
+                conn.commit()
+            except Exception:
+                conn.rollback()
         finally:
+            if self.repository.backend == 'sqlite':
+                conn.set_trace_callback(None)
             conn.close()
+            self._company_ids = {}
+            self._export_run_metrics(results, time.perf_counter() - run_start, sql_statements)
         
         return results
     
-    def _process_json_distributor(self, cursor, distributor: JsonScrapedDistributor) -> str:
-        """Process JSON API distributor with enhanced fields"""
-        
-        # Handle company
-        company_id = self._get_or_create_company(cursor, distributor.company_name, distributor.website_url)
-        
-        # Check if distributor exists (prefer unifi_id, fallback to company+address)
-        existing_id = None
-        
-        if distributor.unifi_id:
-            cursor.execute("SELECT id FROM distributors WHERE unifi_id = ?", (distributor.unifi_id,))
-            result = cursor.fetchone()
-            if result:
-                existing_id = result[0]
-        
-        if not existing_id:
-            cursor.execute("""
-                SELECT id FROM distributors 
-                WHERE company_id = ? AND address = ?
-            """, (company_id, distributor.address))
-            result = cursor.fetchone()
-            if result:
-                existing_id = result[0]
-        
-        current_time = datetime.now().isoformat()
-        
-        if existing_id:
-            # Update existing distributor with enhanced fields
-            cursor.execute("""
-                UPDATE distributors SET
-                    partner_type = ?, phone = ?, contact_email = ?,
-                    latitude = ?, longitude = ?, region = ?, country_state = ?,
-                    unifi_id = ?, last_modified_at = ?, order_weight = ?,
-                    logo_url = ?, sunmax_partner = ?, data_source = ?, scraped_at = ?,
-                    last_verified_at = ?, updated_at = ?
-                WHERE id = ?
-            """, (
-                distributor.partner_type, distributor.phone, distributor.contact_email,
-                distributor.latitude, distributor.longitude, distributor.region, distributor.country_state,
-                distributor.unifi_id,
-                distributor.last_modified.isoformat() if distributor.last_modified else None,
-                distributor.order_weight, distributor.logo_url, distributor.sunmax_partner,
-                distributor.data_source,
-                distributor.scraped_at.isoformat() if distributor.scraped_at else current_time,
-                current_time, current_time, existing_id
-            ))
-            return 'updated'
+    def _keep_excluded_pairs(self, keyed: List, prior: Dict[int, Dict],
+                             excluded_pairs: Collection[Tuple[str, str]]) -> int:
+        """Give records stored under a pair that was not re-scraped that pair back
+
+        An incremental run only deduplicates the pairs it re-scraped, so a distributor
+        listed under both a changed and an unchanged pair would move to the changed
+        one. Records are updated in place; returns how many were kept.
+        """
+        excluded = set(excluded_pairs)
+        kept = 0
+        for distributor in keyed:
+            row = prior.get(distributor.unifi_id)
+            if row is None or not row['is_active']:
+                continue
+            stored = (row['region'], row['country_state'])
+            if stored in excluded and stored != (distributor.region, distributor.country_state):
+                distributor.region, distributor.country_state = stored
+                kept += 1
+        if kept:
+            self.logger.info(f"📌 {kept} distributors kept their region/country from pairs not re-scraped")
+        return kept
+    
+    @staticmethod
+    def _record_lifecycle_event(lifecycle: LifecycleTracker, distributor_id: int, event: Tuple):
+        event_type, old_state, new_state, changed_fields = event
+        if event_type == 'reactivated':
+            lifecycle.record('reactivated', distributor_id, old_state, new_state, reason='found_in_scraping')
+            if changed_fields:
+                lifecycle.record('updated', distributor_id, old_state, new_state, changed_fields)
         else:
-            # Create new distributor with enhanced fields
-            cursor.execute("""
-                INSERT INTO distributors (
-                    company_id, partner_type, address, latitude, longitude,
-                    phone, contact_email, region, country_state, is_active,
-                    unifi_id, last_modified_at, order_weight, logo_url, sunmax_partner,
-                    data_source, scraped_at,
-                    first_discovered_at, last_verified_at, created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                company_id, distributor.partner_type, distributor.address,
-                distributor.latitude, distributor.longitude, distributor.phone,
-                distributor.contact_email, distributor.region, distributor.country_state,
-                distributor.unifi_id,
-                distributor.last_modified.isoformat() if distributor.last_modified else None,
-                distributor.order_weight, distributor.logo_url, distributor.sunmax_partner,
-                distributor.data_source,
-                distributor.scraped_at.isoformat() if distributor.scraped_at else current_time,
-                current_time, current_time, current_time, current_time
-            ))
-            return 'created'
+            lifecycle.record(event_type, distributor_id, old_state, new_state, changed_fields)
     
-    def _process_legacy_distributor(self, cursor, distributor: ScrapedDistributor) -> str:
-        """Process legacy distributor (HTML method)"""
+    def _record_history(self, distributors, full_run: bool) -> Optional[Dict]:
+        """Append this run to the as-of history; failures are logged, never raised"""
+        try:
+            return HistoryStore(db_path=self.db_path).record_run(distributors, full_run=full_run)
+        except Exception as e:
+            self.logger.warning(f"History recording skipped: {str(e)}")
+            return None
+    
+    def _export_run_metrics(self, results: Dict, elapsed_seconds: float, sql_statements: int):
+        """Publish per-run row outcomes, throughput and statement count to /metrics"""
+        outcomes = {
+            'created': results['created'],
+            'updated': results['updated'],
+            'skipped': results['skipped'],
+            'deactivated': results['deactivated'],
+            'error': len(results['errors'])
+        }
+        for outcome, count in outcomes.items():
+            PROCESSOR_ROWS.inc(count, outcome=outcome)
+            PROCESSOR_ROWS_PER_SECOND.set(count / elapsed_seconds if elapsed_seconds > 0 else 0, outcome=outcome)
+        
+        PROCESSOR_SQL_STATEMENTS.inc(sql_statements)
+        PROCESSOR_SQL_STATEMENTS_LAST_RUN.set(sql_statements)
+        self.logger.info(f"📈 {sql_statements} SQL statements in {elapsed_seconds:.2f}s")
+    
+    def _process_legacy_distributor(self, cursor, distributor: ScrapedDistributor) -> Tuple[str, int]:
+        """Process legacy distributor (HTML method); returns (result, distributor id)"""
         
         # Handle company
         company_id = self._get_or_create_company(cursor, distributor.company_name, distributor.website_url)
@@ -168,7 +297,8 @@ class EnhancedDataProcessor(LoggerMixin):
         """, (company_id, distributor.address))
         
         existing_result = cursor.fetchone()
-        current_time = datetime.now().isoformat()
+        # Same UTC format as the repository's bulk writes, so timestamps compare as text
+        current_time = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
         
         if existing_result:
             existing_id = existing_result[0]
@@ -178,15 +308,16 @@ class EnhancedDataProcessor(LoggerMixin):
                     partner_type = ?, phone = ?, contact_email = ?,
                     latitude = ?, longitude = ?, region = ?, country_state = ?,
                     data_source = ?, scraped_at = ?,
+                    reactivated_at = CASE WHEN is_active = 0 THEN ? ELSE reactivated_at END, is_active = 1,
                     last_verified_at = ?, updated_at = ?
                 WHERE id = ?
             """, (
                 distributor.partner_type, distributor.phone, distributor.contact_email,
                 distributor.latitude, distributor.longitude, distributor.region, distributor.country_state,
                 'html_legacy', current_time,
-                current_time, current_time, existing_id
+                current_time, current_time, current_time, existing_id
             ))
-            return 'updated'
+            return 'updated', existing_id
         else:
             # Create new distributor
             cursor.execute("""
@@ -203,11 +334,15 @@ class EnhancedDataProcessor(LoggerMixin):
                 'html_legacy', current_time,
                 current_time, current_time, current_time, current_time
             ))
-            return 'created'
+            return 'created', cursor.lastrowid
     
     def _get_or_create_company(self, cursor, company_name: str, website_url: str = None) -> int:
         """Get existing company or create new one"""
         
+        # Resolved up front by the run's bulk company upsert
+        if company_name in self._company_ids:
+            return self._company_ids[company_name]
+        
         # Check if company exists
         cursor.execute("SELECT id FROM companies WHERE name = ?", (company_name,))
         result = cursor.fetchone()
@@ -231,115 +366,62 @@ class EnhancedDataProcessor(LoggerMixin):
     
     def get_processing_statistics(self) -> Dict:
         """Get processing statistics"""
-        
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            # Basic counts
-            cursor.execute("SELECT COUNT(*) FROM distributors WHERE is_active = 1")
-            total_active = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM companies")
-            total_companies = cursor.fetchone()[0]
-            
-            # Data source distribution
-            cursor.execute("""
-                SELECT data_source, COUNT(*)
-                FROM distributors 
-                WHERE is_active = 1
-                GROUP BY data_source
-            """)
-            source_dist = dict(cursor.fetchall())
-            
-            # JSON API enhancement stats
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN unifi_id IS NOT NULL THEN 1 ELSE 0 END) as with_unifi_id,
-                    SUM(CASE WHEN last_modified_at IS NOT NULL THEN 1 ELSE 0 END) as with_last_modified,
-                    SUM(CASE WHEN order_weight IS NOT NULL THEN 1 ELSE 0 END) as with_order_weight,
-                    SUM(CASE WHEN sunmax_partner = 1 THEN 1 ELSE 0 END) as sunmax_partners,
-                    MAX(scraped_at) as last_scrape
-                FROM distributors 
-                WHERE is_active = 1 AND data_source = 'json_api'
-            """)
-            json_stats = cursor.fetchone()
-            
-            return {
-                'total_active_distributors': total_active,
-                'total_companies': total_companies,
-                'data_source_distribution': source_dist,
-                'json_api_enhancements': {
-                    'total': json_stats[0] if json_stats else 0,
-                    'with_unifi_id': json_stats[1] if json_stats else 0,
-                    'with_last_modified': json_stats[2] if json_stats else 0,
-                    'with_order_weight': json_stats[3] if json_stats else 0,
-                    'sunmax_partners': json_stats[4] if json_stats else 0,
-                    'last_scrape': json_stats[5] if json_stats else None
-                }
-            }
-            
-        finally:
-            conn.close()
+        stats = self.repository.statistics()
+        return {
+            'total_active_distributors': stats['total_active'],
+            'total_companies': stats['total_companies'],
+            'data_source_distribution': {source: counts['total'] for source, counts in stats['source_distribution'].items()},
+            'json_api_enhancements': stats['json_api']
+        }
     
-    def _detect_missing_distributors(self, cursor, current_distributors: List[Union[JsonScrapedDistributor, ScrapedDistributor]]) -> Dict:
-        """Detect distributors that exist in DB but missing from current scrape"""
+    def _detect_missing_distributors(self, conn, cursor, keyed: List[Union[CompactDistributor, JsonScrapedDistributor]],
+                                     changes: ChangeCapture, lifecycle: LifecycleTracker,
+                                     excluded_pairs: Optional[Collection[Tuple[str, str]]] = None) -> Dict:
+        """Deactivate active distributors missing from the current scrape, in one bulk update
+
+        Distributors stored under an excluded (region, country_state) pair are left alone.
+        Their prior state is read in bulk so the deactivations reach change history and
+        the lifecycle log. Runs inside a savepoint of the run's transaction: a failure
+        is reported in errors and undoes only the deactivations.
+        """
         results = {'deactivated': 0, 'errors': []}
         
         try:
-            # Get all unifi_ids from current scrape
-            current_unifi_ids = set()
-            for dist in current_distributors:
-                if isinstance(dist, JsonScrapedDistributor) and dist.unifi_id:
-                    current_unifi_ids.add(dist.unifi_id)
-            
+            current_unifi_ids = {d.unifi_id for d in keyed}
             if not current_unifi_ids:
                 self.logger.warning("No unifi_ids found in current scrape, skipping missing detection")
                 return results
             
-            # Get all active distributors from database
-            cursor.execute("""
-                SELECT unifi_id, id FROM distributors 
-                WHERE is_active = 1 AND unifi_id IS NOT NULL
-            """)
-            db_distributors = cursor.fetchall()
+            excluded = set(excluded_pairs or ())
+            missing_unifi_ids = [unifi_id for unifi_id, pair in self.repository.active_unifi_ids(conn).items()
+                                 if unifi_id not in current_unifi_ids and pair not in excluded]
+            if not missing_unifi_ids:
+                self.logger.info("✅ No missing distributors detected")
+                return results
             
-            # Find missing unifi_ids (in DB but not in current scrape)
-            db_unifi_ids = {row[0] for row in db_distributors}
-            missing_unifi_ids = db_unifi_ids - current_unifi_ids
+            self.logger.info(f"🔍 Detected {len(missing_unifi_ids)} missing distributors")
+            cursor.execute("SAVEPOINT missing_detection")
+            try:
+                missing = self.repository.bulk_read(missing_unifi_ids, conn)
+                deactivated = self.repository.deactivate(missing_unifi_ids, conn)
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT missing_detection")
+                raise
+            finally:
+                cursor.execute("RELEASE SAVEPOINT missing_detection")
             
-            if missing_unifi_ids:
-                self.logger.info(f"🔍 Detected {len(missing_unifi_ids)} missing distributors")
-                
-                # Deactivate missing distributors
-                current_time = datetime.now().isoformat()
-                for unifi_id in missing_unifi_ids:
-                    try:
-                        cursor.execute("""
-                            UPDATE distributors 
-                            SET is_active = 0, 
-                                updated_at = ?,
-                                last_verified_at = ?
-                            WHERE unifi_id = ? AND is_active = 1
-                        """, (current_time, current_time, unifi_id))
-                        
-                        if cursor.rowcount > 0:
-                            results['deactivated'] += 1
-                            self.logger.debug(f"Deactivated distributor with unifi_id: {unifi_id}")
-                    
-                    except Exception as e:
-                        error_msg = f"Error deactivating distributor {unifi_id}: {str(e)}"
-                        self.logger.error(error_msg)
-                        results['errors'].append(error_msg)
-                
-                self.logger.info(f"✅ Deactivated {results['deactivated']} missing distributors")
-            else:
-                self.logger.info("✅ No missing distributors detected")
+            results['deactivated'] = deactivated
+            changes.add_states(missing.values())
+            for row in missing.values():
+                old_state = changes.record_deactivation(row['id'])
+                if old_state:
+                    lifecycle.record('deactivated', row['id'], old_state, None, reason='disappeared_from_scraping')
+            
+            self.logger.info(f"✅ Deactivated {results['deactivated']} missing distributors")
                 
         except Exception as e:
             error_msg = f"Error detecting missing distributors: {str(e)}"
             self.logger.error(error_msg)
             results['errors'].append(error_msg)
         
-        return results
\ No newline at end of file
+        return results
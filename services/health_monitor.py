@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Background Health Monitor
+Runs database / external API / Notion probes on an interval and caches the results,
+so health endpoints never block on network calls
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Callable, Dict, Optional
+import requests
+from config.settings import settings
+from config.logging import LoggerMixin
+from services.metrics import HEALTH_PROBE_LAST_CHECK
+
+
+@dataclass
+class ProbeResult:
+    """Outcome of a single health probe"""
+
+    name: str
+    status: str  # healthy, unhealthy, not_configured, unknown
+    checked_at: Optional[datetime] = None
+    latency_ms: Optional[float] = None
+    details: Dict = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+class HealthMonitor(LoggerMixin):
+    """Runs health probes in a background thread and serves the last results"""
+
+    # Probes that must be healthy for the service to be considered healthy/ready
+    REQUIRED_PROBES = ("database", "external_api")
+
+    def __init__(self, interval_seconds: Optional[int] = None, timeout_seconds: Optional[int] = None):
+        self.interval_seconds = interval_seconds or settings.health_check_interval_seconds
+        self.timeout_seconds = timeout_seconds or settings.health_check_timeout_seconds
+        self.stale_after_seconds = max(settings.health_stale_after_seconds, self.interval_seconds * 2)
+
+        self._session = requests.Session()
+        self._session.headers.update({'User-Agent': settings.user_agent})
+        self._notion = None
+
+        self._results: Dict[str, ProbeResult] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started_at = datetime.utcnow()
+
+        self.probes: Dict[str, Callable[[], ProbeResult]] = {
+            "database": self._probe_database,
+            "external_api": self._probe_external_api,
+            "notion": self._probe_notion,
+            "system": self._probe_system,
+        }
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start background probing (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name="health-monitor", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Health monitor started (interval {self.interval_seconds}s)")
+
+    def stop(self):
+        """Stop background probing"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.timeout_seconds + 1)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            self.run_once()
+            self._stop_event.wait(self.interval_seconds)
+
+    # ------------------------------------------------------------------
+    # Probing
+    # ------------------------------------------------------------------
+
+    def run_once(self) -> Dict[str, ProbeResult]:
+        """Run every probe now and store the results"""
+        for name, probe in self.probes.items():
+            start = time.perf_counter()
+            try:
+                result = probe()
+            except Exception as e:
+                result = ProbeResult(name=name, status="unhealthy", error=str(e))
+            result.checked_at = datetime.utcnow()
+            if result.latency_ms is None:
+                result.latency_ms = round((time.perf_counter() - start) * 1000, 2)
+
+            with self._lock:
+                self._results[name] = result
+            # Freshness for alerting: time() - last check > stale_after_seconds means the monitor stalled
+            HEALTH_PROBE_LAST_CHECK.set(time.time(), probe=name)
+
+        return self.get_results()
+
+    def _probe_database(self) -> ProbeResult:
+        from sqlalchemy import text
+        from config.database import engine
+
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            details = {
+                "total_companies": conn.execute(text("SELECT COUNT(*) FROM companies")).scalar(),
+                "total_distributors": conn.execute(text("SELECT COUNT(*) FROM distributors")).scalar(),
+                "active_distributors": conn.execute(
+                    text("SELECT COUNT(*) FROM distributors WHERE is_active = :active"), {"active": True}
+                ).scalar(),
+                "change_history": conn.execute(text("SELECT COUNT(*) FROM change_history")).scalar(),
+            }
+        return ProbeResult(name="database", status="healthy", details=details)
+
+    def _probe_external_api(self) -> ProbeResult:
+        response = self._session.get(settings.unifi_distributors_url, timeout=self.timeout_seconds)
+        return ProbeResult(
+            name="external_api",
+            status="healthy" if response.status_code == 200 else "unhealthy",
+            latency_ms=round(response.elapsed.total_seconds() * 1000, 2),
+            details={
+                "target_url": settings.unifi_distributors_url,
+                "response_status": response.status_code
+            }
+        )
+
+    def _probe_notion(self) -> ProbeResult:
+        if not (settings.notion_token and settings.notion_database_id):
+            return ProbeResult(name="notion", status="not_configured")
+
+        if self._notion is None:
+            from services.notion_sync import NotionSync
+            self._notion = NotionSync()
+
+        connection_ok = self._notion.test_connection()
+        return ProbeResult(
+            name="notion",
+            status="healthy" if connection_ok else "unhealthy",
+            error=None if connection_ok else "Connection test failed"
+        )
+
+    def _probe_system(self) -> ProbeResult:
+        try:
+            import psutil
+        except ImportError:
+            return ProbeResult(name="system", status="not_configured", details={"reason": "psutil not installed"})
+
+        return ProbeResult(
+            name="system",
+            status="healthy",
+            details={
+                "cpu_percent": psutil.cpu_percent(),
+                "memory_percent": psutil.virtual_memory().percent,
+                "disk_percent": psutil.disk_usage('/').percent
+            }
+        )
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def get_results(self) -> Dict[str, ProbeResult]:
+        """Last result of each probe; probes that never ran report 'unknown'"""
+        with self._lock:
+            results = dict(self._results)
+        for name in self.probes:
+            results.setdefault(name, ProbeResult(name=name, status="unknown"))
+        return results
+
+    def is_stale(self, result: ProbeResult) -> bool:
+        if not result.checked_at:
+            return True
+        return (datetime.utcnow() - result.checked_at).total_seconds() > self.stale_after_seconds
+
+    def overall_status(self, results: Optional[Dict[str, ProbeResult]] = None) -> str:
+        """healthy if every required probe is healthy and fresh, degraded if one is healthy
+        but stale (the monitor stopped probing), otherwise unhealthy"""
+        results = results or self.get_results()
+        status = "healthy"
+        for name in self.REQUIRED_PROBES:
+            if results[name].status != "healthy":
+                return "unhealthy"
+            if self.is_stale(results[name]):
+                status = "degraded"
+        return status
+
+    def liveness(self) -> Dict:
+        """Cheap liveness: the process answers requests"""
+        return {
+            "status": "alive",
+            "uptime_seconds": round((datetime.utcnow() - self.started_at).total_seconds(), 1),
+            "monitor_running": self.running
+        }
+
+    def readiness(self) -> Dict:
+        """Cheap readiness: last database probe is healthy and fresh"""
+        database = self.get_results()["database"]
+        ready = database.status == "healthy" and not self.is_stale(database)
+        return {
+            "status": "ready" if ready else "not_ready",
+            "database": database.status,
+            "database_checked_at": database.checked_at
+        }
+
+    def summary(self) -> Dict:
+        """Cached results in the shape served by /api/health"""
+        results = self.get_results()
+        checks = {}
+        for name, result in results.items():
+            check = result.to_dict()
+            check["stale"] = self.is_stale(result)
+            checks[name] = check
+        return {
+            "status": self.overall_status(results),
+            "checks": checks
+        }
+
+
+# Process-wide monitor started by the API
+health_monitor = HealthMonitor()
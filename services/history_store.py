@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Distributor History Store
+Point-in-time ("as-of") view of the distributor network, answered from periodic
+state checkpoints plus a compact change log. An as-of query loads the latest
+checkpoint taken at or before the requested time and overlays only the log
+entries recorded after it, so its cost is bounded by the checkpoint interval
+rather than by the total history length.
+"""
+
+import hashlib
+import json
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+from config.settings import settings
+from config.logging import LoggerMixin
+from config.sqlite import database_path, get_connection_manager
+from services.distributor_scraper import JSON_RECORD_TYPES, distributor_key
+from services.profiling import span, timed
+
+
+HISTORY_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS distributor_history_head (
+        record_key TEXT PRIMARY KEY,
+        state_hash TEXT NOT NULL,
+        state TEXT NOT NULL,
+        region TEXT,
+        partner_type TEXT,
+        is_active INTEGER NOT NULL,
+        changed_at TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS distributor_history_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        record_key TEXT NOT NULL,
+        changed_at TEXT NOT NULL,
+        state TEXT NOT NULL,
+        region TEXT,
+        partner_type TEXT,
+        is_active INTEGER NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS distributor_history_checkpoints (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        taken_at TEXT NOT NULL,
+        last_log_id INTEGER NOT NULL,
+        row_count INTEGER NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS distributor_history_checkpoint_rows (
+        checkpoint_id INTEGER NOT NULL,
+        record_key TEXT NOT NULL,
+        state TEXT NOT NULL,
+        region TEXT,
+        partner_type TEXT,
+        is_active INTEGER NOT NULL,
+        PRIMARY KEY (checkpoint_id, record_key)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_history_checkpoints_taken_at ON distributor_history_checkpoints(taken_at)",
+]
+
+# Database files whose history tables were created by this process
+_schema_ready = set()
+
+# Fields captured per distributor; scraped_at is left out so unchanged records are not re-logged
+STATE_FIELDS = (
+    'unifi_id', 'company_name', 'partner_type', 'website_url', 'address', 'phone', 'contact_email',
+    'latitude', 'longitude', 'region', 'country_state', 'order_weight', 'logo_url', 'sunmax_partner'
+)
+
+# Max keys per "IN (...)" lookup, below SQLite's host parameter limit
+_KEY_CHUNK = 500
+
+
+def format_timestamp(value: datetime) -> str:
+    """Fixed-width UTC timestamp, so history times compare correctly as text"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+
+def _coordinate(value) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def distributor_state(distributor) -> Dict:
+    """History state of a scraped record (JSON API or legacy)"""
+    state = {field: getattr(distributor, field, None) for field in STATE_FIELDS}
+    state['latitude'] = _coordinate(state['latitude'])
+    state['longitude'] = _coordinate(state['longitude'])
+    state['last_modified'] = distributor.last_modified_iso if isinstance(distributor, JSON_RECORD_TYPES) else None
+    state['is_active'] = True
+    return state
+
+
+def _encode_state(state: Dict) -> Tuple[str, str]:
+    encoded = json.dumps(state, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return encoded, hashlib.blake2b(encoded.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class HistoryStore(LoggerMixin):
+    """Change log + periodic checkpoints of distributor state, stored next to the distributors table"""
+
+    def __init__(self, db_path: Optional[str] = None,
+                 checkpoint_interval_hours: Optional[float] = None,
+                 checkpoint_max_changes: Optional[int] = None):
+        self.db_path = db_path or database_path()
+        self.checkpoint_interval = timedelta(hours=(
+            checkpoint_interval_hours if checkpoint_interval_hours is not None
+            else settings.history_checkpoint_interval_hours
+        ))
+        self.checkpoint_max_changes = (
+            checkpoint_max_changes if checkpoint_max_changes is not None
+            else settings.history_checkpoint_max_changes
+        )
+
+    def _connect(self, write: bool = False):
+        """The shared writer or this thread's reader; the history tables are created once per process"""
+        manager = get_connection_manager(self.db_path)
+        if self.db_path not in _schema_ready:
+            with manager.writer() as conn:
+                for statement in HISTORY_SCHEMA:
+                    conn.execute(statement)
+            _schema_ready.add(self.db_path)
+        return manager.writer() if write else manager.reader()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    @timed('history_record')
+    def record_run(self, distributors: Sequence, full_run: bool = True,
+                   run_at: Optional[datetime] = None) -> Dict:
+        """Log new and changed distributors of one scrape run
+
+        On a full run, distributors no longer listed are logged as inactive.
+        A checkpoint is taken when the interval has elapsed or the log since the
+        last checkpoint grew past checkpoint_max_changes.
+        """
+        changed_at = format_timestamp(run_at or datetime.now(timezone.utc))
+        results = {'logged': 0, 'deactivated': 0, 'unchanged': 0, 'checkpoint_id': None}
+
+        current: Dict[str, Dict] = {}
+        for distributor in distributors:
+            key = distributor_key(getattr(distributor, 'unifi_id', None), distributor.company_name, distributor.address)
+            current[key] = distributor_state(distributor)
+
+        conn = self._connect(write=True)
+        try:
+            heads = {
+                key: (state_hash, is_active)
+                for key, state_hash, is_active in conn.execute(
+                    "SELECT record_key, state_hash, is_active FROM distributor_history_head"
+                )
+            }
+
+            changes = []
+            for key, state in current.items():
+                encoded, state_hash = _encode_state(state)
+                head = heads.get(key)
+                if head and head[0] == state_hash:
+                    results['unchanged'] += 1
+                    continue
+                changes.append((key, changed_at, encoded, state_hash, state['region'], state['partner_type'], 1))
+            results['logged'] = len(changes)
+
+            if full_run:
+                missing = [key for key, (_, is_active) in heads.items() if is_active and key not in current]
+                for start in range(0, len(missing), _KEY_CHUNK):
+                    chunk = missing[start:start + _KEY_CHUNK]
+                    placeholders = ','.join('?' * len(chunk))
+                    for key, encoded in conn.execute(
+                        f"SELECT record_key, state FROM distributor_history_head WHERE record_key IN ({placeholders})",
+                        chunk
+                    ):
+                        state = json.loads(encoded)
+                        state['is_active'] = False
+                        encoded, state_hash = _encode_state(state)
+                        changes.append((key, changed_at, encoded, state_hash, state['region'], state['partner_type'], 0))
+                        results['deactivated'] += 1
+
+            with span('history_log'):
+                conn.executemany("""
+                    INSERT INTO distributor_history_log
+                    (record_key, changed_at, state, region, partner_type, is_active)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, [(key, at, encoded, region, partner_type, active)
+                      for key, at, encoded, _, region, partner_type, active in changes])
+                conn.executemany("""
+                    INSERT INTO distributor_history_head
+                    (record_key, changed_at, state, state_hash, region, partner_type, is_active)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(record_key) DO UPDATE SET
+                        changed_at = excluded.changed_at, state = excluded.state, state_hash = excluded.state_hash,
+                        region = excluded.region, partner_type = excluded.partner_type, is_active = excluded.is_active
+                """, changes)
+
+            if self._checkpoint_due(conn, changed_at):
+                results['checkpoint_id'] = self._take_checkpoint(conn, changed_at)
+
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        self.logger.info(f"🕰️ History: {results['logged']} changes logged, {results['deactivated']} deactivated, "
+                         f"{results['unchanged']} unchanged")
+        return results
+
+    def _checkpoint_due(self, conn: sqlite3.Connection, now: str) -> bool:
+        last = conn.execute(
+            "SELECT taken_at, last_log_id FROM distributor_history_checkpoints ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        if last is None:
+            return True
+        taken_at, last_log_id = last
+        if now >= format_timestamp(datetime.fromisoformat(taken_at) + self.checkpoint_interval):
+            return True
+        pending = conn.execute(
+            "SELECT COUNT(*) FROM distributor_history_log WHERE id > ?", (last_log_id,)
+        ).fetchone()[0]
+        return pending >= self.checkpoint_max_changes
+
+    def _take_checkpoint(self, conn: sqlite3.Connection, taken_at: str) -> int:
+        """Copy the current head into a new checkpoint (set-based, inside the caller's transaction)"""
+        with span('history_checkpoint'):
+            last_log_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM distributor_history_log").fetchone()[0]
+            cursor = conn.execute("""
+                INSERT INTO distributor_history_checkpoints (taken_at, last_log_id, row_count)
+                VALUES (?, ?, (SELECT COUNT(*) FROM distributor_history_head))
+            """, (taken_at, last_log_id))
+            checkpoint_id = cursor.lastrowid
+            conn.execute("""
+                INSERT INTO distributor_history_checkpoint_rows
+                (checkpoint_id, record_key, state, region, partner_type, is_active)
+                SELECT ?, record_key, state, region, partner_type, is_active FROM distributor_history_head
+            """, (checkpoint_id,))
+        self.logger.info(f"📌 History checkpoint {checkpoint_id} taken at {taken_at}")
+        return checkpoint_id
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    @timed('history_as_of')
+    def as_of(self, as_of: datetime, region: Optional[str] = None, partner_type: Optional[str] = None,
+              active_only: bool = True, offset: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict], int]:
+        """Distributor states as they were at as_of, ordered by record key
+
+        Returns (page of states, total matching). States are the captured
+        distributor fields plus 'record_key' and 'is_active'.
+        """
+        at = format_timestamp(as_of)
+        conn = self._connect()
+        try:
+            checkpoint = conn.execute("""
+                SELECT id, last_log_id FROM distributor_history_checkpoints
+                WHERE taken_at <= ? ORDER BY taken_at DESC, id DESC LIMIT 1
+            """, (at,)).fetchone()
+            checkpoint_id, last_log_id = checkpoint if checkpoint else (None, 0)
+
+            params = {'last_log_id': last_log_id, 'at': at, 'checkpoint_id': checkpoint_id,
+                      'region': region, 'partner_type': partner_type, 'limit': limit, 'offset': offset}
+            filters = []
+            if region:
+                filters.append("region = :region")
+            if partner_type:
+                filters.append("partner_type = :partner_type")
+            if active_only:
+                filters.append("is_active = 1")
+            where = f"WHERE {' AND '.join(filters)}" if filters else ""
+
+            # Latest log entry per key recorded after the checkpoint, overlaid on the checkpoint rows
+            state_at = """
+                WITH delta AS (
+                    SELECT record_key, state, region, partner_type, is_active
+                    FROM distributor_history_log
+                    WHERE id IN (
+                        SELECT MAX(id) FROM distributor_history_log
+                        WHERE id > :last_log_id AND changed_at <= :at
+                        GROUP BY record_key
+                    )
+                ),
+                state_at AS (
+                    SELECT * FROM delta
+                    UNION ALL
+                    SELECT record_key, state, region, partner_type, is_active
+                    FROM distributor_history_checkpoint_rows
+                    WHERE checkpoint_id = :checkpoint_id
+                      AND record_key NOT IN (SELECT record_key FROM delta)
+                )
+            """
+            total = conn.execute(f"{state_at} SELECT COUNT(*) FROM state_at {where}", params).fetchone()[0]
+            page_sql = f"{state_at} SELECT record_key, state FROM state_at {where} ORDER BY record_key"
+            if limit is not None:
+                page_sql += " LIMIT :limit OFFSET :offset"
+            rows = conn.execute(page_sql, params).fetchall()
+        finally:
+            conn.close()
+
+        return [{'record_key': key, **json.loads(state)} for key, state in rows], total
+
+    def list_checkpoints(self) -> List[Dict]:
+        conn = self._connect()
+        try:
+            return [
+                {'id': checkpoint_id, 'taken_at': taken_at, 'last_log_id': last_log_id, 'row_count': row_count}
+                for checkpoint_id, taken_at, last_log_id, row_count in conn.execute(
+                    "SELECT id, taken_at, last_log_id, row_count FROM distributor_history_checkpoints ORDER BY id"
+                )
+            ]
+        finally:
+            conn.close()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Channel Lifecycle Tracker
+Opens a channel_monitoring_sessions row per processing run, turns the processor's
+in-memory classifications into channel_lifecycle_events (discovered / updated /
+deactivated / reactivated) with a significance score, writes them in batches and
+closes the session with totals.
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, List, Optional
+from config.logging import LoggerMixin
+
+# Base significance per event type (same scale as migrations/001 log_lifecycle_event calls)
+EVENT_SIGNIFICANCE = {
+    'discovered': 0.80,
+    'reactivated': 0.70,
+    'deactivated': 0.75,
+    'updated': 0.50
+}
+
+# Significance of an update, by the most significant field it touched
+FIELD_SIGNIFICANCE = {
+    'partner_type': 0.65,
+    'region': 0.60,
+    'country_state': 0.60,
+    'sunmax_partner': 0.55,
+    'phone': 0.45,
+    'contact_email': 0.45,
+    'latitude': 0.40,
+    'longitude': 0.40,
+    'logo_url': 0.25,
+    'order_weight': 0.20,
+    'last_modified': 0.10
+}
+
+# Master distributors move the channel more than resellers
+MASTER_BONUS = 0.10
+
+
+def significance(event_type: str, state: Optional[Dict], changed_fields: Optional[List[str]] = None) -> float:
+    """Significance score (0-1) of a lifecycle event"""
+    if event_type == 'updated' and changed_fields:
+        score = max(FIELD_SIGNIFICANCE.get(field, EVENT_SIGNIFICANCE['updated']) for field in changed_fields)
+    else:
+        score = EVENT_SIGNIFICANCE[event_type]
+    if event_type != 'updated' and state and state.get('partner_type') == 'master':
+        score += MASTER_BONUS
+    return round(min(score, 1.0), 2)
+
+
+class LifecycleTracker(LoggerMixin):
+    """Session bookkeeping and batched lifecycle event writes on the processor's cursor (qmark parameters)"""
+
+    SESSION_TOTALS = {
+        'discovered': 'new_channels',
+        'updated': 'updated_channels',
+        'deactivated': 'deactivated_channels',
+        'reactivated': 'reactivated_channels'
+    }
+
+    def __init__(self, cursor, data_source: str = 'api_scraping', batch_size: int = 500):
+        self.cursor = cursor
+        self.data_source = data_source
+        self.batch_size = batch_size
+        self.session_id: Optional[int] = None
+        # Turned off when the session cannot be opened (e.g. tables missing), so event writes never fail a run
+        self.enabled = True
+        self.created_at = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+        self.totals = {event_type: 0 for event_type in EVENT_SIGNIFICANCE}
+        self.pending: List[tuple] = []
+
+    def open_session(self, total_found: int, metadata: Optional[Dict] = None) -> int:
+        self.cursor.execute("""
+            INSERT INTO channel_monitoring_sessions
+            (session_start, total_found, status, data_source, metadata, created_at, updated_at)
+            VALUES (?, ?, 'running', ?, ?, ?, ?)
+            RETURNING id
+        """, (self.created_at, total_found, self.data_source, json.dumps(metadata or {}),
+              self.created_at, self.created_at))
+        # RETURNING rather than lastrowid, which psycopg2 does not provide
+        self.session_id = self.cursor.fetchone()[0]
+        return self.session_id
+
+    def record(self, event_type: str, distributor_id: int, old_state: Optional[Dict], new_state: Optional[Dict],
+               changed_fields: Optional[List[str]] = None, reason: Optional[str] = None):
+        """Queue one event; old/new data hold only the changed fields for updates"""
+        if not self.enabled:
+            return
+        state = new_state or old_state or {}
+        event_data = {'changed_fields': changed_fields} if changed_fields else {}
+        if reason:
+            event_data['reason'] = reason
+
+        if event_type == 'updated':
+            old_data = {field: old_state.get(field) for field in changed_fields}
+            new_data = {field: new_state.get(field) for field in changed_fields}
+        else:
+            old_data, new_data = old_state, new_state
+
+        self.pending.append((
+            distributor_id, state.get('unifi_id'), event_type, json.dumps(event_data),
+            json.dumps(old_data) if old_data is not None else None,
+            json.dumps(new_data) if new_data is not None else None,
+            self.session_id, significance(event_type, state, changed_fields), state.get('region'),
+            self.created_at
+        ))
+        self.totals[event_type] += 1
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write queued events with a single executemany"""
+        if not self.enabled or not self.pending:
+            return
+        self.cursor.executemany("""
+            INSERT INTO channel_lifecycle_events
+            (distributor_id, unifi_id, event_type, event_data, old_data, new_data,
+             session_id, significance_score, region, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, self.pending)
+        self.pending = []
+
+    def close_session(self, status: str = 'completed', error_message: Optional[str] = None):
+        if self.session_id is None:
+            return
+        now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+        assignments = ', '.join(f"{column} = ?" for column in self.SESSION_TOTALS.values())
+        self.cursor.execute(f"""
+            UPDATE channel_monitoring_sessions
+            SET {assignments}, status = ?, error_message = ?, session_end = ?, updated_at = ?
+            WHERE id = ?
+        """, (*(self.totals[event_type] for event_type in self.SESSION_TOTALS),
+              status, error_message, now, now, self.session_id))
+        self.logger.info(f"🧭 Session {self.session_id} {status}: {self.totals['discovered']} discovered, "
+                         f"{self.totals['updated']} updated, {self.totals['deactivated']} deactivated, "
+                         f"{self.totals['reactivated']} reactivated")
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Region Mapping Extractor
+Pulls the region -> country/state mapping out of the distributors page in one
+pass. A precompiled pattern finds the mainRegionsData assignment, and a small
+tokenizer parses the JavaScript literal that follows it (unquoted keys,
+single-quoted strings, trailing commas and comments), reading at most
+MAX_LITERAL_CHARS. Pages without the literal fall back to the region /
+country_state <select> options, read with lxml.
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+from config.logging import get_logger
+
+logger = get_logger('mappingextractor')
+
+# Upper bound on the characters read for one literal (the real one is a few tens of KB)
+MAX_LITERAL_CHARS = 1_000_000
+# Deepest array/object nesting accepted (mainRegionsData is three levels deep)
+MAX_DEPTH = 32
+
+_MAIN_REGIONS_DATA = re.compile(r'mainRegionsData\s*[:=]\s*(?=\[)')
+
+_WHITESPACE = re.compile(r'(?:\s+|//[^\n]*|/\*.*?\*/)*', re.DOTALL)
+_STRING = re.compile(r'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'', re.DOTALL)
+_NUMBER = re.compile(r'-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+_IDENTIFIER = re.compile(r'[A-Za-z_$][\w$]*')
+_ESCAPE = re.compile(r'\\(u\{[0-9a-fA-F]+\}|u[0-9a-fA-F]{4}|x[0-9a-fA-F]{2}|\r\n|.)', re.DOTALL)
+
+_SIMPLE_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0',
+                   '\n': '', '\r\n': ''}
+_KEYWORDS = {'true': True, 'false': False, 'null': None, 'undefined': None}
+
+
+def _unescape(match) -> str:
+    escape = match.group(1)
+    if escape.startswith('u{'):
+        return chr(int(escape[2:-1], 16))
+    if escape[0] in 'ux' and len(escape) > 1:
+        return chr(int(escape[1:], 16))
+    return _SIMPLE_ESCAPES.get(escape, escape)
+
+
+class _JsLiteralParser:
+    """Recursive-descent parser for JSON-like JavaScript literals"""
+
+    def __init__(self, text: str, start: int, limit: int):
+        self.text = text
+        self.pos = start
+        self.end = min(len(text), start + limit)
+
+    def error(self, message: str):
+        raise ValueError(f"{message} at offset {self.pos}")
+
+    def skip(self):
+        self.pos = _WHITESPACE.match(self.text, self.pos, self.end).end()
+
+    def peek(self) -> str:
+        self.skip()
+        if self.pos >= self.end:
+            self.error("Literal truncated")
+        return self.text[self.pos]
+
+    def value(self, depth: int = 0):
+        if depth > MAX_DEPTH:
+            self.error("Literal nested too deeply")
+        char = self.peek()
+        if char == '[':
+            return self.array(depth)
+        if char == '{':
+            return self.object(depth)
+        if char in '"\'':
+            return self.string()
+        match = _NUMBER.match(self.text, self.pos, self.end)
+        if match:
+            self.pos = match.end()
+            number = match.group()
+            return float(number) if any(c in number for c in '.eE') else int(number)
+        match = _IDENTIFIER.match(self.text, self.pos, self.end)
+        if match and match.group() in _KEYWORDS:
+            self.pos = match.end()
+            return _KEYWORDS[match.group()]
+        self.error(f"Unexpected {char!r}")
+
+    def string(self) -> str:
+        match = _STRING.match(self.text, self.pos, self.end)
+        if not match:
+            self.error("Unterminated string")
+        self.pos = match.end()
+        body = match.group()[1:-1]
+        return _ESCAPE.sub(_unescape, body) if '\\' in body else body
+
+    def key(self) -> str:
+        if self.peek() in '"\'':
+            return self.string()
+        match = _IDENTIFIER.match(self.text, self.pos, self.end) or _NUMBER.match(self.text, self.pos, self.end)
+        if not match:
+            self.error("Expected an object key")
+        self.pos = match.end()
+        return match.group()
+
+    def array(self, depth: int) -> list:
+        self.pos += 1
+        items = []
+        while self.peek() != ']':
+            items.append(self.value(depth + 1))
+            if self.peek() == ',':
+                self.pos += 1
+            elif self.peek() != ']':
+                self.error("Expected ',' or ']'")
+        self.pos += 1
+        return items
+
+    def object(self, depth: int) -> dict:
+        self.pos += 1
+        items = {}
+        while self.peek() != '}':
+            key = self.key()
+            if self.peek() != ':':
+                self.error("Expected ':'")
+            self.pos += 1
+            items[key] = self.value(depth + 1)
+            if self.peek() == ',':
+                self.pos += 1
+            elif self.peek() != '}':
+                self.error("Expected ',' or '}'")
+        self.pos += 1
+        return items
+
+
+def parse_js_literal(text: str, start: int = 0, limit: int = MAX_LITERAL_CHARS) -> Tuple[object, int]:
+    """Parse the literal at text[start:]; returns (value, end offset)
+
+    Raises ValueError on anything that is not a plain literal, or when the
+    literal does not end within limit characters.
+    """
+    parser = _JsLiteralParser(text, start, limit)
+    value = parser.value()
+    return value, parser.pos
+
+
+def mappings_from_regions_data(regions_data) -> Dict[str, List[str]]:
+    """{region code: [country/state codes]} from a mainRegionsData list ({s: code, i: [{s: code}, ...]})"""
+    mappings = {}
+    if not isinstance(regions_data, list):
+        return mappings
+    for region in regions_data:
+        if not isinstance(region, dict) or not region.get('s'):
+            continue
+        countries = [item['s'] for item in region.get('i') or []
+                     if isinstance(item, dict) and isinstance(item.get('s'), str) and item['s']]
+        if countries:
+            mappings[region['s']] = countries
+    return mappings
+
+
+def extract_main_regions_data(html_content: str) -> Optional[Dict[str, List[str]]]:
+    """Mappings from the first mainRegionsData assignment that parses, or None"""
+    for match in _MAIN_REGIONS_DATA.finditer(html_content):
+        try:
+            regions_data, _ = parse_js_literal(html_content, match.end())
+        except ValueError as e:
+            logger.debug(f"Skipping unparsable mainRegionsData literal: {e}")
+            continue
+        mappings = mappings_from_regions_data(regions_data)
+        if mappings:
+            return mappings
+    return None
+
+
+def extract_select_options(html_content: str) -> Optional[Tuple[List[str], List[str]]]:
+    """(region values, country_state values) from the page's <select> boxes, or None"""
+    try:
+        import lxml.html
+    except ImportError:
+        logger.debug("lxml is not installed; select option extraction skipped")
+        return None
+    try:
+        document = lxml.html.fromstring(html_content)
+    except Exception as e:
+        logger.debug(f"Failed to parse page for select options: {e}")
+        return None
+
+    def option_values(name: str) -> List[str]:
+        values = document.xpath(f'(//select[@name="{name}"] | //select[@id="{name}"])[1]//option/@value')
+        return list(dict.fromkeys(value.strip() for value in values if value.strip()))
+
+    regions, countries = option_values('region'), option_values('country_state')
+    if regions and countries:
+        return regions, countries
+    return None
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+In-process Metrics Registry
+Prometheus-compatible counters, gauges and histograms rendered by the /metrics endpoint
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Latency buckets in seconds, from a fast cache lookup up to a slow ui.com request
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    """Base class: a named metric family with a fixed set of label names"""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    type_name = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observations (e.g. latencies)"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def get_count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return int(state[-1]) if state else 0
+
+    def _render_samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+
+        lines = []
+        inf_label = 'le="+Inf"'
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, inf_label)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(state[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them in Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry
+registry = MetricsRegistry()
+
+# Scraper
+SCRAPE_REQUEST_SECONDS = registry.histogram(
+    'unifi_scrape_request_seconds', 'Latency of JSON API requests to ui.com by region', ['region'])
+SCRAPE_REQUESTS = registry.counter(
+    'unifi_scrape_requests_total', 'JSON API requests by region and outcome', ['region', 'outcome'])
+SCRAPE_BYTES = registry.counter(
+    'unifi_scrape_bytes_total', 'Response bytes fetched from the JSON API by region', ['region'])
+SCRAPE_LAST_RUN = registry.gauge(
+    'unifi_scrape_last_run', 'Performance metrics of the last completed scrape run', ['metric'])
+
+# Processor
+PROCESSOR_ROWS = registry.counter(
+    'unifi_processor_rows_total', 'Distributor rows processed by outcome', ['outcome'])
+PROCESSOR_ROWS_PER_SECOND = registry.gauge(
+    'unifi_processor_rows_per_second', 'Rows per second of the last processing run by outcome', ['outcome'])
+PROCESSOR_SQL_STATEMENTS = registry.counter(
+    'unifi_processor_sql_statements_total', 'SQL statements issued by the data processor')
+PROCESSOR_SQL_STATEMENTS_LAST_RUN = registry.gauge(
+    'unifi_processor_sql_statements_last_run', 'SQL statements issued by the last processing run')
+
+# Notion
+NOTION_CALLS = registry.counter(
+    'unifi_notion_api_calls_total', 'Notion API calls by operation', ['operation'])
+NOTION_RATE_LIMITED = registry.counter(
+    'unifi_notion_rate_limited_total', 'Notion API calls rejected with HTTP 429 by operation', ['operation'])
+NOTION_SYNC_SECONDS = registry.gauge(
+    'unifi_notion_sync_seconds', 'Duration of the last Notion sync run')
+
+# API
+API_REQUEST_SECONDS = registry.histogram(
+    'unifi_api_request_seconds', 'API request latency by route', ['method', 'route', 'status'])
+
+# Health probes
+HEALTH_PROBE_LAST_CHECK = registry.gauge(
+    'unifi_health_probe_last_check_timestamp_seconds', 'Unix time each health probe last ran', ['probe'])
+
+# Caches
+CACHE_REQUESTS = registry.counter(
+    'unifi_cache_requests_total', 'Cache lookups by cache and result', ['cache', 'result'])
+CACHE_HIT_RATIO = registry.gauge(
+    'unifi_cache_hit_ratio', 'Hit ratio of each cache since process start', ['cache'])
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a cache lookup and refresh that cache's hit ratio"""
+    CACHE_REQUESTS.inc(cache=cache, result='hit' if hit else 'miss')
+    hits = CACHE_REQUESTS.get(cache=cache, result='hit')
+    misses = CACHE_REQUESTS.get(cache=cache, result='miss')
+    CACHE_HIT_RATIO.set(hits / (hits + misses), cache=cache)
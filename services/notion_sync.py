@@ -4,13 +4,15 @@ Notion Sync for Unifi Distributor Tracking System
 Comprehensive synchronization with all JSON API fields
 """
 
-import sqlite3
 from datetime import datetime
 from typing import List, Dict, Optional, Tuple
 from notion_client import Client
 from notion_client.errors import APIResponseError
 from config.settings import settings
 from config.logging import LoggerMixin
+from services.repository import get_repository
+from services.metrics import NOTION_CALLS, NOTION_RATE_LIMITED, NOTION_SYNC_SECONDS
+from services.profiling import span, timed
 import time
 
 
@@ -24,9 +26,29 @@ class NotionSync(LoggerMixin):
         self.client = Client(auth=settings.notion_token)
         self.database_id = settings.notion_database_id
         self.batch_size = settings.notion_batch_size
-        self.db_path = "unifi_distributors.db"
+        self.repository = get_repository()
         self.logger.info("Notion sync initialized")
     
+    def _call(self, operation: str, method, *args, **kwargs):
+        """Invoke a Notion client method, counting calls and 429 rate-limit rejections"""
+        NOTION_CALLS.inc(operation=operation)
+        try:
+            return method(*args, **kwargs)
+        except APIResponseError as e:
+            if e.status == 429:
+                NOTION_RATE_LIMITED.inc(operation=operation)
+            raise
+    
+    def test_connection(self) -> bool:
+        """Check that the configured Notion database is reachable"""
+        try:
+            self._call('databases.retrieve', self.client.databases.retrieve, database_id=self.database_id)
+            return True
+        except Exception as e:
+            self.logger.warning(f"Notion connection test failed: {str(e)}")
+            return False
+    
+    @timed('notion_sync')
     def sync_all_distributors(self) -> Dict:
         """Complete sync with all JSON API fields"""
         self.logger.info("🚀 Starting Notion sync...")
@@ -76,13 +98,15 @@ class NotionSync(LoggerMixin):
                 
                 # Rate limiting
                 if i + self.batch_size < len(distributors):
-                    time.sleep(0.5)
+                    with span('rate_limit'):
+                        time.sleep(0.5)
                 
                 # Progress update
                 progress = ((i + len(batch)) / len(distributors)) * 100
                 self.logger.info(f"📈 Progress: {progress:.1f}% ({i + len(batch)}/{len(distributors)})")
             
             results['sync_time'] = time.time() - start_time
+            NOTION_SYNC_SECONDS.set(results['sync_time'])
             
             self.logger.info(f"✅ Sync completed: {results}")
             return results
@@ -94,32 +118,21 @@ class NotionSync(LoggerMixin):
             results['sync_time'] = time.time() - start_time
             return results
     
+    @timed('notion_load')
     def _get_enhanced_distributors(self) -> List[Dict]:
-        """Get distributors with complete JSON API fields"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Get distributors with complete JSON API fields
         
-        try:
-            cursor.execute("""
-                SELECT 
-                    d.id, c.name as company_name, d.partner_type, d.address, 
-                    d.phone, d.contact_email, d.region, d.country_state,
-                    d.latitude, d.longitude, d.is_active, d.created_at, d.updated_at,
-                    c.website_url, d.notion_page_id, d.notion_last_sync, d.notion_sync_status,
-                    d.unifi_id, d.last_modified_at, d.order_weight, d.logo_url,
-                    d.sunmax_partner, d.data_source, d.scraped_at, d.full_country_name, d.city,
-                    d.last_verified_at
-                FROM distributors d
-                JOIN companies c ON d.company_id = c.id
-                ORDER BY d.is_active DESC, d.data_source DESC, d.order_weight DESC NULLS LAST, d.created_at DESC
-            """)
-            
-            columns = [desc[0] for desc in cursor.description]
-            return [dict(zip(columns, row)) for row in cursor.fetchall()]
-            
-        finally:
-            conn.close()
+        Ordered active first, then by data source, order weight (missing last) and
+        newest first.
+        """
+        distributors = list(self.repository.iter_distributors())
+        # Stable sorts: the tie-breaker first, then the primary key
+        distributors.sort(key=lambda d: str(d['created_at'] or ''), reverse=True)
+        distributors.sort(key=lambda d: (bool(d['is_active']), d['data_source'] or '',
+                                         d['order_weight'] is not None, d['order_weight'] or 0), reverse=True)
+        return distributors
     
+    @timed('notion_batch')
     def _sync_enhanced_batch(self, distributors: List[Dict]) -> Dict:
         """Sync batch with enhanced field support"""
         results = {'created': 0, 'updated': 0, 'skipped': 0, 'errors': []}
@@ -158,7 +171,7 @@ class NotionSync(LoggerMixin):
             # First try by stored notion_page_id
             if dist.get('notion_page_id'):
                 try:
-                    page = self.client.pages.retrieve(dist['notion_page_id'])
+                    page = self._call('pages.retrieve', self.client.pages.retrieve, dist['notion_page_id'])
                     return page
                 except:
                     # Page ID invalid, clear it and search by other criteria
@@ -166,7 +179,8 @@ class NotionSync(LoggerMixin):
             
             # Search by Unifi ID (most reliable)
             if dist.get('unifi_id'):
-                response = self.client.databases.query(
+                response = self._call(
+                    'databases.query', self.client.databases.query,
                     database_id=self.database_id,
                     filter={
                         "property": "unifi_id",
@@ -179,7 +193,8 @@ class NotionSync(LoggerMixin):
                     return response['results'][0]
             
             # Fallback to company name + address
-            response = self.client.databases.query(
+            response = self._call(
+                'databases.query', self.client.databases.query,
                 database_id=self.database_id,
                 filter={
                     "and": [
@@ -210,7 +225,8 @@ class NotionSync(LoggerMixin):
         try:
             properties = self._build_enhanced_properties(dist)
             
-            response = self.client.pages.create(
+            response = self._call(
+                'pages.create', self.client.pages.create,
                 parent={"database_id": self.database_id},
                 properties=properties
             )
@@ -229,7 +245,8 @@ class NotionSync(LoggerMixin):
         try:
             properties = self._build_enhanced_properties(dist)
             
-            response = self.client.pages.update(
+            response = self._call(
+                'pages.update', self.client.pages.update,
                 page_id=page_id,
                 properties=properties
             )
@@ -356,71 +373,17 @@ class NotionSync(LoggerMixin):
     
     def _update_notion_page_id(self, distributor_id: int, page_id: Optional[str]):
         """Update notion_page_id and sync status in local database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute("""
-                UPDATE distributors 
-                SET notion_page_id = ?, 
-                    notion_last_sync = datetime('now'),
-                    notion_sync_status = ?
-                WHERE id = ?
-            """, (page_id, 'synced' if page_id else 'pending', distributor_id))
-            conn.commit()
-            
-        finally:
-            conn.close()
+        self.repository.set_notion_sync(distributor_id, page_id)
     
     def get_enhanced_sync_statistics(self) -> Dict:
         """Get enhanced sync statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            # Basic stats
-            cursor.execute("SELECT COUNT(*) FROM distributors WHERE is_active = 1")
-            total_active = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM distributors WHERE notion_page_id IS NOT NULL")
-            synced_count = cursor.fetchone()[0]
-            
-            # Enhanced stats by data source
-            cursor.execute("""
-                SELECT data_source, COUNT(*), 
-                       SUM(CASE WHEN notion_page_id IS NOT NULL THEN 1 ELSE 0 END) as synced
-                FROM distributors 
-                WHERE is_active = 1
-                GROUP BY data_source
-            """)
-            source_stats = cursor.fetchall()
-            
-            # JSON API specific stats
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total,
-                    SUM(CASE WHEN unifi_id IS NOT NULL THEN 1 ELSE 0 END) as with_unifi_id,
-                    SUM(CASE WHEN last_modified_at IS NOT NULL THEN 1 ELSE 0 END) as with_last_modified,
-                    SUM(CASE WHEN order_weight IS NOT NULL THEN 1 ELSE 0 END) as with_order_weight,
-                    SUM(CASE WHEN sunmax_partner = 1 THEN 1 ELSE 0 END) as sunmax_partners
-                FROM distributors 
-                WHERE is_active = 1 AND data_source = 'json_api'
-            """)
-            json_api_stats = cursor.fetchone()
-            
-            return {
-                'total_active_distributors': total_active,
-                'synced_to_notion': synced_count,
-                'sync_rate': round(synced_count / total_active * 100, 1) if total_active > 0 else 0,
-                'source_distribution': {row[0]: {'total': row[1], 'synced': row[2]} for row in source_stats},
-                'json_api_enhancement': {
-                    'total': json_api_stats[0] if json_api_stats else 0,
-                    'with_unifi_id': json_api_stats[1] if json_api_stats else 0,
-                    'with_last_modified': json_api_stats[2] if json_api_stats else 0,
-                    'with_order_weight': json_api_stats[3] if json_api_stats else 0,
-                    'sunmax_partners': json_api_stats[4] if json_api_stats else 0
-                }
-            }
-            
-        finally:
-            conn.close()
\ No newline at end of file
+        stats = self.repository.statistics()
+        total_active = stats['total_active']
+        json_api = {field: value for field, value in stats['json_api'].items() if field != 'last_scrape'}
+        return {
+            'total_active_distributors': total_active,
+            'synced_to_notion': stats['synced_to_notion'],
+            'sync_rate': round(stats['synced_to_notion'] / total_active * 100, 1) if total_active > 0 else 0,
+            'source_distribution': stats['source_distribution'],
+            'json_api_enhancement': json_api
+        }
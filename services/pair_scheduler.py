@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Churn-Aware Pair Scheduler
+Decides which region/country pairs an incremental scrape fetches. Each pair
+keeps an exponentially weighted change rate (changes per day, from its
+watermark moving between checks - seeded from change_history the first time).
+A daily request budget is split across pairs in proportion to that rate, between
+a minimum and maximum revisit interval, so hot pairs are revisited often and
+cold ones rarely. Each run fetches the pairs that are due, most overdue churn
+first, up to what is left of the last 24 hours' budget.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from config.settings import settings
+from config.logging import LoggerMixin
+from config.sqlite import database_path, get_connection_manager
+
+
+SCHEDULE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS scrape_pair_schedule (
+        region TEXT NOT NULL,
+        country_state TEXT NOT NULL,
+        changes_ewma REAL NOT NULL,
+        days_ewma REAL NOT NULL,
+        checks INTEGER NOT NULL DEFAULT 0,
+        changes INTEGER NOT NULL DEFAULT 0,
+        last_checked_at TEXT,
+        next_due_at TEXT,
+        PRIMARY KEY (region, country_state)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS scrape_schedule_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        run_at TEXT NOT NULL,
+        requests INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_scrape_schedule_runs_run_at ON scrape_schedule_runs(run_at)",
+]
+
+# Database files whose schedule tables were created by this process
+_schema_ready = set()
+
+# Changes per day, per pair, from change_history over the last SEED_DAYS (distinct change days)
+SEED_QUERY = """
+    SELECT d.region, d.country_state, COUNT(DISTINCT substr(c.detected_at, 1, 10))
+    FROM change_history c
+    JOIN distributors d ON d.id = c.distributor_id
+    WHERE c.detected_at >= ? AND d.region IS NOT NULL AND d.country_state IS NOT NULL
+    GROUP BY d.region, d.country_state
+"""
+
+
+class PairScheduler(LoggerMixin):
+    """Per-pair churn estimates, revisit intervals and the daily request budget"""
+
+    # Weight of past observations in the change rate (per check)
+    DECAY = 0.8
+    # Rate assumed for pairs without history: one change a month
+    PRIOR_RATE = 1 / 30
+    SEED_DAYS = 90
+
+    def __init__(self, db_path: Optional[str] = None, daily_budget: Optional[int] = None,
+                 min_revisit_hours: Optional[float] = None, max_revisit_days: Optional[float] = None):
+        self.db_path = db_path or database_path()
+        self.daily_budget = settings.scrape_daily_request_budget if daily_budget is None else daily_budget
+        self.min_revisit = timedelta(hours=(
+            settings.scrape_min_revisit_hours if min_revisit_hours is None else min_revisit_hours
+        ))
+        self.max_revisit = timedelta(days=(
+            settings.scrape_max_revisit_days if max_revisit_days is None else max_revisit_days
+        ))
+
+    def _connect(self, write: bool = False):
+        """The shared writer or this thread's reader; the tables are created once per process"""
+        manager = get_connection_manager(self.db_path)
+        if self.db_path not in _schema_ready:
+            with manager.writer() as conn:
+                for statement in SCHEDULE_SCHEMA:
+                    conn.execute(statement)
+            _schema_ready.add(self.db_path)
+        return manager.writer() if write else manager.reader()
+
+    # ------------------------------------------------------------------
+    # Rates and intervals
+    # ------------------------------------------------------------------
+
+    def _load(self, pairs: Sequence[Tuple[str, str]]) -> Dict[Tuple[str, str], Dict]:
+        """Schedule rows for the pairs; pairs never scheduled get rates seeded from change_history"""
+        conn = self._connect()
+        try:
+            rows = {
+                (row[0], row[1]): {
+                    'changes_ewma': row[2], 'days_ewma': row[3], 'last_checked_at': row[4]
+                }
+                for row in conn.execute(
+                    "SELECT region, country_state, changes_ewma, days_ewma, last_checked_at FROM scrape_pair_schedule")
+            }
+            unseen = [pair for pair in pairs if pair not in rows]
+            seeded = {}
+            if unseen:
+                since = (datetime.utcnow() - timedelta(days=self.SEED_DAYS)).strftime('%Y-%m-%d %H:%M:%S.%f')
+                try:
+                    seeded = {(region, country): days for region, country, days in conn.execute(SEED_QUERY, (since,))}
+                except Exception as e:
+                    self.logger.warning(f"Churn seeding from change_history skipped: {str(e)}")
+        finally:
+            conn.close()
+
+        for pair in unseen:
+            if pair in seeded:
+                rows[pair] = {'changes_ewma': float(seeded[pair]), 'days_ewma': float(self.SEED_DAYS),
+                              'last_checked_at': None}
+            else:
+                rows[pair] = {'changes_ewma': self.PRIOR_RATE, 'days_ewma': 1.0, 'last_checked_at': None}
+        return rows
+
+    @staticmethod
+    def change_rate(row: Dict) -> float:
+        """Estimated changes per day"""
+        return row['changes_ewma'] / row['days_ewma'] if row['days_ewma'] > 0 else 0.0
+
+    def revisit_intervals(self, rows: Dict[Tuple[str, str], Dict]) -> Dict[Tuple[str, str], timedelta]:
+        """Split the daily budget: every pair gets the minimum visit rate, the rest goes by change rate
+
+        The budget is a ceiling: visits above the maximum rate (min_revisit) are not
+        handed to colder pairs.
+        """
+        if not rows:
+            return {}
+        day = timedelta(days=1)
+        min_visits, max_visits = day / self.max_revisit, day / self.min_revisit
+        spare = self.daily_budget - min_visits * len(rows)
+        if spare < 0:
+            self.logger.warning(f"Daily budget {self.daily_budget} cannot visit {len(rows)} pairs every "
+                                f"{self.max_revisit.days} days; runs will be capped by the budget")
+            spare = 0
+        rates = {pair: max(self.change_rate(row), 0.0) for pair, row in rows.items()}
+        total_rate = sum(rates.values()) or 1.0
+        return {
+            pair: day / min(max_visits, min_visits + spare * rate / total_rate)
+            for pair, rate in rates.items()
+        }
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def requests_last_day(self, now: Optional[datetime] = None) -> int:
+        since = ((now or datetime.utcnow()) - timedelta(days=1)).isoformat()
+        conn = self._connect()
+        try:
+            return conn.execute(
+                "SELECT COALESCE(SUM(requests), 0) FROM scrape_schedule_runs WHERE run_at > ?", (since,)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def due_pairs(self, pairs: Sequence[Tuple[str, str]], now: Optional[datetime] = None) -> List[Tuple[str, str]]:
+        """Pairs to fetch now: due ones, most overdue churn first, within the remaining daily budget"""
+        now = now or datetime.utcnow()
+        rows = self._load(pairs)
+        intervals = self.revisit_intervals({pair: rows[pair] for pair in pairs})
+        remaining = max(self.daily_budget - self.requests_last_day(now), 0)
+
+        due = []
+        for pair in pairs:
+            row = rows[pair]
+            if row['last_checked_at'] is None:
+                # Never checked: due, ahead of everything else
+                due.append((float('inf'), pair))
+                continue
+            overdue = now - (datetime.fromisoformat(row['last_checked_at']) + intervals[pair])
+            if overdue >= timedelta(0):
+                due.append(((overdue / intervals[pair] + 1) * self.change_rate(row), pair))
+        due.sort(key=lambda item: item[0], reverse=True)
+
+        selected = [pair for _, pair in due[:remaining]]
+        self.logger.info(f"🗓️ {len(due)} of {len(pairs)} pairs due, fetching {len(selected)} "
+                         f"({remaining} requests left in the daily budget of {self.daily_budget})")
+        return selected
+
+    def record_requests(self, requests: int, now: Optional[datetime] = None):
+        """Charge a run's requests to the daily budget
+
+        Call as soon as the pairs are fetched: the requests were made whether or not
+        the run is processed, so a failing run cannot retry past the budget.
+        """
+        now = now or datetime.utcnow()
+        conn = self._connect(write=True)
+        try:
+            conn.execute("INSERT INTO scrape_schedule_runs (run_at, requests) VALUES (?, ?)", (now.isoformat(), requests))
+            conn.execute("DELETE FROM scrape_schedule_runs WHERE run_at < ?", ((now - timedelta(days=7)).isoformat(),))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record_run(self, run: Dict, now: Optional[datetime] = None) -> int:
+        """Fold an incremental run's changed / unchanged pairs into the churn estimates
+
+        Call together with WatermarkStore.save(), once the run's records are stored
+        (its requests were already charged by record_requests()).
+        Returns the number of pairs updated.
+        """
+        now = now or datetime.utcnow()
+        checked = [(pair, True) for pair in run['changed_pairs']] + [(pair, False) for pair in run['unchanged_pairs']]
+        if run['full_pass']:
+            # A full pass converts every pair; only pairs whose watermark moved count as changes
+            moved = {(w['region'], w['country_state']) for w in run['watermarks'] if w['changed_at'] == w['checked_at']}
+            checked = [(pair, pair in moved) for pair, _ in checked]
+        rows = self._load([pair for pair, _ in checked])
+
+        updates = []
+        for pair, changed in checked:
+            row = rows[pair]
+            if row['last_checked_at'] is None:
+                # First check only sets the baseline; the seeded rate stands until the next one
+                updates.append((pair[0], pair[1], row['changes_ewma'], row['days_ewma'], 0, now.isoformat()))
+                continue
+            elapsed = (now - datetime.fromisoformat(row['last_checked_at'])) / timedelta(days=1)
+            updates.append((
+                pair[0], pair[1],
+                self.DECAY * row['changes_ewma'] + (1 if changed else 0),
+                self.DECAY * row['days_ewma'] + elapsed,
+                1 if changed else 0, now.isoformat()
+            ))
+        # The budget is split across every known pair, with this run's estimates folded in
+        rows.update({
+            (region, country): {'changes_ewma': changes, 'days_ewma': days}
+            for region, country, changes, days, _, _ in updates
+        })
+        intervals = self.revisit_intervals(rows)
+
+        conn = self._connect(write=True)
+        try:
+            conn.executemany("""
+                INSERT INTO scrape_pair_schedule
+                (region, country_state, changes_ewma, days_ewma, checks, changes, last_checked_at, next_due_at)
+                VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+                ON CONFLICT(region, country_state) DO UPDATE SET
+                    changes_ewma = excluded.changes_ewma,
+                    days_ewma = excluded.days_ewma,
+                    checks = checks + 1,
+                    changes = changes + excluded.changes,
+                    last_checked_at = excluded.last_checked_at,
+                    next_due_at = excluded.next_due_at
+            """, [(*update, (now + intervals[(update[0], update[1])]).isoformat()) for update in updates])
+            conn.commit()
+        finally:
+            conn.close()
+        return len(updates)
+
+    def get_schedule(self) -> List[Dict]:
+        """Every scheduled pair with its change rate and next due time, hottest first"""
+        conn = self._connect()
+        try:
+            rows = conn.execute("""
+                SELECT region, country_state, changes_ewma, days_ewma, checks, changes, last_checked_at, next_due_at
+                FROM scrape_pair_schedule
+            """).fetchall()
+        finally:
+            conn.close()
+        schedule = [
+            {
+                'region': region, 'country_state': country, 'changes_per_day': round(changes_ewma / days_ewma, 4) if days_ewma else 0.0,
+                'checks': checks, 'changes': changes, 'last_checked_at': last_checked_at, 'next_due_at': next_due_at
+            }
+            for region, country, changes_ewma, days_ewma, checks, changes, last_checked_at, next_due_at in rows
+        ]
+        schedule.sort(key=lambda item: item['changes_per_day'], reverse=True)
+        return schedule
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL Bulk Loader
+Ingests a full scrape in a handful of statements instead of a round trip per row:
+
+1. COPY FROM STDIN streams every record into the UNLOGGED distributor_staging table
+   (no WAL for throwaway rows), tagged with a load id so concurrent loads never mix
+2. duplicates inside the load are dropped (the last occurrence wins)
+3. one INSERT ... ON CONFLICT merges the load's companies
+4. one INSERT ... ON CONFLICT merges its distributors, classifying each row as
+   created / updated / unchanged / reactivated against the pre-merge state
+5. optionally, one UPDATE deactivates distributors missing from the load
+
+The COPY and the merge run in one transaction, so a failed load leaves nothing behind.
+The loader is only reached through `cli.py load-postgres`: it skips change capture,
+lifecycle tracking and per-pair missing detection, so regular ingest goes through
+EnhancedDataProcessor and the repository's bulk_upsert instead.
+Try it against the docker-compose Postgres with:  python cli.py load-postgres --synthetic 5000
+"""
+
+import uuid
+from typing import Dict, Sequence
+from config.logging import LoggerMixin
+from services.distributor_scraper import JSON_RECORD_TYPES
+from services.profiling import span, timed
+from services.repository import PG_COLUMN_TYPES, UPDATE_COLUMNS, UPSERT_COLUMNS, PostgresDistributorRepository
+
+# Distributor columns staged from each record (company_id is resolved during the merge)
+STAGED_COLUMNS = tuple(column for column in UPSERT_COLUMNS if column != 'company_id')
+
+# Columns whose change makes a merged row count as 'updated' rather than 'unchanged'
+# (scraped_at differs on every run)
+COMPARED_COLUMNS = tuple(column for column in UPDATE_COLUMNS if column != 'scraped_at')
+
+STAGING_DDL = (
+    "CREATE UNLOGGED TABLE IF NOT EXISTS distributor_staging ("
+    "load_id VARCHAR(36) NOT NULL, seq INTEGER NOT NULL, company_name VARCHAR(255) NOT NULL, website_url TEXT, " +
+    ", ".join(f"{column} {PG_COLUMN_TYPES[column]}" for column in STAGED_COLUMNS) +
+    ")",
+    "CREATE INDEX IF NOT EXISTS idx_distributor_staging_load ON distributor_staging(load_id, unifi_id)"
+)
+
+
+def _staged_row(load_id: str, seq: int, distributor) -> tuple:
+    values = {
+        'unifi_id': distributor.unifi_id, 'partner_type': distributor.partner_type, 'address': distributor.address,
+        'latitude': distributor.latitude, 'longitude': distributor.longitude, 'phone': distributor.phone,
+        'contact_email': distributor.contact_email, 'region': distributor.region,
+        'country_state': distributor.country_state, 'last_modified_at': distributor.last_modified_iso,
+        'order_weight': distributor.order_weight, 'logo_url': distributor.logo_url,
+        'sunmax_partner': bool(distributor.sunmax_partner), 'data_source': distributor.data_source,
+        'scraped_at': distributor.scraped_at_iso
+    }
+    return (load_id, seq, distributor.company_name, distributor.website_url,
+            *(values[column] for column in STAGED_COLUMNS))
+
+
+class PostgresBulkLoader(LoggerMixin):
+    """COPY + staging-table merge of scraped JSON API records into companies and distributors"""
+
+    def __init__(self, engine=None):
+        self.repository = PostgresDistributorRepository(engine)
+        self._staging_ready = False
+
+    def ensure_staging(self, cursor):
+        if not self._staging_ready:
+            for statement in STAGING_DDL:
+                cursor.execute(statement)
+            self._staging_ready = True
+
+    @timed('pg_load')
+    def load(self, distributors: Sequence, deactivate_missing: bool = False) -> Dict[str, int]:
+        """Merge a scrape; returns per-outcome counts
+
+        Keys: staged, duplicates, skipped (no unifi_id), companies_created,
+        companies_updated, created, updated, unchanged, reactivated, deactivated.
+        """
+        results = {
+            'staged': 0, 'duplicates': 0, 'skipped': 0, 'companies_created': 0, 'companies_updated': 0,
+            'created': 0, 'updated': 0, 'unchanged': 0, 'reactivated': 0, 'deactivated': 0
+        }
+        load_id = str(uuid.uuid4())
+        keyed = [d for d in distributors if isinstance(d, JSON_RECORD_TYPES) and d.unifi_id]
+        results['skipped'] = len(distributors) - len(keyed)
+
+        conn = self.repository.connection()
+        try:
+            cursor = conn.cursor()
+            self.ensure_staging(cursor)
+            conn.commit()
+
+            with span('pg_copy'):
+                self.repository.copy_rows(
+                    cursor, 'distributor_staging', ('load_id', 'seq', 'company_name', 'website_url') + STAGED_COLUMNS,
+                    (_staged_row(load_id, seq, d) for seq, d in enumerate(keyed))
+                )
+            results['staged'] = len(keyed)
+
+            with span('pg_merge'):
+                results['duplicates'] = self._drop_duplicates(cursor, load_id)
+                results['companies_created'], results['companies_updated'] = self._merge_companies(cursor, load_id)
+                results.update(self._merge_distributors(cursor, load_id))
+                if deactivate_missing and keyed:
+                    results['deactivated'] = self._deactivate_missing(cursor, load_id)
+                cursor.execute("DELETE FROM distributor_staging WHERE load_id = %s", (load_id,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        self.logger.info(f"🐘 Loaded {results['staged']} records: {results['created']} created, "
+                         f"{results['updated']} updated, {results['unchanged']} unchanged, "
+                         f"{results['reactivated']} reactivated, {results['deactivated']} deactivated")
+        return results
+
+    @staticmethod
+    def _drop_duplicates(cursor, load_id: str) -> int:
+        cursor.execute("""
+            DELETE FROM distributor_staging s
+            USING distributor_staging t
+            WHERE s.load_id = %(load_id)s AND t.load_id = %(load_id)s
+              AND t.unifi_id = s.unifi_id AND t.seq > s.seq
+        """, {'load_id': load_id})
+        return cursor.rowcount
+
+    @staticmethod
+    def _merge_companies(cursor, load_id: str):
+        """(created, updated) companies; websites are refreshed only when the scrape has one"""
+        cursor.execute("""
+            WITH merged AS (
+                INSERT INTO companies (name, website_url, created_at, updated_at)
+                SELECT DISTINCT ON (company_name) company_name, website_url, now(), now()
+                FROM distributor_staging
+                WHERE load_id = %s
+                ORDER BY company_name, seq DESC
+                ON CONFLICT (name) DO UPDATE SET website_url = EXCLUDED.website_url, updated_at = EXCLUDED.updated_at
+                WHERE EXCLUDED.website_url IS NOT NULL
+                  AND companies.website_url IS DISTINCT FROM EXCLUDED.website_url
+                RETURNING (xmax = 0) AS inserted
+            )
+            SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM merged
+        """, (load_id,))
+        return cursor.fetchone()
+
+    @staticmethod
+    def _merge_distributors(cursor, load_id: str) -> Dict[str, int]:
+        """Merge staged distributors; outcomes come from comparing against the pre-merge rows
+
+        The prior CTE reads the statement's starting snapshot, so it still sees
+        each row as it was before the INSERT ... ON CONFLICT touched it.
+        """
+        columns = ', '.join(UPSERT_COLUMNS)
+        staged = ', '.join('c.id' if column == 'company_id' else f's.{column}' for column in UPSERT_COLUMNS)
+        assignments = ', '.join(f"{column} = EXCLUDED.{column}" for column in UPDATE_COLUMNS)
+        prior_columns = ', '.join(f'd.{column}' for column in COMPARED_COLUMNS)
+        differs = ' OR '.join(f'p.{column} IS DISTINCT FROM m.{column}' for column in COMPARED_COLUMNS)
+        cursor.execute(f"""
+            WITH prior AS (
+                SELECT d.unifi_id, d.is_active, {prior_columns}
+                FROM distributors d
+                JOIN distributor_staging s ON s.unifi_id = d.unifi_id AND s.load_id = %(load_id)s
+            ),
+            merged AS (
+                INSERT INTO distributors ({columns}, is_active, first_discovered_at, last_verified_at,
+                                          created_at, updated_at)
+                SELECT {staged}, true, now(), now(), now(), now()
+                FROM distributor_staging s
+                JOIN companies c ON c.name = s.company_name
+                WHERE s.load_id = %(load_id)s
+                ON CONFLICT (unifi_id) DO UPDATE SET
+                    {assignments},
+                    reactivated_at = CASE WHEN distributors.is_active THEN distributors.reactivated_at
+                                          ELSE EXCLUDED.last_verified_at END,
+                    is_active = true,
+                    last_verified_at = EXCLUDED.last_verified_at,
+                    updated_at = EXCLUDED.updated_at
+                RETURNING (xmax = 0) AS inserted, {columns}
+            )
+            SELECT
+                COUNT(*) FILTER (WHERE m.inserted),
+                COUNT(*) FILTER (WHERE NOT m.inserted AND p.is_active AND ({differs})),
+                COUNT(*) FILTER (WHERE NOT m.inserted AND p.is_active AND NOT ({differs})),
+                COUNT(*) FILTER (WHERE NOT m.inserted AND NOT p.is_active)
+            FROM merged m
+            LEFT JOIN prior p ON p.unifi_id = m.unifi_id
+        """, {'load_id': load_id})
+        created, updated, unchanged, reactivated = cursor.fetchone()
+        return {'created': created, 'updated': updated, 'unchanged': unchanged, 'reactivated': reactivated}
+
+    @staticmethod
+    def _deactivate_missing(cursor, load_id: str) -> int:
+        cursor.execute("""
+            UPDATE distributors d SET is_active = false, deactivated_at = now(), updated_at = now()
+            WHERE d.is_active AND d.unifi_id IS NOT NULL
+              AND NOT EXISTS (
+                  SELECT 1 FROM distributor_staging s WHERE s.load_id = %s AND s.unifi_id = d.unifi_id
+              )
+        """, (load_id,))
+        return cursor.rowcount
+
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Pipeline Profiling Hooks
+Lightweight nested timing spans for the scrape -> process -> export pipeline.
+Spans are no-ops unless a Profiler is active (e.g. `cli.py scrape --profile`)
+"""
+
+import cProfile
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class Profiler:
+    """Collects per-stage wall time from nested spans, optionally alongside cProfile"""
+
+    def __init__(self, use_cprofile: bool = False):
+        self.use_cprofile = use_cprofile
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # stage path (outer -> inner) -> [calls, total_seconds]
+        self._stages: Dict[Tuple[str, ...], List[float]] = {}
+        self.started_at: Optional[datetime] = None
+        self._start: Optional[float] = None
+        self.total_seconds = 0.0
+
+    def _stack(self) -> List[str]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name: str):
+        """Time a stage; spans opened inside it are recorded as its children"""
+        stack = self._stack()
+        stack.append(name)
+        path = tuple(stack)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            with self._lock:
+                stage = self._stages.get(path)
+                if stage is None:
+                    stage = self._stages[path] = [0, 0.0]
+                stage[0] += 1
+                stage[1] += elapsed
+
+    def start(self):
+        """Make this the active profiler"""
+        global _active_profiler
+        self.started_at = datetime.utcnow()
+        self._start = time.perf_counter()
+        if self.use_cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        _active_profiler = self
+
+    def stop(self):
+        """Deactivate and freeze the total wall time"""
+        global _active_profiler
+        if self._cprofile:
+            self._cprofile.disable()
+        if self._start is not None:
+            self.total_seconds = time.perf_counter() - self._start
+        if _active_profiler is self:
+            _active_profiler = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ------------------------------------------------------------------
+    # Reports
+    # ------------------------------------------------------------------
+
+    def _self_seconds(self) -> Dict[Tuple[str, ...], float]:
+        """Stage time minus the time spent in its direct child spans"""
+        with self._lock:
+            stages = {path: list(stage) for path, stage in self._stages.items()}
+        own = {path: stage[1] for path, stage in stages.items()}
+        for path, stage in stages.items():
+            parent = path[:-1]
+            if parent in own:
+                own[parent] -= stage[1]
+        return {path: max(seconds, 0.0) for path, seconds in own.items()}
+
+    def report(self) -> Dict:
+        """Per-stage breakdown: calls, total/self seconds and share of the run"""
+        with self._lock:
+            stages = sorted(self._stages.items())
+        own = self._self_seconds()
+        total = self.total_seconds or sum(stage[1] for path, stage in stages if len(path) == 1)
+
+        return {
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'total_seconds': round(total, 6),
+            'stages': [
+                {
+                    'stage': '/'.join(path),
+                    'depth': len(path) - 1,
+                    'calls': int(calls),
+                    'total_seconds': round(seconds, 6),
+                    'self_seconds': round(own[path], 6),
+                    'avg_ms': round(seconds / calls * 1000, 3) if calls else 0,
+                    'percent': round(seconds / total * 100, 2) if total else 0
+                }
+                for path, (calls, seconds) in stages
+            ]
+        }
+
+    def folded_stacks(self) -> List[str]:
+        """Span tree in collapsed-stack format (self time in microseconds) for flamegraph.pl / speedscope"""
+        return [
+            f"{';'.join(path)} {int(seconds * 1_000_000)}"
+            for path, seconds in sorted(self._self_seconds().items())
+            if seconds > 0
+        ]
+
+    def write(self, path: str) -> Dict[str, str]:
+        """Write the JSON breakdown to path, plus path.folded and (with cProfile) path.pstats"""
+        outputs = {'report': path, 'folded': f"{path}.folded"}
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2)
+        with open(outputs['folded'], 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.folded_stacks()) + '\n')
+
+        if self._cprofile:
+            outputs['pstats'] = f"{path}.pstats"
+            self._cprofile.dump_stats(outputs['pstats'])
+
+        return outputs
+
+
+_active_profiler: Optional[Profiler] = None
+
+
+def get_active_profiler() -> Optional[Profiler]:
+    return _active_profiler
+
+
+@contextmanager
+def span(name: str):
+    """Time a pipeline stage on the active profiler; does nothing when profiling is off"""
+    profiler = _active_profiler
+    if profiler is None:
+        yield
+        return
+    with profiler.span(name):
+        yield
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorator form of span(); defaults to the function name"""
+    def decorator(func: Callable) -> Callable:
+        stage = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _active_profiler is None:
+                return func(*args, **kwargs)
+            with _active_profiler.span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Exploratory Region Discovery
+Finds which (region, country/state code) pairs have distributors by probing the
+JSON endpoint, with a bounded thread pool sharing one request-rate limit.
+Every probe result is kept in region_discovery_probes: pairs known to be empty
+are skipped until REGION_DISCOVERY_NEGATIVE_TTL_DAYS have passed, pairs known to
+have distributors until POSITIVE_TTL_DAYS, so repeat discoveries only probe
+unknown or stale pairs.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+from config.settings import settings
+from config.logging import LoggerMixin
+from config.sqlite import database_path, get_connection_manager
+
+
+# Regions known to the ui.com distributor locator
+KNOWN_REGIONS = ['af', 'as', 'aus-nzl', 'can', 'eur', 'lat-a', 'mid-e', 'usa']
+
+# Candidate country / state / province codes (ISO 3166 and common abbreviations)
+CANDIDATE_CODES = list(dict.fromkeys([
+    # Europe
+    'DE', 'FR', 'GB', 'IT', 'ES', 'NL', 'BE', 'CH', 'AT', 'PL', 'SE', 'NO', 'DK', 'FI', 'IE', 'PT', 'GR', 'CZ', 'HU', 'RO', 'BG', 'HR', 'SI', 'SK', 'LT', 'LV', 'EE', 'CY', 'MT', 'LU', 'AL', 'BA', 'MK', 'ME', 'RS', 'XK', 'MD', 'UA', 'AM', 'GE', 'AZ', 'TR',
+    # Asia
+    'CN', 'JP', 'KR', 'IN', 'ID', 'TH', 'VN', 'MY', 'SG', 'PH', 'TW', 'HK', 'MO', 'KH', 'MM', 'BD', 'PK', 'LK', 'NP', 'BN', 'MV', 'MN', 'KZ', 'UZ',
+    # Americas
+    'US', 'CA', 'MX', 'BR', 'AR', 'CO', 'PE', 'VE', 'CL', 'EC', 'BO', 'PY', 'UY', 'GY', 'SR', 'GF', 'CR', 'PA', 'GT', 'HN', 'SV', 'NI', 'BZ', 'DO', 'HT', 'JM', 'TT', 'BB', 'BS', 'CU',
+    # US states
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY',
+    # Canadian provinces
+    'AB', 'BC', 'MB', 'NB', 'NL', 'NS', 'NT', 'NU', 'ON', 'PE', 'QC', 'SK', 'YT',
+    # Africa
+    'ZA', 'NG', 'KE', 'GH', 'TZ', 'UG', 'ZW', 'NA', 'BW', 'ZM', 'MW', 'MZ', 'MG', 'MU', 'SC', 'CD', 'CM', 'CI', 'SN', 'ML', 'BF', 'NE', 'TD', 'CF', 'CG', 'GA', 'GQ', 'ST', 'AO', 'LY', 'DZ', 'TN', 'MA', 'EG', 'SD', 'SS', 'ET', 'ER', 'DJ', 'SO',
+    # Middle East
+    'SA', 'AE', 'IL', 'IQ', 'IR', 'JO', 'LB', 'SY', 'YE', 'OM', 'QA', 'KW', 'BH', 'AF', 'PK',
+    # Oceania
+    'AU', 'NZ', 'FJ', 'PG', 'NC', 'VU', 'SB', 'PF', 'WS', 'KI', 'TO', 'MH', 'FM', 'PW', 'NR', 'TV'
+]))
+
+PROBE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS region_discovery_probes (
+        region_code TEXT NOT NULL,
+        country_code TEXT NOT NULL,
+        distributor_count INTEGER NOT NULL,
+        probed_at TEXT NOT NULL,
+        PRIMARY KEY (region_code, country_code)
+    ) WITHOUT ROWID""",
+]
+
+# Database files whose probe table was created by this process
+_schema_ready = set()
+
+
+class RateLimiter:
+    """Spaces request starts at least min_interval seconds apart, across threads"""
+
+    def __init__(self, requests_per_second: float):
+        self.min_interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_at)
+            self._next_at = start_at + self.min_interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+
+class RegionDiscovery(LoggerMixin):
+    """Concurrent JSON probing of candidate (region, code) pairs with a persistent result cache"""
+
+    # Known non-empty pairs are re-probed this often (empty ones: REGION_DISCOVERY_NEGATIVE_TTL_DAYS)
+    POSITIVE_TTL_DAYS = 7
+
+    def __init__(self, db_path: Optional[str] = None, base_url: Optional[str] = None,
+                 workers: Optional[int] = None, requests_per_second: Optional[float] = None,
+                 negative_ttl_days: Optional[float] = None):
+        self.db_path = db_path or database_path()
+        self.base_url = base_url or settings.unifi_distributors_url
+        self.workers = workers or settings.region_discovery_workers
+        self.rate_limiter = RateLimiter(
+            settings.region_discovery_rps if requests_per_second is None else requests_per_second)
+        self.negative_ttl = timedelta(days=(
+            settings.region_discovery_negative_ttl_days if negative_ttl_days is None else negative_ttl_days
+        ))
+        self.positive_ttl = timedelta(days=self.POSITIVE_TTL_DAYS)
+        self._local = threading.local()
+
+    def _connect(self, write: bool = False):
+        """The shared writer or this thread's reader; the probe table is created once per process"""
+        manager = get_connection_manager(self.db_path)
+        if self.db_path not in _schema_ready:
+            with manager.writer() as conn:
+                for statement in PROBE_SCHEMA:
+                    conn.execute(statement)
+            _schema_ready.add(self.db_path)
+        return manager.writer() if write else manager.reader()
+
+    def _session(self):
+        """This worker thread's JSON API session"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            from services.distributor_scraper import JsonDistributorScraper
+            session = self._local.session = JsonDistributorScraper.create_json_session()
+        return session
+
+    def probe(self, region: str, country_code: str) -> Optional[int]:
+        """Distributor count of one pair, or None when the request failed (not cached)"""
+        self.rate_limiter.wait()
+        try:
+            response = self._session().get(f"{self.base_url}?region={region}&country_state={country_code}", timeout=15)
+            if response.status_code != 200 or 'application/json' not in response.headers.get('Content-Type', ''):
+                return None
+            payload = response.json()
+            return len(payload.get('resellers') or []) + len(payload.get('master_resellers') or [])
+        except Exception as e:
+            self.logger.debug(f"Discovery probe failed for {region}-{country_code}: {e}")
+            return None
+
+    def cached_results(self, now: Optional[datetime] = None) -> Dict[Tuple[str, str], int]:
+        """{(region, code): distributor_count} for probes still within their TTL"""
+        now = now or datetime.utcnow()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT region_code, country_code, distributor_count, probed_at FROM region_discovery_probes").fetchall()
+        finally:
+            conn.close()
+        fresh = {}
+        for region, code, count, probed_at in rows:
+            ttl = self.positive_ttl if count else self.negative_ttl
+            if now - datetime.fromisoformat(probed_at) < ttl:
+                fresh[(region, code)] = count
+        return fresh
+
+    def _save(self, results: Sequence[Tuple[str, str, int]], probed_at: str):
+        if not results:
+            return
+        conn = self._connect(write=True)
+        try:
+            conn.executemany("""
+                INSERT INTO region_discovery_probes (region_code, country_code, distributor_count, probed_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(region_code, country_code) DO UPDATE SET
+                    distributor_count = excluded.distributor_count, probed_at = excluded.probed_at
+            """, [(region, code, count, probed_at) for region, code, count in results])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def discover(self, regions: Optional[Sequence[str]] = None,
+                 candidates: Optional[Sequence[str]] = None) -> Dict[str, List[str]]:
+        """{region: [codes with distributors]}, probing only pairs without a fresh cached result"""
+        regions = list(regions or KNOWN_REGIONS)
+        candidates = list(candidates or CANDIDATE_CODES)
+        cached = self.cached_results()
+        pairs = [(region, code) for region in regions for code in candidates]
+        to_probe = [pair for pair in pairs if pair not in cached]
+        self.logger.info(f"🔭 Discovery: {len(pairs)} candidate pairs, {len(pairs) - len(to_probe)} cached, "
+                         f"probing {len(to_probe)} with {self.workers} workers")
+
+        probed = {}
+        failed = 0
+        started = time.time()
+        probed_at = datetime.utcnow().isoformat()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="region-discovery") as executor:
+                futures = {executor.submit(self.probe, region, code): (region, code) for region, code in to_probe}
+                for future in as_completed(futures):
+                    count = future.result()
+                    if count is None:
+                        failed += 1
+                    else:
+                        probed[futures[future]] = count
+        finally:
+            # Keep whatever was probed, even if the run was interrupted
+            self._save([(region, code, count) for (region, code), count in probed.items()], probed_at)
+
+        known = {**cached, **probed}
+        discovered = {}
+        for region, code in pairs:
+            if known.get((region, code)):
+                discovered.setdefault(region, []).append(code)
+        self.logger.info(f"🔭 Discovery finished in {time.time() - started:.1f}s: "
+                         f"{sum(len(codes) for codes in discovered.values())} pairs with distributors "
+                         f"in {len(discovered)} regions, {failed} probes failed")
+        return discovered
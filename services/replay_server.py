@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Local Replay Server for the ui.com distributor JSON API
+Serves pre-recorded or synthetic payloads so scraper benchmarks and tests never hit the live site
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from config.logging import LoggerMixin
+
+
+EMPTY_PAYLOAD = json.dumps({
+    'resellers': [], 'master_resellers': [], 'resellers_count': 0, 'master_resellers_count': 0
+}).encode('utf-8')
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    """Answers /distributors/?region=..&country_state=.. from the server's payload table"""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the scraper's session expects
+    disable_nagle_algorithm = True  # headers and body are separate writes; avoid delayed-ACK stalls
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        key = (query.get('region', [''])[0], query.get('country_state', [''])[0])
+        body = self.server.payloads.get(key, EMPTY_PAYLOAD)
+        self.server.request_count += 1
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ReplayServer(LoggerMixin):
+    """Threaded HTTP server replaying JSON API payloads keyed by (region, country_state)"""
+
+    def __init__(self, payloads: Dict[Tuple[str, str], bytes], host: str = '127.0.0.1', port: int = 0):
+        self.payloads = payloads
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_generator(cls, generator, **kwargs) -> 'ReplayServer':
+        """Pre-encode every payload of a SyntheticDataGenerator"""
+        payloads = {
+            (region, country): json.dumps(payload).encode('utf-8')
+            for region, country, payload in generator.iter_payloads()
+        }
+        return cls(payloads, **kwargs)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> 'ReplayServer':
+        """Load a URL-keyed capture such as ajax_api_results.json"""
+        with open(path, 'r', encoding='utf-8') as f:
+            captured = json.load(f)
+
+        payloads = {}
+        for url, payload in captured.items():
+            query = parse_qs(urlparse(url).query)
+            if 'region' in query and 'country_state' in query:
+                payloads[(query['region'][0], query['country_state'][0])] = json.dumps(payload).encode('utf-8')
+        return cls(payloads, **kwargs)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/distributors/"
+
+    @property
+    def request_count(self) -> int:
+        return self._server.request_count if self._server else 0
+
+    @property
+    def payload_bytes(self) -> int:
+        return sum(len(body) for body in self.payloads.values())
+
+    def start(self) -> str:
+        """Start serving in a background thread, returns the base URL for the scraper"""
+        self._server = ThreadingHTTPServer((self.host, self.port), _ReplayHandler)
+        self._server.daemon_threads = True
+        self._server.payloads = self.payloads
+        self._server.request_count = 0
+        self.port = self._server.server_address[1]
+
+        self._thread = threading.Thread(target=self._server.serve_forever, name='replay-server', daemon=True)
+        self._thread.start()
+        self.logger.info(f"Replay server serving {len(self.payloads)} pairs at {self.base_url}")
+        return self.base_url
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
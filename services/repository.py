@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+Distributor Repository
+One data-access layer for ingest, sync and export, resolved from DATABASE_URL so
+raw-SQL and ORM paths always hit the same database. Each backend implements the
+same bulk operations with its own fast path:
+
+- SQLite: executemany into a temp table, then one INSERT ... ON CONFLICT
+- PostgreSQL: COPY FROM STDIN into a temp table, then one INSERT ... ON CONFLICT
+
+Rows are plain dicts keyed by distributors column names; upserts are keyed on unifi_id.
+Methods that take a conn (from connection()) run inside the caller's transaction
+and leave committing to it, so an ingest run is one transaction; without one
+they commit on a connection of their own.
+"""
+
+import io
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from config.settings import settings
+from config.logging import LoggerMixin
+from config.sqlite import database_path, get_connection_manager
+
+# Columns written by bulk_upsert, in temp table / COPY order
+UPSERT_COLUMNS = (
+    'unifi_id', 'company_id', 'partner_type', 'address', 'latitude', 'longitude', 'phone',
+    'contact_email', 'region', 'country_state', 'last_modified_at', 'order_weight', 'logo_url',
+    'sunmax_partner', 'data_source', 'scraped_at'
+)
+
+# Columns refreshed when an existing unifi_id is upserted (identity columns stay)
+UPDATE_COLUMNS = tuple(column for column in UPSERT_COLUMNS if column not in ('unifi_id', 'company_id', 'address'))
+
+# Distributor columns returned by reads, plus the company's name and website
+READ_COLUMNS = (
+    'id', 'company_id', 'partner_type', 'address', 'latitude', 'longitude', 'phone', 'contact_email',
+    'region', 'country_state', 'is_active', 'created_at', 'updated_at', 'unifi_id', 'last_modified_at',
+    'order_weight', 'logo_url', 'sunmax_partner', 'data_source', 'scraped_at', 'full_country_name', 'city',
+    'first_discovered_at', 'last_verified_at', 'deactivated_at', 'reactivated_at',
+    'notion_page_id', 'notion_last_sync', 'notion_sync_status'
+)
+
+READ_SELECT = (
+    "SELECT " + ", ".join(f"d.{column}" for column in READ_COLUMNS) +
+    ", c.name AS company_name, c.website_url FROM distributors d JOIN companies c ON c.id = d.company_id"
+)
+
+# PostgreSQL temp table column types (mirrors models.database.Distributor)
+PG_COLUMN_TYPES = {
+    'unifi_id': 'INTEGER', 'company_id': 'INTEGER', 'partner_type': 'VARCHAR(20)', 'address': 'TEXT',
+    'latitude': 'NUMERIC(10, 8)', 'longitude': 'NUMERIC(11, 8)', 'phone': 'VARCHAR(50)',
+    'contact_email': 'VARCHAR(255)', 'region': 'VARCHAR(10)', 'country_state': 'VARCHAR(10)',
+    'last_modified_at': 'TIMESTAMP', 'order_weight': 'INTEGER', 'logo_url': 'TEXT',
+    'sunmax_partner': 'BOOLEAN', 'data_source': 'VARCHAR(20)', 'scraped_at': 'TIMESTAMP'
+}
+
+
+def scraped_row(distributor, company_id: int) -> Dict:
+    """Upsert row for a scraped JSON API record"""
+    return {
+        'unifi_id': distributor.unifi_id,
+        'company_id': company_id,
+        'partner_type': distributor.partner_type,
+        'address': distributor.address,
+        'latitude': distributor.latitude,
+        'longitude': distributor.longitude,
+        'phone': distributor.phone,
+        'contact_email': distributor.contact_email,
+        'region': distributor.region,
+        'country_state': distributor.country_state,
+        'last_modified_at': distributor.last_modified_iso,
+        'order_weight': distributor.order_weight,
+        'logo_url': distributor.logo_url,
+        'sunmax_partner': bool(distributor.sunmax_partner),
+        'data_source': distributor.data_source,
+        'scraped_at': distributor.scraped_at_iso
+    }
+
+
+# Characters COPY's text format needs escaped (backslash first)
+COPY_ESCAPES = (('\\', '\\\\'), ('\t', '\\t'), ('\n', '\\n'), ('\r', '\\r'))
+
+
+def _copy_value(value) -> str:
+    """One field in COPY text format: \\N for NULL, t / f for booleans, escaped text otherwise"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    text = str(value)
+    for char, escaped in COPY_ESCAPES:
+        text = text.replace(char, escaped)
+    return text
+
+
+def latest_per_unifi_id(rows: Sequence[Dict]) -> List[Dict]:
+    """One row per unifi_id (the last one wins, as with sequential writes)"""
+    return list({row['unifi_id']: row for row in rows}.values())
+
+
+class QmarkCursor:
+    """psycopg2 cursor that accepts the qmark (?) parameters the SQLite-style callers use
+
+    Statements without parameters run untouched, so literal '%' (LIKE 'full%')
+    needs no escaping there.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    @staticmethod
+    def _format(sql: str) -> str:
+        return sql.replace('%', '%%').replace('?', '%s')
+
+    def execute(self, sql: str, params: Optional[Sequence] = None):
+        if params is None:
+            self._cursor.execute(sql)
+        else:
+            self._cursor.execute(self._format(sql), params)
+        return self
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Sequence]):
+        self._cursor.executemany(self._format(sql), seq_of_params)
+        return self
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class DistributorRepository(LoggerMixin):
+    """Backend-neutral bulk operations on companies and distributors"""
+
+    backend = None
+
+    def upsert_companies(self, companies: Dict[str, Optional[str]], conn=None) -> Dict[str, int]:
+        """Create missing companies and refresh changed websites ({name: website_url}); returns {name: id}"""
+        raise NotImplementedError
+
+    def bulk_upsert(self, rows: Sequence[Dict], conn=None) -> Dict[str, int]:
+        """Insert or update distributors by unifi_id; returns {'created': n, 'updated': n}
+
+        Upserted rows are marked active and verified; previously inactive rows get
+        reactivated_at.
+        """
+        raise NotImplementedError
+
+    def bulk_read(self, unifi_ids: Iterable[int], conn=None) -> Dict[int, Dict]:
+        """{unifi_id: row} for the given Unifi IDs (as conn sees them, uncommitted writes included)"""
+        raise NotImplementedError
+
+    def iter_distributors(self, active_only: bool = False, batch_size: int = 1000) -> Iterator[Dict]:
+        """Stream every distributor (joined with its company) in id order without loading the table"""
+        raise NotImplementedError
+
+    def deactivate(self, unifi_ids: Iterable[int], conn=None) -> int:
+        """Deactivate the given active distributors; returns the row count"""
+        raise NotImplementedError
+
+    def active_unifi_ids(self, conn=None) -> Dict[int, Tuple[str, str]]:
+        """{unifi_id: (region, country_state)} of every active keyed distributor"""
+        return {unifi_id: (region, country_state) for unifi_id, region, country_state in self._query(
+            "SELECT unifi_id, region, country_state FROM distributors WHERE is_active AND unifi_id IS NOT NULL",
+            conn
+        )}
+
+    def connection(self):
+        """Connection for a caller-owned transaction: pass it as conn, commit it yourself
+
+        close() hands it back; uncommitted work is rolled back.
+        """
+        raise NotImplementedError
+
+    def cursor(self, conn):
+        """Cursor on a connection() that takes qmark (?) parameters"""
+        return conn.cursor()
+
+    def set_notion_sync(self, distributor_id: int, page_id: Optional[str]):
+        """Record a distributor's Notion page and sync status"""
+        raise NotImplementedError
+
+    def _query(self, sql: str, conn=None) -> List[tuple]:
+        """Rows of a read-only statement (portable SQL only, no parameters)"""
+        raise NotImplementedError
+
+    def statistics(self) -> Dict:
+        """Active / company / Notion counts plus JSON API field coverage, in four aggregate queries"""
+        total_active, synced = self._query(
+            "SELECT SUM(CASE WHEN is_active THEN 1 ELSE 0 END), COUNT(notion_page_id) FROM distributors"
+        )[0]
+        total_companies = self._query("SELECT COUNT(*) FROM companies")[0][0]
+        source_rows = self._query("""
+            SELECT data_source, COUNT(*), COUNT(notion_page_id)
+            FROM distributors WHERE is_active GROUP BY data_source
+        """)
+        json_api = self._query("""
+            SELECT COUNT(*), COUNT(unifi_id), COUNT(last_modified_at), COUNT(order_weight),
+                   SUM(CASE WHEN sunmax_partner THEN 1 ELSE 0 END), MAX(scraped_at)
+            FROM distributors WHERE is_active AND data_source = 'json_api'
+        """)[0]
+        return {
+            'total_active': total_active or 0,
+            'total_companies': total_companies,
+            'synced_to_notion': synced,
+            'source_distribution': {source: {'total': total, 'synced': synced_count}
+                                    for source, total, synced_count in source_rows},
+            'json_api': {
+                'total': json_api[0],
+                'with_unifi_id': json_api[1],
+                'with_last_modified': json_api[2],
+                'with_order_weight': json_api[3],
+                'sunmax_partners': json_api[4] or 0,
+                'last_scrape': json_api[5]
+            }
+        }
+
+
+class SQLiteDistributorRepository(DistributorRepository):
+    """SQLite backend on the shared connection manager (single writer, thread-local readers)"""
+
+    backend = 'sqlite'
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or database_path()
+        self.connections = get_connection_manager(self.db_path)
+
+    @staticmethod
+    def _now() -> str:
+        # Same format SQLAlchemy uses for DateTime columns on SQLite
+        return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+
+    @contextmanager
+    def _writing(self, conn=None):
+        """The caller's connection (left uncommitted), else the shared writer, committed on success"""
+        if conn is not None:
+            yield conn
+        else:
+            with self.connections.writer() as writer:
+                yield writer
+
+    def upsert_companies(self, companies: Dict[str, Optional[str]], conn=None) -> Dict[str, int]:
+        if not companies:
+            return {}
+        now = self._now()
+        with self._writing(conn) as conn:
+            conn.executemany("""
+                INSERT INTO companies (name, website_url, created_at, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET website_url = excluded.website_url, updated_at = excluded.updated_at
+                WHERE excluded.website_url IS NOT NULL
+                  AND (companies.website_url IS NULL OR companies.website_url != excluded.website_url)
+            """, [(name, website_url, now, now) for name, website_url in companies.items()])
+            return self._company_ids(conn, list(companies))
+
+    @staticmethod
+    def _company_ids(conn, names: List[str]) -> Dict[str, int]:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS company_names (name TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM company_names")
+        conn.executemany("INSERT OR IGNORE INTO company_names (name) VALUES (?)", [(name,) for name in names])
+        company_ids = dict(conn.execute(
+            "SELECT c.name, c.id FROM companies c JOIN company_names n ON n.name = c.name"
+        ).fetchall())
+        conn.execute("DELETE FROM company_names")
+        return company_ids
+
+    def bulk_upsert(self, rows: Sequence[Dict], conn=None) -> Dict[str, int]:
+        results = {'created': 0, 'updated': 0}
+        rows = latest_per_unifi_id(rows)
+        if not rows:
+            return results
+        now = self._now()
+        columns = ', '.join(UPSERT_COLUMNS)
+        with self._writing(conn) as conn:
+            conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS distributor_upsert AS "
+                         f"SELECT {columns} FROM distributors WHERE 0")
+            conn.execute("DELETE FROM distributor_upsert")
+            conn.executemany(
+                f"INSERT INTO distributor_upsert ({columns}) VALUES ({', '.join('?' for _ in UPSERT_COLUMNS)})",
+                [tuple(row.get(column) for column in UPSERT_COLUMNS) for row in rows]
+            )
+            results['updated'] = conn.execute("""
+                SELECT COUNT(*) FROM distributor_upsert u JOIN distributors d ON d.unifi_id = u.unifi_id
+            """).fetchone()[0]
+
+            assignments = ', '.join(f"{column} = excluded.{column}" for column in UPDATE_COLUMNS)
+            # "WHERE true" keeps SQLite from reading ON CONFLICT as a join constraint
+            conn.execute(f"""
+                INSERT INTO distributors ({columns}, is_active, first_discovered_at, last_verified_at,
+                                          created_at, updated_at)
+                SELECT {columns}, 1, ?, ?, ?, ? FROM distributor_upsert WHERE true
+                ON CONFLICT(unifi_id) DO UPDATE SET
+                    {assignments},
+                    reactivated_at = CASE WHEN distributors.is_active = 0 THEN excluded.last_verified_at
+                                          ELSE distributors.reactivated_at END,
+                    is_active = 1,
+                    last_verified_at = excluded.last_verified_at,
+                    updated_at = excluded.updated_at
+            """, (now, now, now, now))
+            conn.execute("DELETE FROM distributor_upsert")
+
+        results['created'] = len(rows) - results['updated']
+        return results
+
+    def bulk_read(self, unifi_ids: Iterable[int], conn=None) -> Dict[int, Dict]:
+        if conn is None:
+            conn = self.connections.reader()
+        rows = {}
+        unifi_ids = list(unifi_ids)
+        # Chunked to stay under SQLite's bound-parameter limit
+        for start in range(0, len(unifi_ids), 500):
+            chunk = unifi_ids[start:start + 500]
+            cursor = conn.execute(
+                f"{READ_SELECT} WHERE d.unifi_id IN ({', '.join('?' for _ in chunk)})", chunk
+            )
+            columns = [desc[0] for desc in cursor.description]
+            for values in cursor:
+                row = dict(zip(columns, values))
+                rows[row['unifi_id']] = row
+        return rows
+
+    def iter_distributors(self, active_only: bool = False, batch_size: int = 1000) -> Iterator[Dict]:
+        conn = self.connections.reader()
+        condition = "AND d.is_active = 1" if active_only else ""
+        last_id = 0
+        while True:
+            cursor = conn.execute(
+                f"{READ_SELECT} WHERE d.id > ? {condition} ORDER BY d.id LIMIT ?", (last_id, batch_size)
+            )
+            columns = [desc[0] for desc in cursor.description]
+            batch = [dict(zip(columns, values)) for values in cursor.fetchall()]
+            if not batch:
+                return
+            yield from batch
+            last_id = batch[-1]['id']
+
+    def deactivate(self, unifi_ids: Iterable[int], conn=None) -> int:
+        now = self._now()
+        with self._writing(conn) as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS missing_unifi_ids (unifi_id INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM missing_unifi_ids")
+            conn.executemany("INSERT OR IGNORE INTO missing_unifi_ids (unifi_id) VALUES (?)",
+                             [(unifi_id,) for unifi_id in unifi_ids])
+            deactivated = conn.execute("""
+                UPDATE distributors SET is_active = 0, deactivated_at = ?, updated_at = ?
+                WHERE is_active = 1
+                  AND EXISTS (SELECT 1 FROM missing_unifi_ids m WHERE m.unifi_id = distributors.unifi_id)
+            """, (now, now)).rowcount
+            conn.execute("DELETE FROM missing_unifi_ids")
+        return deactivated
+
+    def connection(self):
+        """The shared writer; other writers wait until the caller closes it"""
+        return self.connections.writer()
+
+    def _query(self, sql: str, conn=None) -> List[tuple]:
+        return (conn if conn is not None else self.connections.reader()).execute(sql).fetchall()
+
+    def set_notion_sync(self, distributor_id: int, page_id: Optional[str]):
+        with self.connections.writer() as conn:
+            conn.execute("""
+                UPDATE distributors
+                SET notion_page_id = ?, notion_last_sync = datetime('now'), notion_sync_status = ?
+                WHERE id = ?
+            """, (page_id, 'synced' if page_id else 'pending', distributor_id))
+
+
+class PostgresDistributorRepository(DistributorRepository):
+    """PostgreSQL backend on the SQLAlchemy engine's psycopg2 connections"""
+
+    backend = 'postgresql'
+
+    def __init__(self, engine=None):
+        if engine is None:
+            from config.database import engine
+        self.engine = engine
+
+    def connection(self):
+        """Raw psycopg2 connection from the engine's pool (close() returns it to the pool)"""
+        return self.engine.raw_connection()
+
+    def cursor(self, conn):
+        return QmarkCursor(conn.cursor())
+
+    @contextmanager
+    def _cursor(self, conn=None):
+        """Cursor in the caller's transaction (left uncommitted), else on a pooled connection, committed on success"""
+        if conn is not None:
+            yield conn.cursor()
+            return
+        own = self.connection()
+        try:
+            yield own.cursor()
+            own.commit()
+        except Exception:
+            own.rollback()
+            raise
+        finally:
+            own.close()
+
+    @staticmethod
+    def copy_rows(cursor, table: str, columns: Sequence[str], rows: Iterable[Sequence]):
+        """COPY rows into table through an in-memory buffer in COPY's text format"""
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(_copy_value(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+    @staticmethod
+    def _temp_table(cursor, name: str, columns: str):
+        """Empty temp table for this transaction (a caller's transaction may already hold one from an earlier call)"""
+        cursor.execute(f"CREATE TEMP TABLE IF NOT EXISTS {name} ({columns}) ON COMMIT DROP")
+        cursor.execute(f"TRUNCATE {name}")
+
+    def upsert_companies(self, companies: Dict[str, Optional[str]], conn=None) -> Dict[str, int]:
+        if not companies:
+            return {}
+        with self._cursor(conn) as cursor:
+            self._temp_table(cursor, 'company_upsert', "name VARCHAR(255), website_url TEXT")
+            self.copy_rows(cursor, 'company_upsert', ('name', 'website_url'), companies.items())
+            cursor.execute("""
+                INSERT INTO companies (name, website_url, created_at, updated_at)
+                SELECT name, website_url, now(), now() FROM company_upsert
+                ON CONFLICT (name) DO UPDATE SET website_url = EXCLUDED.website_url, updated_at = EXCLUDED.updated_at
+                WHERE EXCLUDED.website_url IS NOT NULL
+                  AND companies.website_url IS DISTINCT FROM EXCLUDED.website_url
+            """)
+            cursor.execute("SELECT c.name, c.id FROM companies c JOIN company_upsert u ON u.name = c.name")
+            return dict(cursor.fetchall())
+
+    def bulk_upsert(self, rows: Sequence[Dict], conn=None) -> Dict[str, int]:
+        results = {'created': 0, 'updated': 0}
+        # ON CONFLICT DO UPDATE cannot touch the same row twice in one statement
+        rows = latest_per_unifi_id(rows)
+        if not rows:
+            return results
+        columns = ', '.join(UPSERT_COLUMNS)
+        assignments = ', '.join(f"{column} = EXCLUDED.{column}" for column in UPDATE_COLUMNS)
+        with self._cursor(conn) as cursor:
+            self._temp_table(cursor, 'distributor_upsert',
+                             ", ".join(f"{column} {PG_COLUMN_TYPES[column]}" for column in UPSERT_COLUMNS))
+            self.copy_rows(cursor, 'distributor_upsert', UPSERT_COLUMNS,
+                           (tuple(row.get(column) for column in UPSERT_COLUMNS) for row in rows))
+            # xmax = 0 only on freshly inserted tuples
+            cursor.execute(f"""
+                INSERT INTO distributors ({columns}, is_active, first_discovered_at, last_verified_at,
+                                          created_at, updated_at)
+                SELECT {columns}, true, now(), now(), now(), now() FROM distributor_upsert
+                ON CONFLICT (unifi_id) DO UPDATE SET
+                    {assignments},
+                    reactivated_at = CASE WHEN distributors.is_active THEN distributors.reactivated_at
+                                          ELSE EXCLUDED.last_verified_at END,
+                    is_active = true,
+                    last_verified_at = EXCLUDED.last_verified_at,
+                    updated_at = EXCLUDED.updated_at
+                RETURNING (xmax = 0)
+            """)
+            for (inserted,) in cursor.fetchall():
+                results['created' if inserted else 'updated'] += 1
+        return results
+
+    def bulk_read(self, unifi_ids: Iterable[int], conn=None) -> Dict[int, Dict]:
+        with self._cursor(conn) as cursor:
+            cursor.execute(f"{READ_SELECT} WHERE d.unifi_id = ANY(%s)", (list(unifi_ids),))
+            columns = [desc[0] for desc in cursor.description]
+            rows = {}
+            for values in cursor.fetchall():
+                row = dict(zip(columns, values))
+                rows[row['unifi_id']] = row
+            return rows
+
+    def iter_distributors(self, active_only: bool = False, batch_size: int = 1000) -> Iterator[Dict]:
+        conn = self.connection()
+        try:
+            # Named (server-side) cursor: rows are fetched batch_size at a time
+            cursor = conn.cursor(name='iter_distributors')
+            cursor.itersize = batch_size
+            cursor.execute(f"{READ_SELECT}{' WHERE d.is_active' if active_only else ''} ORDER BY d.id")
+            columns = None
+            for values in cursor:
+                if columns is None:
+                    columns = [desc[0] for desc in cursor.description]
+                yield dict(zip(columns, values))
+            cursor.close()
+            conn.commit()
+        finally:
+            conn.close()
+
+    def deactivate(self, unifi_ids: Iterable[int], conn=None) -> int:
+        with self._cursor(conn) as cursor:
+            self._temp_table(cursor, 'missing_unifi_ids', "unifi_id INTEGER PRIMARY KEY")
+            self.copy_rows(cursor, 'missing_unifi_ids', ('unifi_id',), ((unifi_id,) for unifi_id in set(unifi_ids)))
+            cursor.execute("""
+                UPDATE distributors d SET is_active = false, deactivated_at = now(), updated_at = now()
+                WHERE d.is_active AND EXISTS (SELECT 1 FROM missing_unifi_ids m WHERE m.unifi_id = d.unifi_id)
+            """)
+            return cursor.rowcount
+
+    def _query(self, sql: str, conn=None) -> List[tuple]:
+        with self._cursor(conn) as cursor:
+            cursor.execute(sql)
+            return cursor.fetchall()
+
+    def set_notion_sync(self, distributor_id: int, page_id: Optional[str]):
+        conn = self.connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE distributors
+                SET notion_page_id = %s, notion_last_sync = now(), notion_sync_status = %s
+                WHERE id = %s
+            """, (page_id, 'synced' if page_id else 'pending', distributor_id))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+def get_repository(database_url: Optional[str] = None) -> DistributorRepository:
+    """Repository for DATABASE_URL (or the given URL)"""
+    url = database_url or settings.database_url
+    if url.startswith("sqlite"):
+        return SQLiteDistributorRepository(database_path(url))
+    if url.startswith("postgres"):
+        if database_url and database_url != settings.database_url:
+            from sqlalchemy import create_engine
+            return PostgresDistributorRepository(create_engine(database_url, pool_pre_ping=True))
+        return PostgresDistributorRepository()
+    raise ValueError(f"Unsupported database URL: {url}")
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Scrape Watermarks
+Per region/country pair: the API's reseller counts, the newest last_modified and
+a hash of the raw payload, as of the last processed scrape. Incremental scrapes
+compare each fresh response against its watermark and only convert and write
+pairs that changed; a full pass on a configurable cadence re-processes every
+pair to catch edits the watermark cannot see.
+"""
+
+import hashlib
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Sequence, Tuple
+from config.settings import settings
+from config.logging import LoggerMixin
+from config.sqlite import database_path, get_connection_manager
+
+
+WATERMARK_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS scrape_watermarks (
+        region TEXT NOT NULL,
+        country_state TEXT NOT NULL,
+        resellers_count INTEGER NOT NULL,
+        master_resellers_count INTEGER NOT NULL,
+        max_last_modified TEXT,
+        payload_hash TEXT NOT NULL,
+        checked_at TEXT NOT NULL,
+        changed_at TEXT NOT NULL,
+        full_at TEXT,
+        PRIMARY KEY (region, country_state)
+    ) WITHOUT ROWID""",
+]
+
+# Database files whose watermark table was created by this process
+_schema_ready = set()
+
+WATERMARK_COLUMNS = (
+    'region', 'country_state', 'resellers_count', 'master_resellers_count', 'max_last_modified',
+    'payload_hash', 'checked_at', 'changed_at', 'full_at'
+)
+
+
+def payload_hash(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def payload_watermark(json_data: Dict, content_hash: str) -> Dict:
+    """Counts, newest last_modified and hash of one decoded API response"""
+    resellers = json_data.get('resellers') or []
+    masters = json_data.get('master_resellers') or []
+    # ISO-8601 strings of one format order correctly as text
+    modified = [record.get('last_modified') for record in resellers] + [record.get('last_modified') for record in masters]
+    modified = [value for value in modified if isinstance(value, str) and value]
+    return {
+        'resellers_count': json_data.get('resellers_count', len(resellers)),
+        'master_resellers_count': json_data.get('master_resellers_count', len(masters)),
+        'max_last_modified': max(modified) if modified else None,
+        'payload_hash': content_hash
+    }
+
+
+def watermark_unchanged(previous: Optional[Dict], current: Dict) -> bool:
+    """Same payload, or same counts and newest last_modified, as the last processed scrape"""
+    if previous is None:
+        return False
+    if previous['payload_hash'] == current['payload_hash']:
+        return True
+    return all(previous[field] == current[field]
+               for field in ('resellers_count', 'master_resellers_count', 'max_last_modified'))
+
+
+class WatermarkStore(LoggerMixin):
+    """scrape_watermarks table next to the distributors table"""
+
+    def __init__(self, db_path: Optional[str] = None, full_pass_hours: Optional[float] = None):
+        self.db_path = db_path or database_path()
+        self.full_pass_interval = timedelta(hours=(
+            full_pass_hours if full_pass_hours is not None else settings.scrape_full_pass_hours
+        ))
+
+    def _connect(self, write: bool = False):
+        """The shared writer or this thread's reader; the table is created once per process"""
+        manager = get_connection_manager(self.db_path)
+        if self.db_path not in _schema_ready:
+            with manager.writer() as conn:
+                for statement in WATERMARK_SCHEMA:
+                    conn.execute(statement)
+            _schema_ready.add(self.db_path)
+        return manager.writer() if write else manager.reader()
+
+    def load(self) -> Dict[Tuple[str, str], Dict]:
+        """{(region, country_state): watermark} for every pair scraped before"""
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"SELECT {', '.join(WATERMARK_COLUMNS)} FROM scrape_watermarks").fetchall()
+        finally:
+            conn.close()
+        return {(row[0], row[1]): dict(zip(WATERMARK_COLUMNS, row)) for row in rows}
+
+    def full_pass_due(self, now: Optional[datetime] = None) -> bool:
+        """True when no full pass ran within SCRAPE_FULL_PASS_HOURS"""
+        conn = self._connect()
+        try:
+            last_full = conn.execute("SELECT MAX(full_at) FROM scrape_watermarks").fetchone()[0]
+        finally:
+            conn.close()
+        if last_full is None:
+            return True
+        return (now or datetime.utcnow()) - datetime.fromisoformat(last_full) >= self.full_pass_interval
+
+    def save(self, watermarks: Sequence[Dict]) -> int:
+        """Upsert watermarks (call once the scraped records are stored, so a failed run is retried)"""
+        if not watermarks:
+            return 0
+        conn = self._connect(write=True)
+        try:
+            conn.executemany(f"""
+                INSERT INTO scrape_watermarks ({', '.join(WATERMARK_COLUMNS)})
+                VALUES ({', '.join('?' for _ in WATERMARK_COLUMNS)})
+                ON CONFLICT(region, country_state) DO UPDATE SET
+                    {', '.join(f"{column} = excluded.{column}" for column in WATERMARK_COLUMNS[2:])}
+            """, [tuple(watermark.get(column) for column in WATERMARK_COLUMNS) for watermark in watermarks])
+            conn.commit()
+        finally:
+            conn.close()
+        self.logger.info(f"💧 Saved {len(watermarks)} scrape watermarks")
+        return len(watermarks)
+
+
+def commit_run(run: Dict, store: Optional[WatermarkStore] = None, scheduler=None):
+    """Persist an incremental run's watermarks (and, with a PairScheduler, its churn observations)
+
+    Call once the run's distributors are stored, so a failed run is retried next time.
+    """
+    (store or WatermarkStore()).save(run['watermarks'])
+    if scheduler is not None:
+        scheduler.record_run(run)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Columnar Snapshot Store
+Writes every scrape run as immutable Parquet files partitioned by run date and region,
+and reads them back for point-in-time queries and run-to-run diffs
+"""
+
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+from config.settings import settings
+from config.logging import LoggerMixin, get_logger
+from services.distributor_scraper import CompactDistributor, distributor_key
+from services.profiling import timed
+
+# Used when snapshot_run's caller passes no logger of its own
+_logger = get_logger('snapshotstore')
+
+
+# Column order of every snapshot file; matches CompactDistributor.__slots__
+SNAPSHOT_COLUMNS = CompactDistributor.__slots__
+
+# Columns ignored when diffing two runs (they change on every scrape)
+VOLATILE_COLUMNS = ('scraped_at_ts',)
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow, pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Snapshot store requires pyarrow (pip install pyarrow)")
+
+
+def _snapshot_schema(pa):
+    return pa.schema([
+        ('company_name', pa.string()),
+        ('partner_type', pa.dictionary(pa.int8(), pa.string())),
+        ('website_url', pa.string()),
+        ('address', pa.string()),
+        ('phone', pa.string()),
+        ('contact_email', pa.string()),
+        ('latitude', pa.float64()),
+        ('longitude', pa.float64()),
+        ('region', pa.dictionary(pa.int8(), pa.string())),
+        ('country_state', pa.dictionary(pa.int16(), pa.string())),
+        ('unifi_id', pa.int64()),
+        ('last_modified_ts', pa.float64()),
+        ('order_weight', pa.int32()),
+        ('logo_url', pa.string()),
+        ('sunmax_partner', pa.bool_()),
+        ('data_source', pa.dictionary(pa.int8(), pa.string())),
+        ('scraped_at_ts', pa.float64()),
+    ])
+
+
+class SnapshotStore(LoggerMixin):
+    """Immutable per-run Parquet snapshots: <root>/run_date=YYYY-MM-DD/region=<region>/<run_id>.parquet"""
+
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or settings.snapshot_dir
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.root, self.MANIFEST_FILE)
+
+    def list_runs(self) -> List[Dict]:
+        """Runs recorded in the manifest, oldest first"""
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return sorted(json.load(f).get('runs', []), key=lambda run: run['run_at'])
+
+    def get_run(self, run_id: str) -> Dict:
+        for run in self.list_runs():
+            if run['run_id'] == run_id:
+                return run
+        raise KeyError(f"Unknown snapshot run: {run_id}")
+
+    def _append_manifest(self, entry: Dict):
+        runs = self.list_runs()
+        runs.append(entry)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'runs': runs}, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    @timed('snapshot_write')
+    def write_run(self, distributors: Sequence, run_id: Optional[str] = None,
+                  run_at: Optional[datetime] = None) -> Dict:
+        """Write one scrape run; returns its manifest entry. Existing runs are never overwritten."""
+        pa, pq = _require_pyarrow()
+        run_at = run_at or datetime.now(timezone.utc)
+        run_id = run_id or f"{run_at.strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:8]}"
+        run_date = run_at.strftime('%Y-%m-%d')
+
+        # Group rows per region, column-wise
+        by_region: Dict[str, Dict[str, list]] = {}
+        for distributor in distributors:
+            if not isinstance(distributor, CompactDistributor):
+                distributor = CompactDistributor.from_rich(distributor)
+            columns = by_region.get(distributor.region or 'unknown')
+            if columns is None:
+                columns = by_region[distributor.region or 'unknown'] = {name: [] for name in SNAPSHOT_COLUMNS}
+            for name in SNAPSHOT_COLUMNS:
+                columns[name].append(getattr(distributor, name))
+
+        schema = _snapshot_schema(pa)
+        files = {}
+        with self._lock:
+            if any(run['run_id'] == run_id for run in self.list_runs()):
+                raise ValueError(f"Snapshot run {run_id} already exists")
+
+            for region, columns in sorted(by_region.items()):
+                directory = os.path.join(self.root, f"run_date={run_date}", f"region={region}")
+                os.makedirs(directory, exist_ok=True)
+                path = os.path.join(directory, f"{run_id}.parquet")
+
+                table = pa.Table.from_pydict(columns, schema=schema)
+                pq.write_table(table, f"{path}.tmp", compression='zstd')
+                os.replace(f"{path}.tmp", path)
+                files[region] = {'path': os.path.relpath(path, self.root), 'rows': table.num_rows}
+
+            entry = {
+                'run_id': run_id,
+                'run_at': run_at.isoformat(),
+                'run_date': run_date,
+                'rows': sum(region['rows'] for region in files.values()),
+                'regions': files
+            }
+            self._append_manifest(entry)
+
+        self.logger.info(f"📦 Snapshot {run_id}: {entry['rows']} rows in {len(files)} regions")
+        return entry
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def read_run(self, run_id: str, regions: Optional[Sequence[str]] = None,
+                 columns: Optional[Sequence[str]] = None):
+        """One run as a pyarrow Table, optionally limited to some regions / columns"""
+        pa, pq = _require_pyarrow()
+        run = self.get_run(run_id)
+        tables = [
+            pq.read_table(os.path.join(self.root, region_file['path']), columns=list(columns) if columns else None)
+            for region, region_file in sorted(run['regions'].items())
+            if not regions or region in regions
+        ]
+        if not tables:
+            schema = _snapshot_schema(pa)
+            if columns:
+                schema = pa.schema([schema.field(name) for name in columns])
+            return schema.empty_table()
+        return pa.concat_tables(tables) if len(tables) > 1 else tables[0]
+
+    def run_as_of(self, as_of: datetime) -> Optional[Dict]:
+        """Latest run taken at or before as_of"""
+        if as_of.tzinfo is None:
+            as_of = as_of.replace(tzinfo=timezone.utc)
+        candidates = [run for run in self.list_runs() if datetime.fromisoformat(run['run_at']) <= as_of]
+        return candidates[-1] if candidates else None
+
+    def as_of(self, as_of: datetime, regions: Optional[Sequence[str]] = None,
+              columns: Optional[Sequence[str]] = None):
+        """Distributor network as scraped by the latest run at or before as_of (None if no run yet)"""
+        run = self.run_as_of(as_of)
+        if run is None:
+            return None
+        return self.read_run(run['run_id'], regions=regions, columns=columns)
+
+    @staticmethod
+    def to_records(table) -> List[CompactDistributor]:
+        """Materialize a snapshot table back into CompactDistributor records"""
+        columns = {name: table.column(name).to_pylist() for name in SNAPSHOT_COLUMNS}
+        return [
+            CompactDistributor(**{name: columns[name][i] for name in SNAPSHOT_COLUMNS})
+            for i in range(table.num_rows)
+        ]
+
+    @timed('snapshot_diff')
+    def diff(self, old_run_id: str, new_run_id: str, regions: Optional[Sequence[str]] = None) -> Dict:
+        """Distributors added, removed and changed (per field) between two runs"""
+        old_rows = self._keyed_rows(self.read_run(old_run_id, regions=regions))
+        new_rows = self._keyed_rows(self.read_run(new_run_id, regions=regions))
+        compared = [name for name in SNAPSHOT_COLUMNS if name not in VOLATILE_COLUMNS]
+
+        changed = []
+        for key in old_rows.keys() & new_rows.keys():
+            old, new = old_rows[key], new_rows[key]
+            fields = {name: [old[name], new[name]] for name in compared if old[name] != new[name]}
+            if fields:
+                changed.append({'key': key, 'unifi_id': new['unifi_id'], 'company_name': new['company_name'],
+                                'fields': fields})
+
+        added = [new_rows[key] for key in new_rows.keys() - old_rows.keys()]
+        removed = [old_rows[key] for key in old_rows.keys() - new_rows.keys()]
+        return {
+            'old_run_id': old_run_id,
+            'new_run_id': new_run_id,
+            'added': sorted(added, key=lambda row: row['unifi_id'] or 0),
+            'removed': sorted(removed, key=lambda row: row['unifi_id'] or 0),
+            'changed': sorted(changed, key=lambda row: row['key']),
+            'summary': {'added': len(added), 'removed': len(removed), 'changed': len(changed)}
+        }
+
+    @staticmethod
+    def _keyed_rows(table) -> Dict[str, Dict]:
+        rows = {}
+        for row in table.to_pylist():
+            rows[distributor_key(row['unifi_id'], row['company_name'], row['address'])] = row
+        return rows
+
+
+def snapshot_run(distributors: Sequence, logger=None) -> Optional[Dict]:
+    """Write a scrape run if snapshots are enabled; failures are logged (to this module's logger by default), never raised"""
+    if not settings.snapshot_enabled or not distributors:
+        return None
+    try:
+        return SnapshotStore().write_run(distributors)
+    except Exception as e:
+        (logger or _logger).warning(f"Snapshot write skipped: {str(e)}")
+        return None
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Background Sync Job Manager
+Runs scrape -> process -> missing detection in a worker pool so API workers stay free for reads
+"""
+
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from config.settings import settings
+from config.logging import LoggerMixin
+
+
+@dataclass
+class SyncJob:
+    """State of a single sync run, exposed through /api/jobs/{id}"""
+
+    id: str
+    key: str
+    params: Dict = field(default_factory=dict)
+
+    # Lifecycle: queued -> running -> completed / failed
+    status: str = "queued"
+    # Pipeline phase: queued, scraping, processing, notion_sync, done
+    phase: str = "queued"
+
+    # Progress counters
+    pairs_total: int = 0
+    pairs_fetched: int = 0
+    distributors_found: int = 0
+    rows_written: int = 0
+
+    # Outcome
+    result: Optional[Dict] = None
+    error: Optional[str] = None
+
+    # Timestamps
+    created_at: datetime = field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    @property
+    def is_active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def to_dict(self) -> Dict:
+        data = asdict(self)
+        data.pop('key')
+        return data
+
+
+class SyncJobManager(LoggerMixin):
+    """Enqueues sync jobs, de-duplicates concurrent requests and runs them in a worker pool"""
+
+    def __init__(self, max_workers: Optional[int] = None, history_limit: Optional[int] = None):
+        self.max_workers = max_workers or settings.sync_worker_count
+        self.history_limit = history_limit or settings.sync_job_history_limit
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, SyncJob] = {}
+        self._active_by_key: Dict[str, str] = {}
+
+    def submit_sync(self, sync_notion: bool = True, detect_missing: bool = True,
+                    incremental: Optional[bool] = None) -> Tuple[SyncJob, bool]:
+        """Enqueue a distributor sync, returns (job, created)
+
+        A full scrape rewrites the same rows no matter who asked for it, so every
+        concurrent sync request shares the active run; the first request's options win.
+        incremental defaults to SCRAPE_INCREMENTAL.
+        """
+        key = "distributor_sync"
+        params = {'sync_notion': sync_notion, 'detect_missing': detect_missing,
+                  'incremental': settings.scrape_incremental if incremental is None else incremental}
+
+        with self._lock:
+            active_id = self._active_by_key.get(key)
+            if active_id and self._jobs[active_id].is_active:
+                self.logger.info(f"Sync already in progress, sharing job {active_id}")
+                return self._jobs[active_id], False
+
+            job = SyncJob(id=uuid.uuid4().hex, key=key, params=params)
+            self._jobs[job.id] = job
+            self._active_by_key[key] = job.id
+            self._trim_history()
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="sync-job"
+                )
+            self._executor.submit(self._run_job, job)
+
+        self.logger.info(f"Queued sync job {job.id} ({params})")
+        return job, True
+
+    def get_job(self, job_id: str) -> Optional[SyncJob]:
+        """Get job by ID"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self) -> list:
+        """List known jobs, most recent first"""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting work and release the worker pool"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+    def _trim_history(self):
+        """Forget the oldest finished jobs beyond the history limit (caller holds the lock)"""
+        finished = [job for job in self._jobs.values() if not job.is_active]
+        overflow = len(self._jobs) - self.history_limit
+        if overflow <= 0:
+            return
+        for job in sorted(finished, key=lambda job: job.created_at)[:overflow]:
+            del self._jobs[job.id]
+
+    def _run_job(self, job: SyncJob):
+        """Worker entry point"""
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+
+        try:
+            job.result = self._run_sync_pipeline(job)
+            job.status = "completed"
+            self.logger.info(f"Sync job {job.id} completed")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            self.logger.error(f"Sync job {job.id} failed: {str(e)}\n{traceback.format_exc()}")
+        finally:
+            job.phase = "done"
+            job.finished_at = datetime.utcnow()
+            with self._lock:
+                if self._active_by_key.get(job.key) == job.id:
+                    del self._active_by_key[job.key]
+
+    def _run_sync_pipeline(self, job: SyncJob) -> Dict:
+        """Scrape, process and optionally push to Notion, reporting progress on the job"""
+        from services.distributor_scraper import JsonDistributorScraper
+        from services.enhanced_data_processor import EnhancedDataProcessor
+
+        # 1. Scrape
+        job.phase = "scraping"
+
+        def on_pair_fetched(pairs_done: int, pairs_total: int, distributors_found: int):
+            job.pairs_fetched = pairs_done
+            job.pairs_total = pairs_total
+            job.distributors_found = distributors_found
+
+        scraper = JsonDistributorScraper()
+        run = None
+        scheduler = None
+        if job.params.get('incremental'):
+            if settings.scrape_scheduled:
+                from services.pair_scheduler import PairScheduler
+                scheduler = PairScheduler()
+            distributors, run = scraper.scrape_incremental(progress_callback=on_pair_fetched, scheduler=scheduler)
+        else:
+            distributors = scraper.scrape_all_distributors(progress_callback=on_pair_fetched)
+        if not distributors and not (run and (run['unchanged_pairs'] or run['unscheduled_pairs'])):
+            raise RuntimeError("Scraping returned no distributors")
+        job.distributors_found = len(distributors)
+        
+        snapshot = None
+        if run is None or (run['full_pass'] and not run['failed_pairs']):
+            from services.snapshot_store import snapshot_run
+            snapshot = snapshot_run(distributors, logger=self.logger)
+
+        # 2. Process and detect missing distributors
+        job.phase = "processing"
+
+        def on_rows_written(rows_written: int):
+            job.rows_written = rows_written
+
+        processor = EnhancedDataProcessor()
+        processing_results = processor.process_distributors(
+            distributors,
+            detect_missing=job.params.get('detect_missing', True),
+            progress_callback=on_rows_written,
+            excluded_pairs=run['excluded_pairs'] if run else None
+        )
+        if run and not processing_results['errors'] and not processing_results['missing_errors']:
+            from services.scrape_watermarks import commit_run
+            commit_run(run, scheduler=scheduler)
+
+        # 3. Notion
+        notion_results = None
+        if job.params.get('sync_notion') and settings.notion_sync_enabled and settings.notion_token:
+            job.phase = "notion_sync"
+            try:
+                from services.notion_sync import NotionSync
+                notion_results = NotionSync().sync_all_distributors()
+            except Exception as e:
+                notion_results = {'error': str(e)}
+
+        return {
+            'scraped_count': len(distributors),
+            'processing_results': processing_results,
+            'notion_results': notion_results,
+            'snapshot_run_id': snapshot['run_id'] if snapshot else None,
+            'scraper_metrics': scraper.get_performance_metrics(),
+            'incremental': {key: run[key] for key in ('full_pass', 'changed_pairs', 'unchanged_pairs', 'failed_pairs',
+                                                        'unscheduled_pairs')}
+                           if run else None
+        }
+
+
+# Process-wide job manager used by the API
+sync_job_manager = SyncJobManager()
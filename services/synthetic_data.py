@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Synthetic Distributor Data Generator
+Produces ui.com JSON API payloads (same shape as ajax_api_results.json) for every
+region/country pair, at any size, for benchmarks and replay testing
+"""
+
+import json
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+# Rough share of distributors per region, modelled on the live site
+REGION_WEIGHTS = {
+    'eur': 0.34,
+    'usa': 0.15,
+    'as': 0.15,
+    'lat-a': 0.12,
+    'af': 0.07,
+    'mid-e': 0.06,
+    'aus-nzl': 0.06,
+    'can': 0.05
+}
+
+# (lat_min, lat_max, lng_min, lng_max) per region
+REGION_BOUNDS = {
+    'af': (-34.0, 15.0, -17.0, 40.0),
+    'as': (-8.0, 50.0, 68.0, 140.0),
+    'aus-nzl': (-45.0, -12.0, 113.0, 178.0),
+    'can': (43.0, 60.0, -130.0, -60.0),
+    'eur': (36.0, 65.0, -10.0, 40.0),
+    'lat-a': (-40.0, 25.0, -100.0, -35.0),
+    'mid-e': (13.0, 37.0, 34.0, 60.0),
+    'usa': (25.0, 48.0, -124.0, -70.0)
+}
+
+NAME_PREFIXES = ['Net', 'Wave', 'Link', 'Sky', 'Fiber', 'Air', 'Data', 'Signal', 'Core', 'Edge', 'Wire', 'Micro']
+NAME_SUFFIXES = ['Solutions', 'Networks', 'Distribution', 'Systems', 'Telecom', 'Supply', 'Technologies', 'Trading']
+COMPANY_FORMS = ['Ltd', 'GmbH', 'Inc.', 'S.A.', 'LLC', 'Pty Ltd', 'B.V.', 'Co.']
+STREETS = ['Main St', 'Industrial Rd', 'Harbour Ave', 'Market St', 'Station Rd', 'Park Lane', 'Commerce Blvd']
+TLDS = ['com', 'net', 'io', 'de', 'co.uk', 'com.br', 'com.au', 'fr']
+
+
+def pair_url(base_url: str, region: str, country_state: str) -> str:
+    """URL the scraper requests for a region/country pair"""
+    return f"{base_url}?region={region}&country_state={country_state}"
+
+
+class SyntheticDataGenerator:
+    """Deterministic (seeded) generator of JSON API payloads across all region/country pairs"""
+
+    def __init__(self, total_distributors: int, seed: int = 42,
+                 region_country_mapping: Optional[Dict[str, List[str]]] = None,
+                 master_rate: float = 0.1, duplicate_rate: float = 0.02, invalid_rate: float = 0.005):
+        if region_country_mapping is None:
+            from services.distributor_scraper import JsonDistributorScraper
+            region_country_mapping = JsonDistributorScraper._get_static_mapping()
+
+        self.total_distributors = total_distributors
+        self.seed = seed
+        self.region_country_mapping = region_country_mapping
+        self.master_rate = master_rate
+        # Share of records also listed under a second country of the same region (exercises dedupe)
+        self.duplicate_rate = duplicate_rate
+        # Share of records missing a name or address (rejected during parsing)
+        self.invalid_rate = invalid_rate
+
+    def allocate(self) -> Dict[Tuple[str, str], int]:
+        """Number of distributors per (region, country) pair: weighted by region, Zipf-skewed by country"""
+        rng = random.Random(self.seed)
+        regions = list(self.region_country_mapping)
+        region_weights = [REGION_WEIGHTS.get(region, 0.05) for region in regions]
+        weight_sum = sum(region_weights)
+
+        allocation = {}
+        allocated = 0
+        for region, region_weight in zip(regions, region_weights):
+            countries = list(self.region_country_mapping[region])
+            rng.shuffle(countries)
+            country_weights = [1 / (rank + 1) ** 0.8 for rank in range(len(countries))]
+            country_sum = sum(country_weights)
+            region_total = self.total_distributors * region_weight / weight_sum
+            for country, country_weight in zip(countries, country_weights):
+                count = int(region_total * country_weight / country_sum)
+                allocation[(region, country)] = count
+                allocated += count
+
+        # Hand the rounding remainder to the largest pairs
+        for pair in sorted(allocation, key=allocation.get, reverse=True)[:self.total_distributors - allocated]:
+            allocation[pair] += 1
+        return allocation
+
+    def iter_payloads(self) -> Iterator[Tuple[str, str, Dict]]:
+        """Yield (region, country_state, payload) for every pair, in mapping order"""
+        rng = random.Random(self.seed)
+        allocation = self.allocate()
+        next_id = 1
+        # Per region: records eligible to be re-listed under another country
+        relistable: Dict[str, List[Dict]] = {}
+
+        for region, countries in self.region_country_mapping.items():
+            for country in countries:
+                resellers, masters = [], []
+                for _ in range(allocation.get((region, country), 0)):
+                    record = self._make_record(rng, next_id, region)
+                    next_id += 1
+                    (masters if record['master_reseller'] else resellers).append(record)
+                    if rng.random() < self.duplicate_rate:
+                        relistable.setdefault(region, []).append(record)
+
+                # Re-list earlier records from other countries of this region
+                for record in relistable.get(region, [])[:]:
+                    if rng.random() < 0.5:
+                        relistable[region].remove(record)
+                        (masters if record['master_reseller'] else resellers).append(dict(record))
+
+                yield region, country, {
+                    'resellers': resellers,
+                    'master_resellers': masters,
+                    'resellers_count': len(resellers),
+                    'master_resellers_count': len(masters)
+                }
+
+    def _make_record(self, rng: random.Random, unifi_id: int, region: str) -> Dict:
+        lat_min, lat_max, lng_min, lng_max = REGION_BOUNDS.get(region, (-60.0, 70.0, -180.0, 180.0))
+        prefix, suffix = rng.choice(NAME_PREFIXES), rng.choice(NAME_SUFFIXES)
+        name = f"{prefix}{rng.choice(NAME_PREFIXES).lower()} {suffix} {rng.choice(COMPANY_FORMS)} {unifi_id}"
+        domain = f"{prefix.lower()}{unifi_id}.{rng.choice(TLDS)}"
+        modified = datetime(2016, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=rng.randrange(10 * 365 * 86400))
+
+        record = {
+            'name': name,
+            'url': f"https://www.{domain}/",
+            'longitude': f"{rng.uniform(lng_min, lng_max):.6f}",
+            'email': rng.choice([f"sales@{domain}", f"mailto:info@{domain}", ""]),
+            'master_reseller': rng.random() < self.master_rate,
+            'phone': f"+{rng.randint(1, 99)} {rng.randint(100, 999)}-{rng.randint(1000, 9999)}",
+            'last_modified': modified.isoformat(timespec='milliseconds').replace('+00:00', 'Z'),
+            'sunmax': rng.random() < 0.03,
+            'address': f"{rng.randint(1, 999)} {rng.choice(STREETS)}\r\nUnit {rng.randint(1, 50)}\r\n{region.upper()} {rng.randint(10000, 99999)}",
+            'latitude': f"{rng.uniform(lat_min, lat_max):.6f}",
+            'logo': '',
+            'order': rng.randint(1, 500),
+            'id': unifi_id
+        }
+        if rng.random() < self.invalid_rate:
+            record[rng.choice(['name', 'address'])] = ''
+        return record
+
+    def write(self, path: str, base_url: str = "https://www.ui.com/distributors/"):
+        """Write all payloads keyed by request URL, the same layout as ajax_api_results.json"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                pair_url(base_url, region, country): payload
+                for region, country, payload in self.iter_payloads()
+            }, f, ensure_ascii=False)
@@ -0,0 +1,105 @@
+"""Round trips through services.change_codec: encode -> decode and reconstruct_state"""
+
+import importlib.util
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from services.change_codec import ChangeCodec, field_delta, reconstruct_state
+
+STATE = {
+    'company_name': 'Acme Networks', 'address': '12 Main St', 'unifi_id': 42, 'partner_type': 'master',
+    'phone': '+1 555 0100', 'contact_email': 'sales@acme.example', 'latitude': 40.7127753,
+    'longitude': -74.0059728, 'region': 'usa', 'country_state': 'NY', 'order_weight': 3,
+    'logo_url': 'https://acme.example/logo.png', 'sunmax_partner': False,
+    'last_modified': '2024-03-01T12:00:00+00:00', 'is_active': True
+}
+
+COMPRESSIONS = ['none', 'zlib', pytest.param('zstd', marks=pytest.mark.skipif(
+    importlib.util.find_spec('zstandard') is None, reason="zstandard is not installed"))]
+
+
+def _row(change_type, encoding, payload):
+    return SimpleNamespace(change_type=change_type, encoding=encoding, payload=payload, old_data=None, new_data=None)
+
+
+def _history(codec, states):
+    """change_history-like rows for successive states of one distributor, snapshotting as the processor does"""
+    rows, age = [], None
+    for old_state, new_state in zip([None] + states[:-1], states):
+        change_type = 'created' if old_state is None else 'updated'
+        full_snapshot = change_type != 'created' and codec.needs_snapshot(age)
+        encoding, payload = codec.encode(change_type, old_state, new_state, full_snapshot=full_snapshot)
+        age = 0 if encoding.startswith('full') else age + 1
+        rows.append(_row(change_type, encoding, payload))
+    return rows
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+def test_created_round_trip(compression):
+    encoding, payload = ChangeCodec(compression=compression).encode('created', None, STATE)
+    assert encoding.split('+')[0] == 'full'
+    decoded = ChangeCodec.decode(_row('created', encoding, payload))
+    assert decoded['full_state'] == STATE
+    assert decoded['old_data'] is None
+    assert decoded['new_data'] == STATE
+    assert decoded['changed_fields'] == sorted(field for field, value in STATE.items() if value is not None)
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+@pytest.mark.parametrize("full_snapshot", [False, True])
+def test_update_round_trip(compression, full_snapshot):
+    new_state = dict(STATE, phone=None, order_weight=5, region='can')
+    encoding, payload = ChangeCodec(compression=compression).encode('updated', STATE, new_state,
+                                                                    full_snapshot=full_snapshot)
+    assert encoding.split('+')[0] == ('full' if full_snapshot else 'delta')
+    decoded = ChangeCodec.decode(_row('updated', encoding, payload))
+    assert decoded['changed_fields'] == ['order_weight', 'phone', 'region']
+    assert decoded['old_data'] == {'order_weight': 3, 'phone': '+1 555 0100', 'region': 'usa'}
+    assert decoded['new_data'] == {'order_weight': 5, 'phone': None, 'region': 'can'}
+    assert decoded['full_state'] == (new_state if full_snapshot else None)
+
+
+def test_small_payloads_stay_uncompressed():
+    encoding, payload = ChangeCodec(compression='zlib').encode('updated', STATE, dict(STATE, order_weight=4))
+    assert encoding == 'delta'
+    assert json.loads(payload) == {'delta': {'order_weight': [3, 4]}}
+
+
+def test_unknown_encoding_rejected():
+    with pytest.raises(ValueError):
+        ChangeCodec.decode_payload('snapshot', b'{}')
+    with pytest.raises(ValueError):
+        ChangeCodec(compression='lz4')
+
+
+@pytest.mark.parametrize("compression", COMPRESSIONS)
+@pytest.mark.parametrize("snapshot_every", [1, 3, 20])
+def test_reconstruct_state_replays_every_prefix(compression, snapshot_every):
+    codec = ChangeCodec(compression=compression, snapshot_every=snapshot_every)
+    states = [STATE]
+    for step in range(1, 10):
+        states.append(dict(states[-1], order_weight=step, is_active=step % 4 != 0,
+                           phone=None if step % 3 == 0 else f'+1 555 01{step:02d}'))
+    rows = _history(codec, states)
+
+    snapshots = sum(1 for row in rows[1:] if row.encoding.startswith('full'))
+    assert snapshots == (len(rows) - 1) // snapshot_every
+    for count in range(1, len(rows) + 1):
+        assert reconstruct_state(rows[:count]) == states[count - 1]
+
+
+def test_reconstruct_state_reads_legacy_rows():
+    legacy = SimpleNamespace(change_type='created', encoding=None, payload=None, old_data=None,
+                             new_data=json.dumps(STATE))
+    codec = ChangeCodec(compression='none', snapshot_every=20)
+    new_state = dict(STATE, partner_type='simple')
+    encoding, payload = codec.encode('updated', STATE, new_state)
+    assert reconstruct_state([legacy, _row('updated', encoding, payload)]) == new_state
+
+
+def test_reconstruct_state_without_snapshot():
+    encoding, payload = ChangeCodec(compression='none').encode('updated', STATE, dict(STATE, order_weight=9))
+    assert reconstruct_state([_row('updated', encoding, payload)]) is None
+    assert field_delta(None, None) == {}
@@ -0,0 +1,144 @@
+"""ChangeRollupJob / DataProcessor.cleanup_old_changes: monthly rollups and the rows retention keeps"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from models.database import ChangeHistory, ChangeHistoryRollup, Company, Distributor
+from services.benchmark import create_schema
+from services.change_codec import ChangeCodec, reconstruct_state
+from services.change_rollup import ChangeRollupJob
+from services.data_processor import DataProcessor
+
+# Mid-month, so rows an hour apart share a rollup month whatever today's date
+OLD = (datetime.utcnow() - timedelta(days=200)).replace(day=10, hour=12, minute=0)
+RECENT = datetime.utcnow() - timedelta(days=1)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    db_path = str(tmp_path / "rollup.db")
+    create_schema(db_path)
+    engine = create_engine(f"sqlite:///{db_path}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def _distributor(db, name):
+    company = Company(name=name)
+    db.add(company)
+    db.flush()
+    distributor = Distributor(company_id=company.id, partner_type='simple', address='1 Main St', is_active=True)
+    db.add(distributor)
+    db.flush()
+    return distributor.id
+
+
+def _history(db, distributor_id, weights, detected_at, snapshot_every=3):
+    """change_history rows moving order_weight through weights, snapshotting like the processor
+
+    detected_at is one timestamp for every row, or a list with one per row.
+    """
+    if not isinstance(detected_at, list):
+        detected_at = [detected_at] * len(weights)
+    codec = ChangeCodec(compression='none', snapshot_every=snapshot_every)
+    age = None
+    rows = []
+    for old_weight, new_weight in zip([None] + weights[:-1], weights):
+        change_type = 'created' if old_weight is None else 'updated'
+        old_state = None if old_weight is None else {'order_weight': old_weight, 'phone': '111'}
+        full_snapshot = change_type != 'created' and codec.needs_snapshot(age)
+        encoding, payload = codec.encode(change_type, old_state, {'order_weight': new_weight, 'phone': '111'},
+                                         full_snapshot=full_snapshot)
+        age = 0 if encoding.startswith('full') else age + 1
+        rows.append(ChangeHistory(distributor_id=distributor_id, change_type=change_type, encoding=encoding,
+                                  payload=payload, detected_at=detected_at[len(rows)]))
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+def _changes(db, distributor_id):
+    return db.query(ChangeHistory).filter(ChangeHistory.distributor_id == distributor_id).order_by(ChangeHistory.id).all()
+
+
+def test_old_rows_fold_into_monthly_rollups(db):
+    distributor_id = _distributor(db, "Acme")
+    months = [OLD, OLD + timedelta(hours=1), OLD + timedelta(days=40), RECENT, RECENT]
+    _history(db, distributor_id, [1, 2, 3, 4, 5], months, snapshot_every=2)
+    # created(full), delta, full | delta, full - the newest full row is recent, so every old row can go
+
+    results = ChangeRollupJob(db).run(days_to_keep=90)
+    assert (results['compacted'], results['retained'], results['errors']) == (3, 0, [])
+    assert results['rollups_created'] == 2
+    assert len(_changes(db, distributor_id)) == 2
+
+    rollups = {r.month: r for r in db.query(ChangeHistoryRollup).filter_by(distributor_id=distributor_id)}
+    first = rollups[OLD.strftime('%Y-%m')]
+    assert (first.created_count, first.updated_count) == (1, 1)
+    assert json.loads(first.field_counts) == {'order_weight': 2, 'phone': 1}
+    assert json.loads(first.first_values)['order_weight'] is None
+    assert json.loads(first.last_values)['order_weight'] == 2
+    assert json.loads(rollups[(OLD + timedelta(days=40)).strftime('%Y-%m')].last_values) == {'order_weight': 3}
+
+
+def test_retention_keeps_newest_full_row_and_later_deltas(db):
+    distributor_id = _distributor(db, "Acme")
+    # created(full), delta, delta, full, delta, delta - all expired
+    _history(db, distributor_id, [1, 2, 3, 4, 5, 6], OLD, snapshot_every=3)
+    before = reconstruct_state(_changes(db, distributor_id))
+
+    results = ChangeRollupJob(db, batch_size=2).run(days_to_keep=90)
+    assert (results['compacted'], results['retained']) == (3, 3)
+    remaining = _changes(db, distributor_id)
+    assert [row.encoding for row in remaining] == ['full', 'delta', 'delta']
+    assert reconstruct_state(remaining) == before == {'order_weight': 6, 'phone': '111'}
+
+    # Rows kept for replay are folded only once they go, so nothing is counted twice
+    ChangeRollupJob(db).run(days_to_keep=90)
+    rollup = db.query(ChangeHistoryRollup).filter_by(distributor_id=distributor_id).one()
+    assert rollup.created_count + rollup.updated_count == 3
+
+    _history(db, distributor_id, [6, 7], OLD + timedelta(hours=1), snapshot_every=1)
+    assert ChangeRollupJob(db).run(days_to_keep=90)['compacted'] == 4
+    rollup = db.query(ChangeHistoryRollup).filter_by(distributor_id=distributor_id).one()
+    assert rollup.created_count + rollup.updated_count == 7
+    assert reconstruct_state(_changes(db, distributor_id)) == {'order_weight': 7, 'phone': '111'}
+
+
+def test_rollups_are_loaded_once_per_batch(db, engine):
+    distributor_ids = [_distributor(db, f"Company {i}") for i in range(5)]
+    for distributor_id in distributor_ids:
+        _history(db, distributor_id, [1, 2], [OLD, OLD + timedelta(days=40)])
+        _history(db, distributor_id, [1], RECENT, snapshot_every=1)
+
+    rollup_selects = []
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_rollup_selects(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'FROM change_history_rollups' in statement:
+            rollup_selects.append(statement)
+
+    results = ChangeRollupJob(db, batch_size=100).run(days_to_keep=90)
+    assert (results['batches'], results['compacted'], results['rollups_created']) == (1, 10, 10)
+    assert len(rollup_selects) == 1
+
+
+def test_cleanup_old_changes_returns_compacted_count(db):
+    distributor_id = _distributor(db, "Acme")
+    _history(db, distributor_id, [1, 2, 3], OLD)
+    _history(db, distributor_id, [3], RECENT, snapshot_every=1)
+
+    assert DataProcessor(db).cleanup_old_changes(days_to_keep=90) == 3
+    assert DataProcessor(db).cleanup_old_changes(days_to_keep=90) == 0
+    assert [row.detected_at.date() for row in _changes(db, distributor_id)] == [RECENT.date()]
@@ -0,0 +1,97 @@
+"""_compact_records: the slot-filling fast path builds the same records as CompactDistributor(...)"""
+
+from datetime import datetime
+
+import pytest
+
+from services.distributor_scraper import CompactDistributor, JsonDistributorScraper, _compact_records
+
+SCRAPED_AT = 1_714_567_890.123456
+
+RECORD = {
+    'id': 42, 'name': '  Acme Networks  ', 'address': ' 12 Main St ', 'url': 'https://acme.example',
+    'phone': '+1 555 0100', 'email': ' sales@acme.example ', 'latitude': '40.7127753', 'longitude': -74.0059728,
+    'last_modified': '2024-03-01T12:00:00Z', 'order': 3, 'logo': 'https://acme.example/logo.png', 'sunmax': True
+}
+
+
+def _compact(*records, partner_type='simple'):
+    return _compact_records(list(records), partner_type, 'usa', 'NY', SCRAPED_AT)
+
+
+def _one(**overrides):
+    distributors = _compact(dict(RECORD, **overrides))
+    assert len(distributors) == 1
+    return distributors[0]
+
+
+def test_matches_constructor():
+    expected = CompactDistributor(
+        'Acme Networks', 'master', website_url='https://acme.example', address='12 Main St',
+        phone='+1 555 0100', contact_email='sales@acme.example', latitude=40.7127753, longitude=-74.0059728,
+        region='usa', country_state='NY', unifi_id=42,
+        last_modified_ts=datetime.fromisoformat('2024-03-01T12:00:00+00:00').timestamp(),
+        order_weight=3, logo_url='https://acme.example/logo.png', sunmax_partner=True, data_source='json_api',
+        scraped_at_ts=SCRAPED_AT
+    )
+    distributor, = _compact(RECORD, partner_type='master')
+    assert distributor == expected
+    # Every slot is filled, so a slot added to CompactDistributor but not to the fast path fails here
+    assert len(distributor.astuple()) == len(CompactDistributor.__slots__)
+
+
+def test_minimal_record_matches_constructor():
+    distributor, = _compact({'name': 'Beta', 'address': '1 Ring Rd'})
+    assert distributor == CompactDistributor('Beta', 'simple', address='1 Ring Rd', region='usa', country_state='NY',
+                                             data_source='json_api', scraped_at_ts=SCRAPED_AT)
+    assert (distributor.website_url, distributor.logo_url, distributor.sunmax_partner) == (None, None, False)
+
+
+@pytest.mark.parametrize("email, expected", [
+    ('mailto:sales@acme.example', 'sales@acme.example'),
+    (' mailto:sales@acme.example ', 'sales@acme.example'),
+    ('https://acme.example/contact', None),
+    ('http://acme.example', None),
+    ('', None),
+    ('   ', None),
+    (None, None),
+])
+def test_email_cleaning(email, expected):
+    assert _one(email=email).contact_email == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ('42.2292779', 42.2292779),
+    (-3.5, -3.5),
+    ('', None),
+    ('n/a', None),
+    (None, None),
+    ([1, 2], None),
+])
+def test_coordinate_cleaning(value, expected):
+    distributor = _one(latitude=value, longitude=value)
+    assert distributor.latitude == expected
+    assert distributor.longitude == expected
+
+
+@pytest.mark.parametrize("value", ['not a date', '', None, 20240301])
+def test_bad_last_modified_becomes_none(value):
+    assert _one(last_modified=value).last_modified_ts is None
+
+
+def test_records_without_name_or_address_are_dropped():
+    kept = _compact(RECORD, dict(RECORD, name='  '), dict(RECORD, address=None), {'id': 7})
+    assert [d.unifi_id for d in kept] == [42]
+
+
+def test_malformed_record_is_skipped_not_the_response():
+    kept = _compact(RECORD, "not a record", dict(RECORD, id=43))
+    assert [d.unifi_id for d in kept] == [42, 43]
+
+
+def test_parse_json_response_uses_both_partner_lists():
+    scraper = JsonDistributorScraper(use_dynamic_mapping=False, request_delay=0)
+    distributors = scraper.parse_json_response(
+        {'resellers': [RECORD], 'master_resellers': [dict(RECORD, id=43)]}, 'usa', 'NY')
+    assert [(d.unifi_id, d.partner_type) for d in distributors] == [(42, 'simple'), (43, 'master')]
+    assert distributors[0].scraped_at_ts == distributors[1].scraped_at_ts
@@ -0,0 +1,145 @@
+"""Deduplicator: the same winners whatever the arrival order or sharding"""
+
+import itertools
+import pickle
+import random
+
+import pytest
+
+from services.deduplicator import Deduplicator, deduplicate, fingerprint
+from services.distributor_scraper import CompactDistributor
+
+
+def _record(name, address, region='eur', country_state='DE', unifi_id=None, order_weight=None, modified=None):
+    return CompactDistributor(name, 'simple', address=address, region=region, country_state=country_state,
+                              unifi_id=unifi_id, order_weight=order_weight, last_modified_ts=modified)
+
+
+def _records():
+    """Collisions of every kind, plus distinct distributors"""
+    records = [
+        # One partner listed under three pairs: highest order_weight wins
+        _record("Acme Networks", "12 Main St", 'eur', 'DE', unifi_id=1, order_weight=2),
+        _record("Acme Networks", "12 Main St", 'eur', 'FR', unifi_id=1, order_weight=5),
+        _record("Acme Networks", "12 Main St", 'usa', 'NY', unifi_id=1, order_weight=1),
+        # Equal order_weight: latest last_modified wins
+        _record("Beta Wireless", "1 Ring Rd", 'eur', 'DE', unifi_id=2, order_weight=3, modified=1_700_000_000),
+        _record("Beta Wireless", "1 Ring Rd", 'eur', 'AT', unifi_id=2, order_weight=3, modified=1_700_100_000),
+        # Full ties: lowest region / country_state wins
+        _record("Gamma Tech", "5 Side Ave", 'usa', 'NY', unifi_id=3, order_weight=1),
+        _record("Gamma Tech", "5 Side Ave", 'usa', 'CA', unifi_id=3, order_weight=1),
+        # Id-less listings of the same company at a differently formatted address fold into the keyed record
+        _record("ACME NETWORKS, INC.", "12 Main Street", 'eur', 'IT'),
+        _record("Delta Systems GmbH", "Hauptstraße 7, Suite 2", 'eur', 'DE'),
+        _record("delta systems", "Hauptstrasse 7 Ste 2", 'eur', 'CH'),
+        # Same name and address but different unifi_ids: never merged
+        _record("Epsilon Co", "9 Twin Ln", 'eur', 'DE', unifi_id=5),
+        _record("Epsilon Co", "9 Twin Ln", 'eur', 'DE', unifi_id=6),
+    ] + _moved_partner()
+    records += [_record(f"Distinct {i}", f"{i} Unique Rd", unifi_id=100 + i, order_weight=i % 3) for i in range(40)]
+    return records
+
+
+def _winners(records):
+    return sorted((r.unifi_id or 0, r.company_name, r.region, r.country_state) for r in records)
+
+
+EXPECTED = {
+    1: ('eur', 'FR'),
+    2: ('eur', 'AT'),
+    3: ('usa', 'CA'),
+    5: ('eur', 'DE'),
+    6: ('eur', 'DE'),
+    7: ('usa', 'CA'),
+}
+
+
+def test_picks_expected_winners():
+    kept, report = deduplicate(_records())
+    by_id = {r.unifi_id: (r.region, r.country_state) for r in kept if r.unifi_id and r.unifi_id < 100}
+    assert by_id == EXPECTED
+    idless = [r for r in kept if r.unifi_id is None]
+    # Tied on rank, so the lower country_state wins
+    assert [(r.company_name, r.country_state) for r in idless] == [("delta systems", 'CH')]
+    assert report['seen'] == len(_records())
+    assert report['unique'] == len(EXPECTED) + 1 + 40
+    assert report['duplicates'] == report['seen'] - report['unique']
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_shuffled_input_gives_same_winners(seed):
+    expected_kept, expected_report = deduplicate(_records())
+    records = _records()
+    random.Random(seed).shuffle(records)
+    kept, report = deduplicate(records)
+    assert _winners(kept) == _winners(expected_kept)
+    assert report == expected_report
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("shards", [2, 3, 7])
+def test_sharded_merge_gives_same_winners(seed, shards):
+    expected_kept, expected_report = deduplicate(_records())
+    records = _records()
+    rng = random.Random(seed)
+    rng.shuffle(records)
+
+    parts = [Deduplicator() for _ in range(shards)]
+    for record in records:
+        rng.choice(parts).add(record)
+    # Shards travel between processes pickled
+    parts = [pickle.loads(pickle.dumps(part)) for part in parts]
+    rng.shuffle(parts)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+
+    assert _winners(merged.records()) == _winners(expected_kept)
+    assert merged.report() == expected_report
+
+
+def _moved_partner():
+    """One partner listed at two addresses, plus an id-less listing at the losing address"""
+    return [
+        _record("Zeta Corp", "1 Main St", 'usa', 'CA', unifi_id=7, order_weight=2),
+        _record("Zeta Corp", "9 Other Rd", 'usa', 'NV', unifi_id=7, order_weight=1),
+        _record("Zeta Corp", "9 Other Rd", 'usa', 'AZ'),
+    ]
+
+
+@pytest.mark.parametrize("order", list(itertools.permutations(range(3))))
+def test_losing_duplicate_still_claims_idless_listing(order):
+    records = _moved_partner()
+    kept, report = deduplicate([records[i] for i in order])
+    assert [(r.unifi_id, r.country_state) for r in kept] == [(7, 'CA')]
+    assert report['duplicates'] == 2
+
+
+@pytest.mark.parametrize("split", [(0, 1), (1, 0), (0, 2), (2, 0), (1, 2), (2, 1)])
+def test_losing_duplicate_claims_idless_listing_across_shards(split):
+    records = _moved_partner()
+    first, second = Deduplicator(), Deduplicator()
+    for i in split:
+        first.add(records[i])
+    for i in set(range(3)) - set(split):
+        second.add(records[i])
+    for merged in (pickle.loads(pickle.dumps(first)).merge(second), second.merge(first)):
+        assert [(r.unifi_id, r.country_state) for r in merged.records()] == [(7, 'CA')]
+        assert merged.report()['duplicates'] == 2
+
+
+def test_add_batch_returns_records_to_upsert():
+    deduplicator = Deduplicator()
+    first = _record("Acme Networks", "12 Main St", unifi_id=1, order_weight=2)
+    better = _record("Acme Networks", "12 Main St", 'eur', 'FR', unifi_id=1, order_weight=5)
+    worse = _record("Acme Networks", "12 Main St", 'usa', 'NY', unifi_id=1, order_weight=1)
+    assert deduplicator.add_batch([first]) == [first]
+    assert deduplicator.add_batch([worse, better]) == [better]
+    assert deduplicator.records() == [better]
+    assert deduplicator.report()['duplicates_by_region'] == {'eur': 1, 'usa': 1}
+
+
+def test_fingerprint_normalizes_names_and_addresses():
+    assert fingerprint("Acme Networks, Inc.", "12 Main Street, Suite 4") == fingerprint("ACME NETWORKS INC", "12 Main St. Ste 4")
+    assert fingerprint("Café Réseau SARL", "1 Rue X") == fingerprint("cafe reseau", "1 rue x")
+    assert fingerprint("Acme Networks", "12 Main St") != fingerprint("Acme Networks", "14 Main St")
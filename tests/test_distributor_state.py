@@ -0,0 +1,122 @@
+"""/api/distributors/{id}/state: a distributor's state rebuilt from change_history snapshots and deltas"""
+
+import importlib
+import sqlite3
+import sys
+import types
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from config.database import get_db
+from models.database import ChangeHistory
+from services.benchmark import create_schema
+from services.change_codec import distributor_state_at, reconstruct_state
+from services.distributor_scraper import CompactDistributor
+from services.enhanced_data_processor import EnhancedDataProcessor
+
+T0 = datetime(2024, 5, 1, 12, 0)
+WEIGHTS = [1, 2, 3, 4, 5, 6, 7]
+
+
+def _import_distributors_router():
+    """api.routers.distributors without api/__init__.py, which builds the whole app (Notion, scheduler)"""
+    try:
+        return importlib.import_module("api.routers.distributors")
+    except ImportError:
+        package = types.ModuleType("api")
+        package.__path__ = [str(Path(__file__).resolve().parent.parent / "api")]
+        sys.modules["api"] = package
+        return importlib.import_module("api.routers.distributors")
+
+
+distributors = _import_distributors_router()
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    """One distributor whose order_weight steps through WEIGHTS, one run per day from T0"""
+    from config.settings import settings
+    monkeypatch.setattr(settings, 'history_enabled', False)
+    monkeypatch.setattr(settings, 'change_history_snapshot_every', 3)
+    db_path = str(tmp_path / "state.db")
+    create_schema(db_path)
+
+    processor = EnhancedDataProcessor(db_path=db_path)
+    for day, weight in enumerate(WEIGHTS):
+        record = CompactDistributor("Acme Networks", 'simple', address="12 Main St", region='usa', country_state='CA',
+                                    unifi_id=42, order_weight=weight)
+        assert not processor.process_distributors([record])['errors']
+        conn = sqlite3.connect(db_path)
+        try:
+            conn.execute("UPDATE change_history SET detected_at = ? WHERE detected_at > ?",
+                         ((T0 + timedelta(days=day)).isoformat(' '), (T0 + timedelta(days=day - 1, hours=1)).isoformat(' ')))
+            conn.commit()
+        finally:
+            conn.close()
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def client(session_factory):
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.include_router(distributors.router, prefix="/api/distributors")
+    app.dependency_overrides[get_db] = override_get_db
+    return TestClient(app)
+
+
+def test_state_at_replays_from_newest_snapshot(session_factory):
+    db = session_factory()
+    try:
+        rows = db.query(ChangeHistory).order_by(ChangeHistory.id).all()
+        assert [row.encoding.split('+')[0] for row in rows] == ['full', 'delta', 'delta', 'full', 'delta', 'delta', 'full']
+        distributor_id = rows[0].distributor_id
+
+        for day, weight in enumerate(WEIGHTS):
+            at = T0 + timedelta(days=day, hours=1)
+            state = distributor_state_at(db, distributor_id, at)
+            assert state['order_weight'] == weight
+            assert state == reconstruct_state([row for row in rows if row.detected_at <= at])
+
+        assert distributor_state_at(db, distributor_id, T0 - timedelta(hours=1)) is None
+        assert distributor_state_at(db, distributor_id)['order_weight'] == WEIGHTS[-1]
+        # Aware times are converted to UTC
+        aware = (T0 + timedelta(days=1, hours=1)).replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=-5)))
+        assert distributor_state_at(db, distributor_id, aware)['order_weight'] == 2
+    finally:
+        db.close()
+
+
+def test_state_endpoint(client, session_factory):
+    db = session_factory()
+    try:
+        distributor_id = db.query(ChangeHistory.distributor_id).first()[0]
+    finally:
+        db.close()
+
+    response = client.get(f"/api/distributors/{distributor_id}/state",
+                          params={"as_of": (T0 + timedelta(days=4, hours=1)).isoformat()})
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert body["distributor_id"] == distributor_id
+    assert body["state"]["order_weight"] == 5
+    assert body["state"]["company_name"] == "Acme Networks"
+
+    assert client.get(f"/api/distributors/{distributor_id}/state").json()["state"]["order_weight"] == WEIGHTS[-1]
+    assert client.get(f"/api/distributors/{distributor_id}/state",
+                      params={"as_of": (T0 - timedelta(days=1)).isoformat()}).status_code == 404
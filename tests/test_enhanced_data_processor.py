@@ -0,0 +1,74 @@
+"""EnhancedDataProcessor: one transaction per run, change capture and missing detection"""
+
+import sqlite3
+
+import pytest
+
+from services.benchmark import create_schema
+from services.change_capture import ChangeCapture
+from services.distributor_scraper import CompactDistributor
+from services.enhanced_data_processor import EnhancedDataProcessor
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    from config.settings import settings
+    monkeypatch.setattr(settings, 'history_enabled', False)
+    path = str(tmp_path / "processor.db")
+    create_schema(path)
+    return path
+
+
+def _records(ids, phone='111', region='eur', country_state='DE'):
+    return [CompactDistributor(f"Company {i}", 'simple', website_url=f"https://c{i}.example", address=f"{i} Main St",
+                               phone=phone, region=region, country_state=country_state, unifi_id=i)
+            for i in ids]
+
+
+def _query(db_path, sql):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_failed_run_leaves_nothing_behind(db_path, monkeypatch):
+    processor = EnhancedDataProcessor(db_path=db_path)
+    assert not processor.process_distributors(_records([1, 2, 3]))['errors']
+
+    def failing_flush(self):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ChangeCapture, 'flush', failing_flush)
+        results = processor.process_distributors(_records([1, 2, 3, 4], phone='222'))
+    assert results['errors'] and results['errors'][0].startswith("Database transaction failed")
+    assert (results['created'], results['updated'], results['changes_recorded']) == (0, 0, 0)
+
+    # Neither the upsert nor its change rows were committed
+    assert _query(db_path, "SELECT phone, COUNT(*) FROM distributors GROUP BY phone") == [('111', 3)]
+    assert _query(db_path, "SELECT change_type, COUNT(*) FROM change_history GROUP BY 1") == [('created', 3)]
+    assert _query(db_path, "SELECT status FROM channel_monitoring_sessions ORDER BY id") == [('completed',), ('failed',)]
+
+    # The next run still sees the old values, so the changes are recorded then
+    results = processor.process_distributors(_records([1, 2, 3, 4], phone='222'))
+    assert not results['errors']
+    assert (results['created'], results['updated'], results['changes_recorded']) == (1, 3, 4)
+    assert _query(db_path, "SELECT phone, COUNT(*) FROM distributors GROUP BY phone") == [('222', 4)]
+    assert _query(db_path, "SELECT change_type, COUNT(*) FROM change_history GROUP BY 1 ORDER BY 1") == [
+        ('created', 4), ('updated', 3)]
+
+
+def test_missing_detection_skips_excluded_pairs(db_path):
+    processor = EnhancedDataProcessor(db_path=db_path)
+    processor.process_distributors(_records([1, 2]) + _records([3, 4], region='usa', country_state='CA'))
+
+    results = processor.process_distributors(_records([1]), excluded_pairs={('usa', 'CA')})
+    assert results['deactivated'] == 1
+    assert results['lifecycle']['deactivated'] == 1
+    assert _query(db_path, "SELECT unifi_id FROM distributors WHERE is_active ORDER BY 1") == [(1,), (3,), (4,)]
+
+    results = processor.process_distributors(_records([1, 2]) + _records([3, 4], region='usa', country_state='CA'))
+    assert (results['reactivated'], results['lifecycle']['reactivated']) == (1, 1)
+    assert _query(db_path, "SELECT COUNT(*) FROM distributors WHERE is_active") == [(4,)]
@@ -0,0 +1,87 @@
+"""HealthMonitor: overall status, readiness and probe freshness from cached probe results"""
+
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.health_monitor import HealthMonitor, ProbeResult
+from services.metrics import CACHE_REQUESTS, HEALTH_PROBE_LAST_CHECK
+
+
+@pytest.fixture
+def monitor():
+    """A monitor whose probes return canned statuses instead of touching the database or network"""
+    monitor = HealthMonitor(interval_seconds=60, timeout_seconds=1)
+    monitor.statuses = {name: "healthy" for name in monitor.probes}
+    monitor.probes = {
+        name: (lambda name=name: ProbeResult(name=name, status=monitor.statuses[name]))
+        for name in monitor.probes
+    }
+    return monitor
+
+
+def _age(monitor, name, seconds):
+    monitor._results[name].checked_at = datetime.utcnow() - timedelta(seconds=seconds)
+
+
+def test_fresh_healthy_probes_are_healthy(monitor):
+    monitor.run_once()
+    summary = monitor.summary()
+    assert summary["status"] == "healthy"
+    assert not any(check["stale"] for check in summary["checks"].values())
+    assert monitor.readiness()["status"] == "ready"
+
+
+def test_probes_never_run_are_unhealthy(monitor):
+    assert monitor.overall_status() == "unhealthy"
+    assert monitor.readiness()["status"] == "not_ready"
+
+
+def test_failing_required_probe_is_unhealthy(monitor):
+    monitor.statuses["external_api"] = "unhealthy"
+    monitor.run_once()
+    assert monitor.overall_status() == "unhealthy"
+    # Optional probes do not count
+    monitor.statuses.update(external_api="healthy", notion="unhealthy")
+    monitor.run_once()
+    assert monitor.overall_status() == "healthy"
+
+
+def test_stale_required_probe_is_degraded(monitor):
+    monitor.run_once()
+    _age(monitor, "database", monitor.stale_after_seconds + 1)
+    summary = monitor.summary()
+    assert summary["status"] == "degraded"
+    assert summary["checks"]["database"]["stale"]
+    assert monitor.readiness()["status"] == "not_ready"
+
+    # A stale optional probe leaves the status alone; a failing required one still wins
+    monitor.run_once()
+    _age(monitor, "system", monitor.stale_after_seconds + 1)
+    assert monitor.overall_status() == "healthy"
+    monitor.statuses["external_api"] = "unhealthy"
+    monitor.run_once()
+    _age(monitor, "database", monitor.stale_after_seconds + 1)
+    assert monitor.overall_status() == "unhealthy"
+
+
+def test_probe_exception_is_recorded_as_unhealthy(monitor):
+    def broken():
+        raise ConnectionError("database is locked")
+
+    monitor.probes["database"] = broken
+    results = monitor.run_once()
+    assert results["database"].status == "unhealthy"
+    assert results["database"].error == "database is locked"
+    assert results["database"].checked_at is not None
+
+
+def test_probe_freshness_is_exported(monitor):
+    before = time.time()
+    monitor.run_once()
+    for name in monitor.probes:
+        assert HEALTH_PROBE_LAST_CHECK.get(probe=name) >= before
+    # Serving the summary is not a cache lookup
+    monitor.summary()
+    assert CACHE_REQUESTS.get(cache="health", result="hit") == CACHE_REQUESTS.get(cache="health", result="miss") == 0
@@ -0,0 +1,94 @@
+"""HistoryStore: states recorded by record_run come back from as_of at any point in time"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services.distributor_scraper import CompactDistributor
+from services.history_store import HistoryStore
+
+T0 = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _distributor(unifi_id, region='eur', partner_type='simple', order_weight=1):
+    return CompactDistributor(f"Company {unifi_id}", partner_type, website_url=f"https://c{unifi_id}.example",
+                              address=f"{unifi_id} Main St", region=region, country_state='DE',
+                              unifi_id=unifi_id, order_weight=order_weight)
+
+
+def _weights(states):
+    return {state['unifi_id']: state['order_weight'] for state in states}
+
+
+# Three runs: the first lists 1-3, the second changes 2 and drops 3, the third adds 4 outside the full run
+RUNS = [
+    (T0, [_distributor(1), _distributor(2), _distributor(3, region='usa')], True),
+    (T0 + timedelta(days=1), [_distributor(1), _distributor(2, order_weight=7, partner_type='master')], True),
+    (T0 + timedelta(days=2), [_distributor(4)], False),
+]
+
+
+@pytest.fixture(params=[1, 1000], ids=['checkpoint-every-run', 'log-replay'])
+def store(tmp_path, request):
+    """A store with RUNS recorded, checkpointing either on every run or only on the first"""
+    history = HistoryStore(db_path=str(tmp_path / "history.db"), checkpoint_interval_hours=24 * 365,
+                           checkpoint_max_changes=request.param)
+    for run_at, distributors, full_run in RUNS:
+        history.record_run(distributors, full_run=full_run, run_at=run_at)
+    assert len(history.list_checkpoints()) == (len(RUNS) if request.param == 1 else 1)
+    return history
+
+
+def test_as_of_returns_state_at_each_run(store):
+    states, total = store.as_of(T0)
+    assert total == 3
+    assert _weights(states) == {1: 1, 2: 1, 3: 1}
+
+    states, total = store.as_of(T0 + timedelta(days=1, hours=1))
+    assert total == 2
+    assert _weights(states) == {1: 1, 2: 7}
+
+    states, total = store.as_of(T0 + timedelta(days=3))
+    assert _weights(states) == {1: 1, 2: 7, 4: 1}
+
+
+def test_as_of_before_first_run_is_empty(store):
+    assert store.as_of(T0 - timedelta(seconds=1)) == ([], 0)
+
+
+def test_as_of_round_trips_recorded_fields(store):
+    states, _ = store.as_of(T0 + timedelta(days=1))
+    state = next(state for state in states if state['unifi_id'] == 2)
+    assert state['record_key'] == 'id:2'
+    assert state['partner_type'] == 'master'
+    assert state['company_name'] == 'Company 2'
+    assert state['website_url'] == 'https://c2.example'
+    assert state['is_active'] is True
+
+
+def test_as_of_keeps_deactivated_rows_when_asked(store):
+    states, total = store.as_of(T0 + timedelta(days=1), active_only=False)
+    assert total == 3
+    inactive = [state for state in states if not state['is_active']]
+    assert [state['unifi_id'] for state in inactive] == [3]
+
+
+def test_as_of_filters_and_pages(store):
+    states, total = store.as_of(T0, region='usa')
+    assert total == 1 and states[0]['unifi_id'] == 3
+
+    states, total = store.as_of(T0 + timedelta(days=1), partner_type='master')
+    assert total == 1 and states[0]['unifi_id'] == 2
+
+    first, total = store.as_of(T0, limit=2)
+    rest, _ = store.as_of(T0, limit=2, offset=2)
+    assert total == 3
+    assert [state['record_key'] for state in first + rest] == ['id:1', 'id:2', 'id:3']
+
+
+def test_unchanged_records_are_not_logged(tmp_path):
+    history = HistoryStore(db_path=str(tmp_path / "history.db"))
+    assert history.record_run(RUNS[0][1], run_at=T0)['logged'] == 3
+    results = history.record_run(RUNS[0][1], run_at=T0 + timedelta(hours=1))
+    assert results['logged'] == 0
+    assert results['unchanged'] == 3
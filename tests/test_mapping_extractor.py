@@ -0,0 +1,105 @@
+"""Tests for services.mapping_extractor against a saved distributors page"""
+
+import re
+from pathlib import Path
+
+import pytest
+
+from services.mapping_extractor import (
+    extract_main_regions_data,
+    extract_select_options,
+    mappings_from_regions_data,
+    parse_js_literal,
+)
+
+FIXTURE = Path(__file__).parent / "fixtures" / "distributors_page.html"
+
+EXPECTED_MAPPINGS = {
+    'eur': ['DE', 'FR', 'CI'],
+    'usa': ['CA', 'NY'],
+    'aus-nzl': ['AU', 'NZ'],
+}
+
+
+@pytest.fixture(scope="module")
+def page():
+    return FIXTURE.read_text(encoding="utf-8")
+
+
+def test_extracts_main_regions_data(page):
+    assert extract_main_regions_data(page) == EXPECTED_MAPPINGS
+
+
+def test_skips_literals_that_do_not_parse(page):
+    broken = "<script>mainRegionsData = [{s: 'eur', i: [loadCountries()]}];</script>"
+    assert extract_main_regions_data(broken + page) == EXPECTED_MAPPINGS
+
+
+def test_page_without_literal_returns_none(page):
+    without_script = re.sub(r"window\.mainRegionsData.*?\];", "", page, flags=re.DOTALL)
+    assert extract_main_regions_data(without_script) is None
+
+
+def test_select_options_fallback(page):
+    regions, countries = extract_select_options(page)
+    assert regions == ['eur', 'usa', 'aus-nzl']
+    # Blank placeholders are skipped and repeated options kept once
+    assert countries == ['DE', 'FR', 'CA', 'AU']
+
+
+def test_select_options_missing():
+    assert extract_select_options("<html><body><p>No form</p></body></html>") is None
+
+
+@pytest.mark.parametrize("literal, expected", [
+    ("[1, -2.5, 3e2, true, false, null, undefined]", [1, -2.5, 300.0, True, False, None, None]),
+    ("{a: 1, 'b': 2, \"c\": 3, $d_1: 4,}", {'a': 1, 'b': 2, 'c': 3, '$d_1': 4}),
+    ("['it\\'s', \"say \\\"hi\\\"\", 'caf\\u00e9', '\\x41\\n']", ["it's", 'say "hi"', 'café', 'A\n']),
+    ("[ // line comment\n 1, /* block */ 2, ]", [1, 2]),
+    ("[[], {}, [[{}]]]", [[], {}, [[{}]]]),
+])
+def test_parse_js_literal(literal, expected):
+    value, end = parse_js_literal(literal)
+    assert value == expected
+    assert end == len(literal)
+
+
+def test_parse_js_literal_reports_end_offset():
+    text = "x = [1, 2]; y = 3;"
+    value, end = parse_js_literal(text, start=4)
+    assert value == [1, 2]
+    assert text[end] == ';'
+
+
+@pytest.mark.parametrize("literal", [
+    "[1, 2",
+    "[1 2]",
+    "{a 1}",
+    "[foo]",
+    "['unterminated]",
+    "[function () {}]",
+])
+def test_parse_js_literal_rejects_invalid(literal):
+    with pytest.raises(ValueError):
+        parse_js_literal(literal)
+
+
+def test_parse_js_literal_is_bounded():
+    literal = "[" + "1, " * 1000 + "1]"
+    with pytest.raises(ValueError):
+        parse_js_literal(literal, limit=100)
+
+
+def test_parse_js_literal_limits_nesting():
+    with pytest.raises(ValueError):
+        parse_js_literal("[" * 100 + "]" * 100)
+
+
+def test_mappings_from_regions_data_ignores_malformed_entries():
+    regions_data = [
+        {'s': 'eur', 'i': [{'s': 'DE'}, {'n': 'no code'}, 'FR', {'s': ''}]},
+        {'s': 'usa'},
+        'not a region',
+    ]
+    assert mappings_from_regions_data(regions_data) == {'eur': ['DE']}
+    assert mappings_from_regions_data({'s': 'eur'}) == {}
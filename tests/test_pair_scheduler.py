@@ -0,0 +1,130 @@
+"""PairScheduler: revisit intervals, due pairs within the daily budget, and churn tracking"""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.pair_scheduler import PairScheduler
+
+T0 = datetime(2024, 5, 1, 0, 0)
+DAY = timedelta(days=1)
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    return PairScheduler(db_path=str(tmp_path / "schedule.db"), daily_budget=20,
+                         min_revisit_hours=6, max_revisit_days=7)
+
+
+def _rows(rates):
+    return {pair: {'changes_ewma': rate, 'days_ewma': 1.0, 'last_checked_at': None} for pair, rate in rates.items()}
+
+
+def _run(changed=(), unchanged=()):
+    return {'full_pass': False, 'changed_pairs': list(changed), 'unchanged_pairs': list(unchanged),
+            'failed_pairs': [], 'watermarks': []}
+
+
+def _schedule(scheduler):
+    return {(row['region'], row['country_state']): row for row in scheduler.get_schedule()}
+
+
+def test_revisit_intervals_split_budget_by_churn(scheduler):
+    rates = {('usa', 'CA'): 50.0, ('usa', 'NY'): 1.0, ('eur', 'DE'): 0.1, ('eur', 'LU'): 0.0}
+    intervals = scheduler.revisit_intervals(_rows(rates))
+
+    # Very hot pairs are capped at the minimum interval, idle ones wait the maximum
+    assert intervals[('usa', 'CA')] == scheduler.min_revisit
+    assert intervals[('eur', 'LU')] == scheduler.max_revisit
+    assert intervals[('usa', 'NY')] < intervals[('eur', 'DE')] < intervals[('eur', 'LU')]
+    assert sum(DAY / interval for interval in intervals.values()) <= scheduler.daily_budget
+
+
+def test_revisit_intervals_fall_back_to_max_when_budget_is_short(tmp_path):
+    scheduler = PairScheduler(db_path=str(tmp_path / "schedule.db"), daily_budget=1,
+                              min_revisit_hours=6, max_revisit_days=7)
+    intervals = scheduler.revisit_intervals(_rows({('usa', str(i)): float(i) for i in range(10)}))
+    assert set(intervals.values()) == {scheduler.max_revisit}
+    assert scheduler.revisit_intervals({}) == {}
+
+
+def test_due_pairs_puts_never_checked_first_and_skips_fresh_ones(scheduler):
+    checked = [('usa', 'CA'), ('usa', 'NY')]
+    scheduler.record_run(_run(unchanged=checked), now=T0)
+
+    assert scheduler.due_pairs(checked + [('eur', 'DE')], now=T0 + timedelta(hours=1)) == [('eur', 'DE')]
+    # Past the maximum interval everything is due again
+    assert set(scheduler.due_pairs(checked, now=T0 + 8 * DAY)) == set(checked)
+
+
+def test_due_pairs_stops_at_remaining_budget(scheduler):
+    pairs = [('usa', str(i)) for i in range(10)]
+    scheduler.record_requests(17, now=T0)
+    assert len(scheduler.due_pairs(pairs, now=T0 + timedelta(hours=1))) == 3
+    # Requests older than a day no longer count
+    assert len(scheduler.due_pairs(pairs, now=T0 + DAY + timedelta(hours=1))) == 10
+
+
+def test_record_run_updates_churn_estimates(scheduler):
+    pair = ('usa', 'CA')
+    assert scheduler.record_run(_run(changed=[pair]), now=T0) == 1
+    first = _schedule(scheduler)[pair]
+    # The first check only sets the baseline
+    assert (first['checks'], first['changes']) == (1, 0)
+    assert first['changes_per_day'] == round(PairScheduler.PRIOR_RATE, 4)
+
+    scheduler.record_run(_run(changed=[pair]), now=T0 + 2 * DAY)
+    second = _schedule(scheduler)[pair]
+    assert (second['checks'], second['changes']) == (2, 1)
+    expected = (PairScheduler.DECAY * PairScheduler.PRIOR_RATE + 1) / (PairScheduler.DECAY * 1.0 + 2)
+    assert second['changes_per_day'] == round(expected, 4)
+    assert second['last_checked_at'] == (T0 + 2 * DAY).isoformat()
+
+
+def test_record_run_does_not_charge_the_budget(scheduler):
+    scheduler.record_run(_run(changed=[('usa', 'CA')], unchanged=[('usa', 'NY')]), now=T0)
+    assert scheduler.requests_last_day(T0 + timedelta(hours=1)) == 0
+    scheduler.record_requests(2, now=T0)
+    assert scheduler.requests_last_day(T0 + timedelta(hours=1)) == 2
+
+
+def test_thirty_day_simulation_follows_churn_within_budget(scheduler):
+    """Hourly runs for 30 days over 2 hot and 20 cold pairs; a quarter of the runs fail processing"""
+    rng = random.Random(7)
+    hot = [('usa', 'CA'), ('usa', 'NY')]
+    cold = [('eur', f'C{i}') for i in range(20)]
+    changes_per_day = {**{pair: 3.0 for pair in hot}, **{pair: 1 / 60 for pair in cold}}
+    pairs = hot + cold
+
+    version = {pair: 0 for pair in pairs}
+    stored = dict(version)
+    visits = {pair: [] for pair in pairs}
+    for hour in range(30 * 24):
+        now = T0 + timedelta(hours=hour)
+        for pair, rate in changes_per_day.items():
+            if rng.random() < rate / 24:
+                version[pair] += 1
+
+        due = scheduler.due_pairs(pairs, now=now)
+        # Charged straight after fetching, as scrape_incremental does
+        scheduler.record_requests(len(due), now=now)
+        assert scheduler.requests_last_day(now) <= scheduler.daily_budget
+        if rng.random() < 0.25:
+            # Processing failed: nothing is stored and the pairs stay due
+            continue
+        changed = [pair for pair in due if version[pair] != stored[pair]]
+        scheduler.record_run(_run(changed=changed, unchanged=[pair for pair in due if pair not in changed]), now=now)
+        for pair in due:
+            stored[pair] = version[pair]
+            visits[pair].append(now)
+
+    hot_visits = min(len(visits[pair]) for pair in hot)
+    cold_visits = max(len(visits[pair]) for pair in cold)
+    assert hot_visits > 3 * cold_visits
+    for pair in pairs:
+        gaps = [later - earlier for earlier, later in zip(visits[pair], visits[pair][1:])]
+        # Never faster than the minimum interval; cold pairs still come back around the maximum
+        # (later when a failed run used up the budget that day)
+        assert min(gaps) >= scheduler.min_revisit
+        assert max(gaps) <= scheduler.max_revisit + DAY
@@ -0,0 +1,80 @@
+"""PostgresBulkLoader against a real PostgreSQL (skipped unless DATABASE_URL points at one)"""
+
+import os
+import uuid
+
+import pytest
+
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL.startswith("postgres"),
+                                reason="DATABASE_URL does not point at PostgreSQL")
+
+
+@pytest.fixture
+def engine():
+    """Engine whose tables live in a throwaway schema, so loads never touch the database's own rows"""
+    pytest.importorskip("psycopg2")
+    from sqlalchemy import create_engine, text
+    from models.database import Base
+
+    schema = f"loader_test_{uuid.uuid4().hex[:12]}"
+    admin = create_engine(DATABASE_URL)
+    with admin.begin() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_engine(DATABASE_URL, connect_args={'options': f"-csearch_path={schema}"})
+    try:
+        Base.metadata.create_all(engine)
+        yield engine
+    finally:
+        engine.dispose()
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+        admin.dispose()
+
+
+def _records(ids, order_weight=1):
+    from services.distributor_scraper import CompactDistributor
+    return [CompactDistributor(f"Company {i}", 'simple', website_url=f"https://c{i}.example", address=f"{i} Test St",
+                               region='usa', country_state='CA', unifi_id=1000 + i, order_weight=order_weight)
+            for i in ids]
+
+
+def _active(engine):
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT unifi_id - 1000 FROM distributors WHERE is_active ORDER BY 1")
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def test_load_classifies_rows(engine):
+    from services.distributor_scraper import CompactDistributor
+    from services.pg_loader import PostgresBulkLoader
+
+    loader = PostgresBulkLoader(engine)
+    first = loader.load(_records(range(10)) + _records([3]) + [CompactDistributor("No Id", 'simple')])
+    assert first['staged'] == 11
+    assert first['duplicates'] == 1
+    assert first['skipped'] == 1
+    assert first['companies_created'] == 10
+    assert first['created'] == 10
+
+    again = loader.load(_records(range(5)) + _records(range(5, 10), order_weight=4))
+    assert (again['created'], again['updated'], again['unchanged']) == (0, 5, 5)
+    assert _active(engine) == list(range(10))
+
+
+def test_load_deactivates_and_reactivates(engine):
+    from services.pg_loader import PostgresBulkLoader
+
+    loader = PostgresBulkLoader(engine)
+    loader.load(_records(range(6)))
+    assert loader.load(_records(range(4)), deactivate_missing=True)['deactivated'] == 2
+    assert _active(engine) == [0, 1, 2, 3]
+
+    results = loader.load(_records(range(6)))
+    assert (results['reactivated'], results['unchanged'], results['created']) == (2, 4, 0)
+    assert _active(engine) == list(range(6))
@@ -0,0 +1,130 @@
+"""Incremental scrapes: watermark comparison, full-pass cadence and pairs left out of a run"""
+
+import json
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.benchmark import create_schema
+from services.distributor_scraper import JsonDistributorScraper
+from services.enhanced_data_processor import EnhancedDataProcessor
+from services.scrape_watermarks import (WatermarkStore, commit_run, payload_hash, payload_watermark,
+                                        watermark_unchanged)
+
+T0 = datetime(2024, 5, 1, 12, 0)
+
+
+def _reseller(unifi_id, modified='2024-04-01T00:00:00Z', order=1):
+    return {'id': unifi_id, 'name': f"Company {unifi_id}", 'address': f"{unifi_id} Main St",
+            'url': f"https://c{unifi_id}.example", 'order': order, 'last_modified': modified}
+
+
+def _payload(*resellers):
+    return {'resellers': list(resellers), 'master_resellers': []}
+
+
+def _watermark(payload):
+    return payload_watermark(payload, payload_hash(json.dumps(payload, sort_keys=True).encode()))
+
+
+class FakeScraper(JsonDistributorScraper):
+    """Serves canned payloads per pair instead of calling the API"""
+
+    def __init__(self, payloads):
+        super().__init__(use_dynamic_mapping=False, request_delay=0)
+        self.payloads = payloads
+        self.region_country_mapping = {}
+        for region, country in payloads:
+            self.region_country_mapping.setdefault(region, []).append(country)
+
+    def fetch_region_country_json(self, region, country_state):
+        payload = self.payloads[(region, country_state)]
+        return payload, {'payload_hash': _watermark(payload)['payload_hash']}
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    from config.settings import settings
+    monkeypatch.setattr(settings, 'history_enabled', False)
+    path = str(tmp_path / "incremental.db")
+    create_schema(path)
+    return path
+
+
+def test_watermark_unchanged():
+    payload = _payload(_reseller(1), _reseller(2, modified='2024-04-02T00:00:00Z'))
+    previous = _watermark(payload)
+    assert not watermark_unchanged(None, previous)
+    assert watermark_unchanged(previous, dict(previous))
+
+    # A different payload (e.g. reordered) with the same counts and newest last_modified
+    reordered = _watermark(_payload(*reversed(payload['resellers'])))
+    assert reordered['payload_hash'] != previous['payload_hash']
+    assert watermark_unchanged(previous, reordered)
+
+    assert not watermark_unchanged(previous, _watermark(_payload(_reseller(1))))
+    assert not watermark_unchanged(previous, _watermark(_payload(_reseller(1), _reseller(2, modified='2024-05-01T00:00:00Z'))))
+
+
+def test_full_pass_cadence(db_path):
+    store = WatermarkStore(db_path=db_path, full_pass_hours=24)
+    assert store.full_pass_due(now=T0)
+
+    watermark = dict(_watermark(_payload(_reseller(1))), region='usa', country_state='CA',
+                     checked_at=T0.isoformat(), changed_at=T0.isoformat(), full_at=T0.isoformat())
+    store.save([watermark])
+    assert not store.full_pass_due(now=T0 + timedelta(hours=23))
+    assert store.full_pass_due(now=T0 + timedelta(hours=24))
+
+
+def test_only_changed_pairs_are_converted(db_path):
+    payloads = {('usa', 'CA'): _payload(_reseller(1)), ('usa', 'NY'): _payload(_reseller(2))}
+    store = WatermarkStore(db_path=db_path)
+    scraper = FakeScraper(payloads)
+
+    distributors, run = scraper.scrape_incremental(store=store, full_pass=False)
+    assert sorted(d.unifi_id for d in distributors) == [1, 2]
+    assert len(run['changed_pairs']) == 2
+    commit_run(run, store=store)
+
+    payloads[('usa', 'NY')] = _payload(_reseller(2, modified='2024-05-01T00:00:00Z', order=5))
+    distributors, run = scraper.scrape_incremental(store=store, full_pass=False)
+    assert [d.unifi_id for d in distributors] == [2]
+    assert (run['changed_pairs'], run['unchanged_pairs']) == ([('usa', 'NY')], [('usa', 'CA')])
+    assert run['excluded_pairs'] == [('usa', 'CA')]
+
+    # A full pass converts every pair, but only moves changed_at where the watermark moved
+    commit_run(run, store=store)
+    distributors, run = scraper.scrape_incremental(store=store, full_pass=True)
+    assert sorted(d.unifi_id for d in distributors) == [1, 2]
+    assert run['excluded_pairs'] == []
+    assert all(w['full_at'] == w['checked_at'] and w['changed_at'] != w['checked_at'] for w in run['watermarks'])
+
+
+def test_distributor_keeps_pair_that_was_not_rescraped(db_path):
+    # Distributor 1 is listed under both pairs; the full run stores it under usa-CA (tie: lower country_state)
+    payloads = {('usa', 'CA'): _payload(_reseller(1)), ('usa', 'NY'): _payload(_reseller(1), _reseller(2))}
+    store = WatermarkStore(db_path=db_path)
+    scraper = FakeScraper(payloads)
+    processor = EnhancedDataProcessor(db_path=db_path)
+
+    distributors, run = scraper.scrape_incremental(store=store, full_pass=True)
+    assert not processor.process_distributors(distributors, excluded_pairs=run['excluded_pairs'])['errors']
+    commit_run(run, store=store)
+
+    # Only usa-NY changes: its listing of distributor 1 must not move it there
+    payloads[('usa', 'NY')] = _payload(_reseller(1), _reseller(2, modified='2024-05-01T00:00:00Z', order=5))
+    distributors, run = scraper.scrape_incremental(store=store, full_pass=False)
+    assert {d.unifi_id: d.country_state for d in distributors} == {1: 'NY', 2: 'NY'}
+    results = processor.process_distributors(distributors, excluded_pairs=run['excluded_pairs'])
+    assert not results['errors'] and results['deactivated'] == 0
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT unifi_id, country_state, order_weight FROM distributors ORDER BY 1").fetchall()
+        changes = conn.execute("SELECT COUNT(*) FROM change_history WHERE change_type = 'updated'").fetchone()[0]
+    finally:
+        conn.close()
+    assert rows == [(1, 'CA', 1), (2, 'NY', 5)]
+    assert changes == 1
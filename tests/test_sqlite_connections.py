@@ -0,0 +1,143 @@
+"""SQLiteConnectionManager: re-entrant writer scopes, rollback on error, readers beside the writer"""
+
+import threading
+
+import pytest
+
+from config.sqlite import SQLiteConnectionManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = SQLiteConnectionManager(str(tmp_path / "connections.db"))
+    with manager.writer() as conn:
+        conn.execute("CREATE TABLE items (name TEXT PRIMARY KEY)")
+    yield manager
+    manager.close()
+
+
+def _names(conn):
+    return sorted(name for name, in conn.execute("SELECT name FROM items"))
+
+
+def _committed(manager):
+    return _names(manager.reader())
+
+
+def test_with_block_commits(manager):
+    with manager.writer() as conn:
+        conn.execute("INSERT INTO items VALUES ('a')")
+    assert _committed(manager) == ['a']
+
+
+def test_with_block_rolls_back_on_error(manager):
+    with pytest.raises(RuntimeError):
+        with manager.writer() as conn:
+            conn.execute("INSERT INTO items VALUES ('a')")
+            raise RuntimeError("boom")
+    assert _committed(manager) == []
+
+
+def test_close_without_commit_rolls_back(manager):
+    conn = manager.writer()
+    conn.execute("INSERT INTO items VALUES ('a')")
+    conn.close()
+    assert _committed(manager) == []
+
+
+def test_nested_scope_does_not_commit_outer_transaction(manager):
+    outer = manager.writer()
+    try:
+        outer.execute("INSERT INTO items VALUES ('outer')")
+        with manager.writer() as inner:
+            inner.execute("INSERT INTO items VALUES ('inner')")
+            inner.commit()
+        # Nothing is visible to readers until the outermost holder commits
+        assert _committed(manager) == []
+        assert _names(outer) == ['inner', 'outer']
+        outer.rollback()
+    finally:
+        outer.close()
+    assert _committed(manager) == []
+
+
+def test_nested_scope_without_outer_work_joins_outer_transaction(manager):
+    outer = manager.writer()
+    try:
+        with manager.writer() as inner:
+            inner.execute("INSERT INTO items VALUES ('inner')")
+        assert _committed(manager) == []
+        outer.commit()
+    finally:
+        outer.close()
+    assert _committed(manager) == ['inner']
+
+
+def test_nested_error_rolls_back_only_nested_work(manager):
+    with manager.writer() as outer:
+        outer.execute("INSERT INTO items VALUES ('outer')")
+        with pytest.raises(RuntimeError):
+            with manager.writer() as inner:
+                inner.execute("INSERT INTO items VALUES ('inner')")
+                raise RuntimeError("boom")
+        with manager.writer() as inner:
+            inner.execute("INSERT INTO items VALUES ('second')")
+            inner.rollback()
+            inner.execute("INSERT INTO items VALUES ('third')")
+    assert _committed(manager) == ['outer', 'third']
+
+
+def test_outer_error_discards_nested_work(manager):
+    with pytest.raises(RuntimeError):
+        with manager.writer() as outer:
+            with manager.writer() as inner:
+                inner.execute("INSERT INTO items VALUES ('inner')")
+            outer.execute("INSERT INTO items VALUES ('outer')")
+            raise RuntimeError("boom")
+    assert _committed(manager) == []
+    # The writer is fully released: a fresh scope commits normally
+    with manager.writer() as conn:
+        conn.execute("INSERT INTO items VALUES ('after')")
+    assert _committed(manager) == ['after']
+
+
+def test_reader_runs_while_writer_is_held(manager):
+    with manager.writer() as conn:
+        conn.execute("INSERT INTO items VALUES ('a')")
+
+    conn = manager.writer()
+    try:
+        conn.execute("INSERT INTO items VALUES ('b')")
+        seen = []
+        reader = threading.Thread(target=lambda: seen.append(_committed(manager)))
+        reader.start()
+        reader.join(timeout=5)
+        assert not reader.is_alive()
+        # Another thread reads the last committed state without waiting for the writer
+        assert seen == [['a']]
+        conn.commit()
+    finally:
+        conn.close()
+    assert _committed(manager) == ['a', 'b']
+
+
+def test_writer_blocks_other_threads_until_released(manager):
+    conn = manager.writer()
+    acquired = threading.Event()
+
+    def write():
+        with manager.writer() as other:
+            other.execute("INSERT INTO items VALUES ('other')")
+        acquired.set()
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    try:
+        assert not acquired.wait(0.2)
+        conn.execute("INSERT INTO items VALUES ('first')")
+        conn.commit()
+    finally:
+        conn.close()
+    thread.join(timeout=5)
+    assert acquired.is_set()
+    assert _committed(manager) == ['first', 'other']